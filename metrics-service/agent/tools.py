@@ -1,7 +1,7 @@
 from pydantic import BaseModel 
 from typing import Optional, List 
 from langchain.tools import tool 
-import requests 
+from services.upstream import upstream
 from langchain.agents import initialize_agent
 from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
@@ -12,6 +12,7 @@ from langchain.prompts import MessagesPlaceholder
 from models.mitigation_models import MitigationRequest 
 from agent.toolkit import MitigationToolkit
 import ast 
+from functools import lru_cache
 
 load_dotenv()
 
@@ -23,7 +24,7 @@ NASA_API_KEY = os.getenv("NASA_API_KEY")
 def neo_lookup(neo_id: str) -> dict:
     """Searches for information about a NEO asteroid by its ID using NASA's API."""
     url = f"https://api.nasa.gov/neo/rest/v1/neo/{neo_id}?api_key={NASA_API_KEY}"
-    r = requests.get(url)
+    r = upstream.get_sync(url)
     r.raise_for_status() 
     return r.json()
 
@@ -72,15 +73,18 @@ instructions = SystemMessage(
     )
 )
 
-llm = ChatOpenAI(model="gpt-4o-mini", openai_api_key=OPENAI_API_KEY, temperature=0.6)
 
-agent = initialize_agent(
-    tools=[mitigation_tool_kit_tool, neo_lookup],
-    llm=llm,
-    agent=AgentType.OPENAI_FUNCTIONS,
-    verbose=True,
-    handle_parsing_errors=True,
-    agent_kwargs={
-        "extra_prompt_messages": [instructions]
-    }
-)
+@lru_cache(maxsize=1)
+def get_agent():
+    # El cliente de OpenAI y el agente se crean en el primer uso, no al importar
+    llm = ChatOpenAI(model="gpt-4o-mini", openai_api_key=OPENAI_API_KEY, temperature=0.6)
+    return initialize_agent(
+        tools=[mitigation_tool_kit_tool, neo_lookup],
+        llm=llm,
+        agent=AgentType.OPENAI_FUNCTIONS,
+        verbose=True,
+        handle_parsing_errors=True,
+        agent_kwargs={
+            "extra_prompt_messages": [instructions]
+        }
+    )
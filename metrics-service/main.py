@@ -8,13 +8,31 @@ import os
 # para asegurar que todos los módulos como 'models' y 'routers' sean encontrados.
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from routers import population, impacts, horinzons_data, asteroids_data, mitigation
+from routers import population, impacts, horinzons_data, asteroids_data, mitigation, cache_stats, health, orbits
 from services.validation import get_api_key
+from services.compute_pool import compute_pool
+from services.upstream import upstream
+from services.warmup import warmup
 
 FRONTEND_URL = os.getenv("FRONTEND_URL")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Cliente HTTP compartido (pool keep-alive) para Horizons/SBDB/NeoWs/Overpass.
+    # Rásteres y workers se cargan en segundo plano:
+    # el servicio acepta conexiones enseguida y /ready indica cuándo está caliente
+    await upstream.start()
+    warmup.start()
+    yield
+    compute_pool.shutdown()
+    await upstream.close()
+
+
 app = FastAPI(title="Asteroids Metrics Service",
               version="1.0.0",
               description="Service to provide various metrics for asteroid impact scenarios.",
@@ -22,7 +40,8 @@ app = FastAPI(title="Asteroids Metrics Service",
               # dependencies=[Depends(get_api_key)],
               contact={
                 "name": "Pleiades Protocol Team"
-                }
+                },
+              lifespan=lifespan
               )
 
 app.add_middleware(
@@ -38,6 +57,9 @@ app.include_router(impacts.router)
 app.include_router(horinzons_data.router)
 app.include_router(asteroids_data.router)
 app.include_router(mitigation.router)
+app.include_router(cache_stats.router)
+app.include_router(health.router)
+app.include_router(orbits.router)
 
 
 @app.get("/", tags=["helper"], response_model=dict[str, str],
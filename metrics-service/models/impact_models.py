@@ -1,6 +1,5 @@
-from pydantic import BaseModel
-
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Any, Literal, Optional, List, Dict
 
 # Modelo simplificado para evitar errores 422
 class ImpactRequest(BaseModel):
@@ -27,4 +26,102 @@ class ThermalExposureAtDistanceRequest(BaseModel):
     eta: float
 
 class ThermalExposureAtDistanceResponse(BaseModel):
-    thermal_exposure: float
\ No newline at end of file
+    thermal_exposure: float
+
+# --- Resumen completo de escenarios (batch) ---
+class AsteroidParams(BaseModel):
+    diameter_m: float
+    velocity_mps: float
+    density_kgm3: float
+    shape_factor: float = 1.0
+    porosity: float = 0.0
+
+class ScenarioParams(BaseModel):
+    is_airburst: bool
+    latitude_deg: Optional[float] = None
+    longitude_deg: Optional[float] = None
+
+class TargetParams(BaseModel):
+    density_kgm3: float = 2500.0
+    water_depth_m: Optional[float] = None
+
+class AtmosphereParams(BaseModel):
+    k_atenuacion: float = 0.1
+    burst_altitude_m: Optional[float] = None
+
+class ImpactScenarioRequest(BaseModel):
+    asteroid: AsteroidParams
+    scenario: ScenarioParams
+    target: TargetParams = TargetParams()
+    atmosphere: AtmosphereParams = AtmosphereParams()
+
+class BatchSummaryRequest(BaseModel):
+    scenarios: List[ImpactScenarioRequest]
+
+class ImpactSummary(BaseModel):
+    inputs: Dict[str, Any]
+    energy: Dict[str, float]
+    thermal_profile: List[Dict[str, float]]
+    overpressure_isobars_km: Optional[Dict[str, Optional[float]]] = None
+    overpressure_isobars_discontinuity: Optional[Dict[str, bool]] = None
+    overpressure_isobars_beyond_range: Optional[Dict[str, bool]] = None   # radio = R_max (cota inferior)
+    crater: Optional[Dict[str, float]] = None
+    seismic: Optional[Dict[str, float]] = None
+    tsunami: Optional[Dict[str, float]] = None
+
+class BatchSummaryResponse(BaseModel):
+    summaries: List[ImpactSummary]
+
+# --- Perfil radial ---
+class RadialProfileRequest(BaseModel):
+    asteroid: AsteroidParams
+    atmosphere: AtmosphereParams = AtmosphereParams()
+    r_km: Optional[List[float]] = None   # malla fija; si None se refina de forma adaptativa
+    r_min_km: float = 0.1
+    r_max_km: float = 1000.0
+    max_points: int = Field(256, ge=32, le=4096)   # ge: n_initial de radial_profile
+
+class RadialProfileResponse(BaseModel):
+    E_joules: float
+    fireball_radius_m: float
+    duration_s: float
+    r_km: List[float]
+    fluence_Jm2: List[float]
+    overpressure_Pa: List[float]
+    horizon_fraction: List[float]
+
+# --- Monte Carlo ---
+class DistributionParams(BaseModel):
+    kind: Literal["fixed", "uniform", "loguniform", "normal", "lognormal"] = "fixed"
+    a: float
+    b: float = 0.0
+
+class MonteCarloRequest(BaseModel):
+    velocity_mps: DistributionParams
+    density_kgm3: DistributionParams
+    diameter_m: Optional[DistributionParams] = None
+    h_magnitude: Optional[DistributionParams] = None
+    albedo: Optional[DistributionParams] = None
+    porosity: DistributionParams = DistributionParams(a=0.0)
+    shape_factor: DistributionParams = DistributionParams(a=1.0)
+    burst_altitude_m: Optional[DistributionParams] = None
+    target_density_kgm3: float = 2500.0
+    water_depth_m: Optional[float] = None
+    n_samples: int = 100_000
+    seed: Optional[int] = None
+
+class MonteCarloResponse(BaseModel):
+    n_samples: int
+    seed: int
+    bands: Dict[str, Dict[str, float]]
+
+# --- Malla de daños ---
+class DamageGridRequest(BaseModel):
+    asteroid: AsteroidParams
+    atmosphere: AtmosphereParams = AtmosphereParams()
+    lat: float
+    lon: float
+    radius_km: float
+    width: int = 512
+    height: int = 512
+    quantity: Literal["fluence_Jm2", "overpressure_Pa"] = "overpressure_Pa"
@@ -1,6 +1,8 @@
 from pydantic import BaseModel 
 from typing import Optional
 
+from models.orbit_models import OrbitElementsIn
+
 
 class SuggestedMitigation(BaseModel):
     dv_mps: float
@@ -24,12 +26,17 @@ class MitigationRequest(BaseModel):
     tractorMass_kg: Optional[float] = 20000
     tractorRange_m: Optional[float] = 150
 
+    # Con la órbita, miss_km (y vRel_kms) salen del acercamiento a la Tierra más
+    # cercano en los próximos leadYears (o de la MOID si no hay ninguno), salvo que se den
+    orbit: Optional[OrbitElementsIn] = None
+
 
 class MitigationResponse(BaseModel):
     strategy: str
     confidence: str
     scores: dict[str, float]
     miss_nominal_km: float
+    encounter_epoch_jd: Optional[float] = None   # época del acercamiento usado como miss nominal
     miss_after_mitigation_km: float
     suggested: SuggestedMitigation
     why: list[str]
\ No newline at end of file
@@ -0,0 +1,57 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+
+class OrbitElementsIn(BaseModel):
+    # Elementos heliocéntricos (eclíptica J2000), ángulos en radianes como OrbitElts
+    a: Optional[float] = None        # semieje mayor (UA; negativo en hipérbolas); None = q / (1 - e)
+    e: float = Field(ge=0)
+    i: float
+    om: float
+    w: float
+    ma: float                        # anomalía media en epoch_jd
+    epoch_jd: float
+    n: Optional[float] = None        # movimiento medio (rad/día); None = derivado de a
+    q: Optional[float] = None        # perihelio (UA); obligatorio en parábolas (e = 1)
+
+
+class PropagationRequest(BaseModel):
+    bodies: List[OrbitElementsIn] = Field(min_length=1)
+    epochs_jd: Optional[List[float]] = None   # épocas explícitas (JD TDB), o bien:
+    start_jd: Optional[float] = None          # start_jd + k * step_days, k < steps
+    step_days: Optional[float] = None
+    steps: Optional[int] = Field(None, ge=1)
+
+
+class ScreeningRequest(BaseModel):
+    # Cuerpos a cribar: elementos explícitos, nombres del catálogo local y/o el catálogo entero
+    bodies: List[OrbitElementsIn] = []
+    sstr: List[str] = []
+    catalog: bool = False
+    start_jd: Optional[float] = None              # None = ahora
+    years: float = Field(10.0, gt=0, le=100)
+    step_days: float = Field(1.0, gt=0, le=30)
+    moid_max_au: float = Field(0.05, gt=0)        # solo se buscan acercamientos por debajo
+    approach_max_au: float = Field(0.05, gt=0)
+    max_results: int = Field(100, ge=1, le=10000)
+
+
+class Encounter(BaseModel):
+    epoch_jd: float
+    miss_au: float
+    miss_km: float
+    v_rel_kms: float
+
+
+class ScreeningHit(BaseModel):
+    name: str
+    moid_au: float
+    moid_km: float
+    encounters: List[Encounter]
+
+
+class ScreeningResponse(BaseModel):
+    start_jd: float
+    stop_jd: float
+    screened: int
+    results: List[ScreeningHit]
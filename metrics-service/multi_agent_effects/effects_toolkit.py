@@ -6,14 +6,14 @@ from models.impact_models import ImpactResponse
 from langchain.tools import tool
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
-from services.impact_metrics import ImpactMetrics, Asteroid, Atmosphere, Target, ImpactScenario
+from services.impact_metrics import ImpactMetrics, Asteroid, Atmosphere, Target, ImpactScenario, SAMPLE_R_KM
 
 # --- MODELO DE RESPUESTA ---
 class ImpactResponse(BaseModel):
     energy_megatons: float
     fireball_radius_m: float
     thermal_profile: List[Dict[str, float]]
-    overpressure_isobars_km: Optional[Dict[str, float]] = None
+    overpressure_isobars_km: Optional[Dict[str, Optional[float]]] = None
     crater_diameter_m: Optional[float] = None
     seismic_Mw: Optional[float] = None
     tsunami_wave_height_m: Optional[float] = None
@@ -35,10 +35,10 @@ class EffectsToolkit:
         Rf = ImpactMetrics.fireball_radius(E_joules)
 
         # --- Perfil térmico radial (1–100 km) ---
+        tau = ImpactMetrics.thermal_duration_tau(E_joules)
         thermal_profile = []
-        for r_km in [1, 5, 10, 20, 50, 100]:
+        for r_km in SAMPLE_R_KM:
             phi = ImpactMetrics.corrected_exposure(E_joules, r_km * 1000)
-            tau = ImpactMetrics.thermal_duration_tau(E_joules)
             thermal_profile.append({
                 "r_km": r_km,
                 "fluence_Jm2": phi,
@@ -52,11 +52,11 @@ class EffectsToolkit:
         tsunami_wave_height_m = None
 
         if self.scenario.is_airburst and self.atmosphere.burst_altitude_m:
-            thresholds = ImpactMetrics.damage_thresholds_kpa()
-            overpressure_isobars = {}
-            for key, kpa in thresholds.items():
-                R = ImpactMetrics.radius_for_overpressure_airburst(E_joules, self.atmosphere.burst_altitude_m, kpa)
-                overpressure_isobars[key] = None if R is None else R / 1000.0
+            solutions = ImpactMetrics.isobar_radii_airburst(E_joules, self.atmosphere.burst_altitude_m)
+            overpressure_isobars = {
+                key: None if sol.radius_m is None else sol.radius_m / 1000.0
+                for key, sol in solutions.items()
+            }
         else:
             crater_diameter_m = ImpactMetrics.crater_diameter_simple(E_joules, self.target)
             seismic_Mw = ImpactMetrics.seismic_magnitude_Mw(E_joules)
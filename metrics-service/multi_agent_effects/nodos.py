@@ -10,6 +10,7 @@ from typing import List, Literal
 from typing_extensions import Annotated
 from langgraph.graph.message import add_messages
 import concurrent.futures
+from functools import lru_cache
 from pydantic import BaseModel
 from langchain_community.tools.tavily_search import TavilySearchResults
 
@@ -18,10 +19,6 @@ from multi_agent_effects.effects_toolkit import effects_toolkit_tool
 from multi_agent_effects.tools_effects import estimate_population_tool, map_context_tool
 
 
-# === CONFIGURACIÓN DEL LLM ===
-LLM = ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
-
-
 # === ESTADO GLOBAL ===
 class ImpactState(BaseModel):
     messages: Annotated[List[BaseMessage], add_messages]
@@ -97,15 +94,19 @@ def make_openai_tool_agent(llm, tools, prompt):
 
 
 # === INSTANCIAS DE AGENTES ===
-effects_agent = make_openai_tool_agent(LLM, [effects_toolkit_tool], effects_prompt)
-population_agent = make_openai_tool_agent(LLM, [estimate_population_tool], population_prompt)
-maps_agent = make_openai_tool_agent(LLM, [map_context_tool], maps_prompt)
-
-tavily_tool = TavilySearchResults(max_results=3)
-search_agent = make_openai_tool_agent(LLM, [tavily_tool], search_costs_prompt)
-
-supervisor_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-supervisor_agent_llm = make_openai_tool_agent(supervisor_llm, [], supervisor_prompt)
+# Los clientes de OpenAI/Tavily se crean en el primer uso, no al importar el módulo
+@lru_cache(maxsize=1)
+def get_agents() -> dict:
+    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
+    supervisor_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+    tavily_tool = TavilySearchResults(max_results=3)
+    return {
+        "effects": make_openai_tool_agent(llm, [effects_toolkit_tool], effects_prompt),
+        "population": make_openai_tool_agent(llm, [estimate_population_tool], population_prompt),
+        "maps": make_openai_tool_agent(llm, [map_context_tool], maps_prompt),
+        "search_costs": make_openai_tool_agent(llm, [tavily_tool], search_costs_prompt),
+        "supervisor": make_openai_tool_agent(supervisor_llm, [], supervisor_prompt),
+    }
 
 
 # === FUNCIÓN SEGURA PARA INVOCAR AGENTES ===
@@ -131,7 +132,7 @@ def _safe_invoke(agent, query: str, timeout=40) -> str:
 # === NODOS ===
 def effects_node(state: ImpactState):
     query = state.messages[-1].content if state.messages else "Calcular efectos del impacto."
-    text = _safe_invoke(effects_agent, query)
+    text = _safe_invoke(get_agents()["effects"], query)
     if any(w in query.lower() for w in ["población", "habitantes", "densidad"]):
         new_msg = HumanMessage(content=f"{text}\n\nAhora estima la población afectada basándote en ese radio de daño.")
         return Command(update={"messages": new_msg}, goto="population")
@@ -140,26 +141,26 @@ def effects_node(state: ImpactState):
 
 def population_node(state: ImpactState):
     query = state.messages[-1].content if state.messages else "Calcular población afectada."
-    text = _safe_invoke(population_agent, query)
+    text = _safe_invoke(get_agents()["population"], query)
     return Command(update={"messages": HumanMessage(content=text, name="population")}, goto=END)
 
 
 def maps_node(state: ImpactState):
     query = state.messages[-1].content if state.messages else "Describir el mapa del impacto."
-    text = _safe_invoke(maps_agent, query)
+    text = _safe_invoke(get_agents()["maps"], query)
     return Command(update={"messages": HumanMessage(content=text, name="maps")}, goto=END)
 
 
 def search_costs_node(state: ImpactState):
     query = state.messages[-1].content if state.messages else "Buscar costes del impacto."
-    text = _safe_invoke(search_agent, query)
+    text = _safe_invoke(get_agents()["search_costs"], query)
     return Command(update={"messages": HumanMessage(content=text, name="search_costs")}, goto=END)
 
 
 def supervisor_node(state: ImpactState) -> Command[Literal["effects", "population", "maps", "search_costs", END]]:
     query = state.messages[-1].content if state.messages else "Analizar impacto."
     try:
-        decision = supervisor_agent_llm.invoke({"input": query})
+        decision = get_agents()["supervisor"].invoke({"input": query})
         if isinstance(decision, dict):
             decision_text = str(decision.get("output", "")).strip().lower()
         else:
@@ -183,15 +184,17 @@ def supervisor_node(state: ImpactState) -> Command[Literal["effects", "populatio
 
 
 # === GRAFO PRINCIPAL ===
-graph = StateGraph(ImpactState)
-graph.add_node("supervisor", supervisor_node)
-graph.add_node("effects", effects_node)
-graph.add_node("population", population_node)
-graph.add_node("maps", maps_node)
-graph.add_node("search_costs", search_costs_node)
-graph.set_entry_point("supervisor")
-graph.add_edge("supervisor", "effects")
-graph.add_edge("supervisor", "population")
-graph.add_edge("supervisor", "maps")
-graph.add_edge("supervisor", "search_costs")
-workflow = graph.compile()
+@lru_cache(maxsize=1)
+def get_workflow():
+    graph = StateGraph(ImpactState)
+    graph.add_node("supervisor", supervisor_node)
+    graph.add_node("effects", effects_node)
+    graph.add_node("population", population_node)
+    graph.add_node("maps", maps_node)
+    graph.add_node("search_costs", search_costs_node)
+    graph.set_entry_point("supervisor")
+    graph.add_edge("supervisor", "effects")
+    graph.add_edge("supervisor", "population")
+    graph.add_edge("supervisor", "maps")
+    graph.add_edge("supervisor", "search_costs")
+    return graph.compile()
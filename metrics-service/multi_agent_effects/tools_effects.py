@@ -95,14 +95,11 @@ def overpressure_isobars_tool(params: dict) -> dict:
     Calcula radios (km) para distintos umbrales de daño por sobrepresión.
     params: {E_joules, burst_altitude_m}
     """
-    thresholds = ImpactMetrics.damage_thresholds_kpa()
-    isobars = {}
-    for key, kpa in thresholds.items():
-        R = ImpactMetrics.radius_for_overpressure_airburst(
-            params["E_joules"], params["burst_altitude_m"], kpa
-        )
-        isobars[key] = None if R is None else R / 1000.0
-    return isobars
+    solutions = ImpactMetrics.isobar_radii_airburst(params["E_joules"], params["burst_altitude_m"])
+    return {
+        key: None if sol.radius_m is None else sol.radius_m / 1000.0
+        for key, sol in solutions.items()
+    }
 
 ######## THERMAL ##########
 
@@ -185,7 +182,7 @@ def estimate_population_tool(lat: float, lon: float, radius_m: float) -> int:
 
 
 
-import requests
+from services.upstream import upstream
 
 @tool("map_context_tool")
 def map_context_tool(lat: float, lon: float, radius_km: float = 100.0) -> dict:
@@ -215,7 +212,7 @@ def map_context_tool(lat: float, lon: float, radius_km: float = 100.0) -> dict:
     out center 50;
     """
 
-    r = requests.get(overpass_url, params={"data": query}, timeout=90)
+    r = upstream.get_sync(overpass_url, params={"data": query}, timeout=90)
     r.raise_for_status()
     data = r.json()
 
@@ -10,6 +10,10 @@ import json
 from datetime import datetime, timezone
 import math
 
+from services.cache import get_cache
+from services.sbdb_catalog import get_catalog
+from services.upstream import UpstreamUnavailable, upstream
+
 router = APIRouter(
     prefix="/asteroids",
     tags=["asteroids"]
@@ -32,60 +36,60 @@ class OrbitElts(BaseModel):
 
 SBDB_LOOKUP = "https://ssd-api.jpl.nasa.gov/sbdb.api"
 NASA_API_KEY = os.getenv('VITE_NASA_API_KEY')
+SBDB_FRESH_S = float(os.getenv("SBDB_FRESH_S", "86400"))       # respuestas SBDB válidas 1 día
+SBDB_STALE_S = float(os.getenv("SBDB_STALE_S", "2592000"))     # y servibles 30 días si SBDB no responde
+_sbdb_cache = get_cache("sbdb", ttl=SBDB_STALE_S)
 
 @router.get("/elements", response_model=OrbitElts)
 async def get_elements(sstr: str):
     """
     sstr puede ser nombre ('Apophis'), designación ('99942') o SPK-ID.
+    Se responde desde el catálogo local si está ingerido (services.sbdb_catalog);
+    solo los objetos que no están en él se consultan a SBDB.
     """
+    catalog = get_catalog()
+    elements = catalog.lookup(sstr) if catalog is not None else None
+    if elements is not None:
+        return orbit_elts(elements["full_name"], elements, elements["epoch"])
+
     params = {
         "sstr": sstr,
         "full-prec": "true",   # más precisión
     }
-    async with httpx.AsyncClient(timeout=15) as client:
-        r = await client.get(SBDB_LOOKUP, params=params)
-    j = r.json()
-    #print(type(j))
-    #print(j)
-    #print(print(json.dumps(j, indent=2)))
-
-    asteroid_name = j['object']['fullname']
-    orbit_elements = j['orbit']['elements']
-
-    a = float(next((d['value'] for d in orbit_elements if d.get('label') == 'a'), None))
-    e = float(next((d['value'] for d in orbit_elements if d.get('label') == 'e'), None))
-
+    try:
+        j = await upstream.get_json_cached(_sbdb_cache, sstr, SBDB_FRESH_S, SBDB_LOOKUP,
+                                           params=params, timeout=15)
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"SBDB unavailable: {e}")
+    except httpx.HTTPStatusError as e:
+        # Solo un 4xx dice algo del objeto pedido; un 5xx es un fallo de SBDB
+        status = e.response.status_code
+        if 400 <= status < 500:
+            raise HTTPException(status_code=404, detail=f"SBDB: no object '{sstr}' ({status})")
+        if status >= 500:
+            raise HTTPException(status_code=503, detail=f"SBDB unavailable: HTTP {status}")
+        raise HTTPException(status_code=502, detail=f"SBDB: unexpected HTTP {status} for '{sstr}'")
+
+    # Una sola pasada por la lista de elementos: {label: valor}
+    by_label = {d.get('label'): d.get('value') for d in j['orbit']['elements']}
+    elements = {"a": by_label.get('a'), "e": by_label.get('e'), "i": by_label.get('i'),
+                "om": by_label.get('node'), "w": by_label.get('peri'), "ma": by_label.get('M'),
+                "per": by_label.get('period')}
+    return orbit_elts(j['object']['fullname'], elements, j['orbit']['epoch'])
+
+
+def orbit_elts(asteroid_name: str, elements: dict, epoch_jd) -> OrbitElts:
     # Ángulos en grados → convertir a radianes
-    i = math.radians(float(next((d['value'] for d in orbit_elements if d.get('label') == 'i'), None)))
-    om = math.radians(float(next((d['value'] for d in orbit_elements if d.get('label') == 'node'), None)))
-    w = math.radians(float(next((d['value'] for d in orbit_elements if d.get('label') == 'peri'), None)))
-    M0 = math.radians(float(next((d['value'] for d in orbit_elements if d.get('label') == 'M'), None)))
-
-    period = float(next((d['value'] for d in orbit_elements if d.get('label') == 'period'), None))
-    epoch_jd = float(j['orbit']['epoch']) 
-
-    #n = float(next((d['value'] for d in orbit_elements if d.get('label') == 'n'), None))
-    
-    #M0_deg = float(next((d['value'] for d in orbit_elements if d.get('label') == 'M'), None))
-    
-
-    #ma_deg = float(next((d['value'] for d in orbit_elements if d.get('label') == 'M'), None))
-    #jd_now = datetime_to_jd(datetime.now(timezone.utc))
-    #jd_now_tt  = jd_now + 69.184/86400.0
-    #M_now = (ma_deg + n * (jd_now_tt - epoch_jd)) % 360.0
-    #M_now = ma_deg + n * (jd_now - epoch_jd)
-
-
     return OrbitElts(
         asteroid_name = asteroid_name,
-        a   = a,
-        e   = e,
-        periodDays=period,
-        i   = i,
-        om  = om,
-        w   = w,
-        ma  = M0,
-        epoch_jd = epoch_jd,)
+        a   = float(elements["a"]),
+        e   = float(elements["e"]),
+        periodDays = float(elements["per"]),
+        i   = math.radians(float(elements["i"])),
+        om  = math.radians(float(elements["om"])),
+        w   = math.radians(float(elements["w"])),
+        ma  = math.radians(float(elements["ma"])),
+        epoch_jd = float(epoch_jd),)
 
 def datetime_to_jd(dt: datetime) -> float:
     """
@@ -0,0 +1,31 @@
+from fastapi import APIRouter
+
+from services.block_cache import block_cache
+from services.cache import CACHES, cache_stats, merge_cache_stats
+from services.compute_pool import compute_pool
+
+router = APIRouter(
+    prefix="/cache",
+    tags=["cache"]
+)
+
+
+@router.get("/stats", response_model=dict[str, dict],
+            summary="Hit/miss counters of the computation caches")
+def stats():
+    # Este proceso más los workers del compute_pool (último informe de cada uno)
+    local = {**cache_stats(), "population_blocks": block_cache.stats()}
+    workers = compute_pool.cache_stats()
+    return {name: merge_cache_stats([r[name] for r in (local, workers) if name in r])
+            for name in {**local, **workers}}
+
+
+@router.post("/clear", response_model=dict[str, list[str]],
+             summary="Clear every computation cache")
+def clear():
+    for cache in CACHES.values():
+        cache.clear()
+    block_cache.clear()
+    # Los workers vacían las suyas antes de su siguiente tarea
+    compute_pool.clear_caches()
+    return {"cleared": list(CACHES) + ["population_blocks"]}
@@ -0,0 +1,33 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from services.compute_pool import compute_pool
+from services.upstream import upstream
+from services.warmup import warmup
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/health", response_model=dict[str, str],
+            summary="Liveness: the process is up")
+def health():
+    return {"status": "ok"}
+
+
+@router.get("/ready", response_model=dict,
+            summary="Readiness: which subsystems are warm (503 until the required ones are)")
+def ready():
+    status = warmup.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@router.get("/upstream/stats", response_model=dict,
+            summary="Latency histograms, retries and circuit state per upstream host")
+def upstream_stats():
+    return upstream.stats()
+
+
+@router.get("/compute/stats", response_model=dict,
+            summary="Compute pool workers, in-flight tasks, rejections (429) and timeouts (504)")
+def compute_stats():
+    return compute_pool.stats()
@@ -1,7 +1,10 @@
-from fastapi import APIRouter
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
-from services.horizons_service import get_orbit_elements
-import time
+from services.horizons_service import get_orbit_elements, get_many_orbit_elements, get_elements_series
+from services.upstream import UpstreamUnavailable
+
 router = APIRouter(
     prefix="/horizons",
     tags=["horizons"]
@@ -21,11 +24,52 @@ class OrbitResponse(BaseModel):
     epoch_jd : float # epoca
 
 
-# routers/horizons_router.py (lo que ya tienes)
-@router.get("/earth", response_model=OrbitResponse)
-async def earth_orbit():
-    #time.sleep(1)
-    data_dicc = await get_orbit_elements(command="399", center="10")
+class BodiesResponse(BaseModel):
+    bodies: Dict[str, OrbitResponse]
+    errors: Dict[str, str]   # cuerpos que Horizons no pudo resolver
+
+
+class SeriesResponse(BaseModel):
+    body: str
+    epoch_jd: List[float]
+    A: List[float]
+    E: List[float]
+    IN: List[float]
+    OM: List[float]
+    W: List[float]
+    M0: List[float]
+    PR: List[float]
+    N: List[float]
+
+
+SERIES_MAX_STEPS = 10000
+
+
+# nombre -> (COMMAND, CENTER) de Horizons; por defecto /bodies devuelve todos
+BODIES = {
+    "mercury": ("199", "10"),
+    "venus": ("299", "10"),
+    "earth": ("399", "10"),
+    "moon": ("301", "399"),
+    "mars": ("499", "10"),
+    "jupiter": ("599", "10"),
+    "saturn": ("699", "10"),
+    "uranus": ("799", "10"),
+    "neptune": ("899", "10"),
+    "pluto": ("999", "10"),
+}
+_BODY_BY_COMMAND = {command: name for name, (command, _) in BODIES.items()}
+
+
+def _body(body_id: str) -> str:
+    name = body_id.strip().lower()
+    name = _BODY_BY_COMMAND.get(name, name)
+    if name not in BODIES:
+        raise HTTPException(status_code=422, detail=f"Unknown body '{body_id}'")
+    return name
+
+
+def orbit_response(data_dicc: dict) -> OrbitResponse:
     return OrbitResponse(A=data_dicc['A'],
                          E=data_dicc['EC'],
                          IN=data_dicc['IN'],
@@ -36,128 +80,91 @@ async def earth_orbit():
                          N = data_dicc['N'],
                          epoch_jd=data_dicc['JDTDB'])
 
+
+@router.get("/bodies", response_model=BodiesResponse,
+            summary="Orbital elements of several bodies in one request")
+async def bodies_orbits(ids: Optional[List[str]] = Query(
+        None, description="Body names (earth, moon...) or Horizons IDs (399, 301...); default: planets, Moon and Pluto")):
+    requested = {}
+    for body_id in ids or list(BODIES):
+        name = _body(body_id)
+        requested[name] = BODIES[name]
+
+    results = await get_many_orbit_elements(requested)
+    bodies, errors = {}, {}
+    for name, data_dicc in results.items():
+        if isinstance(data_dicc, Exception):
+            errors[name] = f"{type(data_dicc).__name__}: {data_dicc}"
+        else:
+            bodies[name] = orbit_response(data_dicc)
+    return BodiesResponse(bodies=bodies, errors=errors)
+
+
+@router.get("/series", response_model=SeriesResponse,
+            summary="Orbital elements of one body at several epochs")
+async def body_series(id: str = Query(..., description="Body name (earth, moon...) or Horizons ID"),
+                      start_jd: float = Query(..., description="First epoch (JD TDB)"),
+                      step_days: float = Query(1.0, gt=0),
+                      steps: int = Query(30, ge=1, le=SERIES_MAX_STEPS)):
+    name = _body(id)
+    # Una consulta TLIST (por cada HORIZONS_TLIST_MAX épocas) y un único parseo
+    epochs = [start_jd + k * step_days for k in range(steps)]
+    try:
+        table = await get_elements_series(*BODIES[name], epochs)
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return SeriesResponse(body=name, epoch_jd=table["JDTDB"].tolist(),
+                          A=table["A"].tolist(), E=table["EC"].tolist(),
+                          IN=table["IN"].tolist(), OM=table["OM"].tolist(),
+                          W=table["W"].tolist(), M0=table["MA"].tolist(),
+                          PR=table["PR"].tolist(), N=table["N"].tolist())
+
+
+async def body_orbit(name: str) -> OrbitResponse:
+    # Endpoints por cuerpo: mismos (COMMAND, CENTER) que /bodies
+    try:
+        data_dicc = await get_orbit_elements(*BODIES[name])
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return orbit_response(data_dicc)
+
+
+@router.get("/earth", response_model=OrbitResponse)
+async def earth_orbit():
+    return await body_orbit("earth")
+
 @router.get("/moon", response_model=OrbitResponse)
 async def moon_orbit():
-    #time.sleep(1)
-    data_dicc = await get_orbit_elements(command="301", center="399")
-    return OrbitResponse(A=data_dicc['A'],
-                         E=data_dicc['EC'],
-                         IN=data_dicc['IN'],
-                         OM=data_dicc['OM'],
-                         W=data_dicc['W'],
-                         M0=data_dicc['MA'],
-                         PR=data_dicc['PR'],
-                         N = data_dicc['N'],
-                         epoch_jd=data_dicc['JDTDB'])
+    return await body_orbit("moon")
 
 @router.get("/mercury", response_model=OrbitResponse)
 async def mercury_orbit():
-    #time.sleep(1)
-    data_dicc = await get_orbit_elements(command="199", center="10")
-    return OrbitResponse(A=data_dicc['A'],
-                         E=data_dicc['EC'],
-                         IN=data_dicc['IN'],
-                         OM=data_dicc['OM'],
-                         W=data_dicc['W'],
-                         M0=data_dicc['MA'],
-                         PR=data_dicc['PR'],
-                         N = data_dicc['N'],
-                         epoch_jd=data_dicc['JDTDB'])
+    return await body_orbit("mercury")
 
 @router.get("/venus", response_model=OrbitResponse)
 async def venus_orbit():
-    #time.sleep(1)
-    data_dicc = await get_orbit_elements(command="299", center="10")
-    return OrbitResponse(A=data_dicc['A'],
-                         E=data_dicc['EC'],
-                         IN=data_dicc['IN'],
-                         OM=data_dicc['OM'],
-                         W=data_dicc['W'],
-                         M0=data_dicc['MA'],
-                         PR=data_dicc['PR'],
-                         N = data_dicc['N'],
-                         epoch_jd=data_dicc['JDTDB'])
+    return await body_orbit("venus")
 
 @router.get("/mars", response_model=OrbitResponse)
 async def mars_orbit():
-    #time.sleep(1)
-    data_dicc = await get_orbit_elements(command="499", center="10")
-    return OrbitResponse(A=data_dicc['A'],
-                         E=data_dicc['EC'],
-                         IN=data_dicc['IN'],
-                         OM=data_dicc['OM'],
-                         W=data_dicc['W'],
-                         M0=data_dicc['MA'],
-                         PR=data_dicc['PR'],
-                         N = data_dicc['N'],
-                         epoch_jd=data_dicc['JDTDB'])
+    return await body_orbit("mars")
 
 @router.get("/jupiter", response_model=OrbitResponse)
 async def jupiter_orbit():
-    #time.sleep(1)
-    data_dicc = await get_orbit_elements(command="599", center="10")
-    return OrbitResponse(A=data_dicc['A'],
-                         E=data_dicc['EC'],
-                         IN=data_dicc['IN'],
-                         OM=data_dicc['OM'],
-                         W=data_dicc['W'],
-                         M0=data_dicc['MA'],
-                         PR=data_dicc['PR'],
-                         N = data_dicc['N'],
-                         epoch_jd=data_dicc['JDTDB'])
+    return await body_orbit("jupiter")
 
 @router.get("/saturn", response_model=OrbitResponse)
 async def saturn_orbit():
-    #time.sleep(1)
-    data_dicc = await get_orbit_elements(command="699", center="10")
-    return OrbitResponse(A=data_dicc['A'],
-                         E=data_dicc['EC'],
-                         IN=data_dicc['IN'],
-                         OM=data_dicc['OM'],
-                         W=data_dicc['W'],
-                         M0=data_dicc['MA'],
-                         PR=data_dicc['PR'],
-                         N = data_dicc['N'],
-                         epoch_jd=data_dicc['JDTDB'])
+    return await body_orbit("saturn")
 
 @router.get("/uranus", response_model=OrbitResponse)
 async def uranus_orbit():
-    #time.sleep(1)
-    data_dicc = await get_orbit_elements(command="799", center="10")
-    return OrbitResponse(A=data_dicc['A'],
-                         E=data_dicc['EC'],
-                         IN=data_dicc['IN'],
-                         OM=data_dicc['OM'],
-                         W=data_dicc['W'],
-                         M0=data_dicc['MA'],
-                         PR=data_dicc['PR'],
-                         N = data_dicc['N'],
-                         epoch_jd=data_dicc['JDTDB'])
+    return await body_orbit("uranus")
 
 @router.get("/neptune", response_model=OrbitResponse)
 async def neptune_orbit():
-    #time.sleep(1)
-    data_dicc = await get_orbit_elements(command="899", center="10")
-    return OrbitResponse(A=data_dicc['A'],
-                         E=data_dicc['EC'],
-                         IN=data_dicc['IN'],
-                         OM=data_dicc['OM'],
-                         W=data_dicc['W'],
-                         M0=data_dicc['MA'],
-                         PR=data_dicc['PR'],
-                         N = data_dicc['N'],
-                         epoch_jd=data_dicc['JDTDB'])
+    return await body_orbit("neptune")
 
 @router.get("/pluto", response_model=OrbitResponse)
 async def pluto_orbit():
-    #time.sleep(1)
-    data_dicc = await get_orbit_elements(command="999", center="10")
-    return OrbitResponse(A=data_dicc['A'],
-                         E=data_dicc['EC'],
-                         IN=data_dicc['IN'],
-                         OM=data_dicc['OM'],
-                         W=data_dicc['W'],
-                         M0=data_dicc['MA'],
-                         PR=data_dicc['PR'],
-                         N = data_dicc['N'],
-                         epoch_jd=data_dicc['JDTDB'])
\ No newline at end of file
+    return await body_orbit("pluto")
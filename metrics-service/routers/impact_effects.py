@@ -1,6 +1,139 @@
-from fastapi import APIRouter 
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from models.impact_models import (BatchSummaryRequest, BatchSummaryResponse,
+                                  RadialProfileRequest, RadialProfileResponse,
+                                  MonteCarloRequest, MonteCarloResponse, DamageGridRequest)
+from services.impact_metrics import ImpactMetrics, Asteroid, Atmosphere, Target, ImpactScenario
+from services.impact_metrics_vec import VectorizedImpactMetrics
+from services.impact_montecarlo import Distribution, MonteCarloInputs, run_monte_carlo
+from services import damage_grid
+from services.compute_pool import compute_pool
 
 router = APIRouter(
     prefix="/effects",
     tags=["effects"]
-)
\ No newline at end of file
+)
+
+@router.post("/summarize_batch", response_model=BatchSummaryResponse,
+             summary="Summarize impact effects for many scenarios")
+def summarize_batch(payload: BatchSummaryRequest):
+    # Todos los escenarios se evalúan juntos en el motor vectorizado
+    asteroids = [Asteroid(**s.asteroid.model_dump()) for s in payload.scenarios]
+    scenarios = [ImpactScenario(**s.scenario.model_dump()) for s in payload.scenarios]
+    targets = [Target(**s.target.model_dump()) for s in payload.scenarios]
+    atms = [Atmosphere(**s.atmosphere.model_dump()) for s in payload.scenarios]
+
+    try:
+        summaries = VectorizedImpactMetrics.summarize_many(asteroids, scenarios, targets, atms)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return BatchSummaryResponse(summaries=summaries)
+
+
+@router.post("/profile", response_model=RadialProfileResponse,
+             summary="Radial profile of thermal fluence, overpressure and visible fireball")
+def radial_profile(payload: RadialProfileRequest):
+    # Con malla fija r_min_km/r_max_km no se usan: solo se validan sin ella
+    if payload.r_km is not None:
+        if min(payload.r_km, default=1.0) <= 0:
+            raise HTTPException(status_code=422, detail="Radii must be positive")
+    elif payload.r_min_km <= 0 or payload.r_min_km >= payload.r_max_km:
+        raise HTTPException(status_code=422, detail="Radii must be positive and r_min_km < r_max_km")
+
+    asteroid = Asteroid(**payload.asteroid.model_dump())
+    E = ImpactMetrics.kinetic_energy(asteroid)
+    profile = VectorizedImpactMetrics.radial_profile(
+        E, payload.atmosphere.burst_altitude_m,
+        r_km=payload.r_km, r_min_km=payload.r_min_km, r_max_km=payload.r_max_km,
+        max_points=payload.max_points,
+    )
+    return RadialProfileResponse(
+        E_joules=profile["E_joules"],
+        fireball_radius_m=profile["fireball_radius_m"],
+        duration_s=profile["duration_s"],
+        r_km=profile["r_km"].tolist(),
+        fluence_Jm2=profile["fluence_Jm2"].tolist(),
+        overpressure_Pa=profile["overpressure_Pa"].tolist(),
+        horizon_fraction=profile["horizon_fraction"].tolist(),
+    )
+
+
+@router.post("/montecarlo", response_model=MonteCarloResponse,
+             summary="Percentile bands of impact effects under input uncertainty")
+async def monte_carlo(payload: MonteCarloRequest):
+    def dist(params):
+        return None if params is None else Distribution(params.kind, params.a, params.b)
+
+    inputs = MonteCarloInputs(
+        velocity_mps=dist(payload.velocity_mps),
+        density_kgm3=dist(payload.density_kgm3),
+        diameter_m=dist(payload.diameter_m),
+        h_magnitude=dist(payload.h_magnitude),
+        albedo=dist(payload.albedo),
+        porosity=dist(payload.porosity),
+        shape_factor=dist(payload.shape_factor),
+        burst_altitude_m=dist(payload.burst_altitude_m),
+        target_density_kgm3=payload.target_density_kgm3,
+        water_depth_m=payload.water_depth_m,
+    )
+    # Hasta MAX_SAMPLES muestras: va al pool, con su control de admisión (429)
+    try:
+        result = await compute_pool.run(run_monte_carlo, inputs, payload.n_samples, payload.seed)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return MonteCarloResponse(**result)
+
+
+@router.post("/grid", summary="Damage field on a lon/lat grid around the impact point",
+             response_class=StreamingResponse,
+             description="""
+                Streams a float32 row-major grid (north to south) of the requested
+                quantity. Grid shape and lon/lat bounds are returned in the
+                X-Grid-Width, X-Grid-Height and X-Grid-Bounds headers.
+                """)
+async def damage_field_grid(payload: DamageGridRequest):
+    if payload.radius_km <= 0 or payload.width <= 0 or payload.height <= 0:
+        raise HTTPException(status_code=422, detail="radius_km, width and height must be positive")
+    if payload.width * payload.height > damage_grid.MAX_GRID_CELLS:
+        raise HTTPException(status_code=422, detail="Grid too large")
+
+    E = ImpactMetrics.kinetic_energy(Asteroid(**payload.asteroid.model_dump()))
+    atm = Atmosphere(**payload.atmosphere.model_dump())
+    args = (E, atm, payload.lon, payload.lat, payload.radius_km,
+            payload.width, payload.height, payload.quantity)
+    meta = damage_grid.grid_metadata(payload.lon, payload.lat, payload.radius_km,
+                                     payload.width, payload.height)
+    headers = {
+        "X-Grid-Width": str(meta["width"]),
+        "X-Grid-Height": str(meta["height"]),
+        "X-Grid-Bounds": ",".join(f"{v:.8f}" for v in meta["bounds"]),
+    }
+
+    # Bloques en paralelo en los workers, emitidos en orden; una plaza del pool por
+    # bloque, así que si está lleno el 429 llega antes de empezar a emitir
+    blocks = compute_pool.map_ordered(
+        damage_grid.grid_block_bytes,
+        ((*args, start) for start in range(0, payload.height, damage_grid.GRID_BLOCK_ROWS)))
+
+    return StreamingResponse(blocks, media_type="application/octet-stream", headers=headers)
+
+
+@router.get("/tiles/{quantity}/{z}/{x}/{y}.png", summary="Damage field as a Web Mercator PNG tile",
+            response_class=Response,
+            description="""
+                Single-band 8-bit PNG: 0 is transparent (below range), 1..255 map
+                log10(value) linearly over the quantity's range (X-Log10-Range header).
+                """)
+async def damage_field_tile(quantity: str, z: int, x: int, y: int,
+                      lat: float, lon: float, E_joules: float = Query(..., gt=0),
+                      burst_altitude_m: float = 0.0, k_atenuacion: float = 0.1):
+    if quantity not in damage_grid.QUANTITIES:
+        raise HTTPException(status_code=404, detail=f"Unknown quantity: {quantity}")
+    atm = Atmosphere(k_atenuacion, burst_altitude_m)
+    try:
+        png = await compute_pool.run(damage_grid.render_tile_png, E_joules, atm, lon, lat, z, x, y, quantity)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    vmin, vmax = damage_grid.PNG_LOG_RANGE[quantity]
+    return Response(content=png, media_type="image/png",
+                    headers={"X-Log10-Range": f"{vmin},{vmax}"})
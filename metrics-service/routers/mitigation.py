@@ -1,6 +1,9 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from models.mitigation_models import MitigationRequest, MitigationResponse
 from services.mitigation_metrics import MitigationMetrics
+from services.kepler import elements_array
+from services.screening_service import nominal_miss
+from services.upstream import UpstreamUnavailable
 import math
 
 router = APIRouter(
@@ -10,7 +13,23 @@ router = APIRouter(
 
 @router.post("/recommend", response_model=MitigationResponse,
              summary="Recommend mitigation strategy for asteroid deflection")
-def recommend_strategy(payload: MitigationRequest):
+async def recommend_strategy(payload: MitigationRequest):
+    encounter_epoch_jd = None
+    if payload.orbit is not None and "miss_km" not in payload.model_fields_set:
+        # Distancia nominal calculada con la órbita en vez de supuesta
+        try:
+            nominal = await nominal_miss(elements_array([payload.orbit]), max(payload.leadYears, 1.0))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"leadYears too long for the orbit search: {e}")
+        except UpstreamUnavailable as e:
+            # Sin la órbita terrestre no hay distancia nominal: mejor 503 que suponer miss_km
+            raise HTTPException(status_code=503, detail=f"Horizons unavailable (Earth orbit): {e}")
+        if nominal is not None:
+            update = {"miss_km": nominal["miss_km"]}
+            if nominal["v_rel_kms"] is not None and "vRel_kms" not in payload.model_fields_set:
+                update["vRel_kms"] = nominal["v_rel_kms"]
+            payload = payload.model_copy(update=update)
+            encounter_epoch_jd = nominal["epoch_jd"]
 
     metrics = MitigationMetrics(
         D_m=payload.D_m,
@@ -73,6 +92,7 @@ def recommend_strategy(payload: MitigationRequest):
         confidence=confidence,
         scores=scores,
         miss_nominal_km=payload.miss_km,
+        encounter_epoch_jd=encounter_epoch_jd,
         miss_after_mitigation_km=round(miss_new/1000, 1),
         suggested={
             "dv_mps": dv_need,
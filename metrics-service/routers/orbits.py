@@ -0,0 +1,94 @@
+import numpy as np
+from fastapi import APIRouter, HTTPException, Response
+
+from models.orbit_models import PropagationRequest, ScreeningRequest, ScreeningResponse
+from services import kepler
+from services.compute_pool import compute_pool
+from services.sbdb_catalog import get_catalog
+from services.screening_service import SCREEN_CHUNK, chunked, jd_now, screen_elements
+from services.upstream import UpstreamUnavailable
+
+router = APIRouter(
+    prefix="/orbits",
+    tags=["orbits"]
+)
+
+
+@router.post("/propagate", summary="Heliocentric positions of many bodies at many epochs",
+             response_class=Response,
+             description="""
+                Returns little-endian float32 positions (AU, ecliptic J2000) packed
+                as [body][epoch][x, y, z]. Shape in the X-Bodies and X-Epochs headers.
+                """)
+async def propagate(payload: PropagationRequest):
+    if payload.epochs_jd is not None:
+        epochs = np.asarray(payload.epochs_jd, dtype=np.float64)
+    elif None not in (payload.start_jd, payload.step_days, payload.steps):
+        epochs = payload.start_jd + payload.step_days * np.arange(payload.steps)
+    else:
+        raise HTTPException(status_code=422, detail="Give epochs_jd or start_jd, step_days and steps")
+    if epochs.size == 0:
+        raise HTTPException(status_code=422, detail="No epochs")
+    if len(payload.bodies) * epochs.size > kepler.MAX_PROPAGATION_PAIRS:
+        raise HTTPException(status_code=422, detail="Too many body/epoch pairs")
+
+    for k, body in enumerate(payload.bodies):
+        parabolic = abs(body.e - 1.0) < kepler.PARABOLIC_TOL
+        if body.q is None and (parabolic or body.a is None or body.a == 0):
+            raise HTTPException(status_code=422,
+                                detail=f"Body {k}: needs a (or q){'; q for e = 1' if parabolic else ''}")
+
+    elements = kepler.elements_array(payload.bodies)
+    data = await compute_pool.run(kepler.propagate_bytes, elements, epochs)
+    return Response(content=data, media_type="application/octet-stream",
+                    headers={"X-Bodies": str(len(payload.bodies)), "X-Epochs": str(epochs.size)})
+
+
+@router.post("/screen", response_model=ScreeningResponse,
+             summary="Earth MOID and close approaches of many bodies")
+async def screen(payload: ScreeningRequest):
+    catalog = get_catalog()
+    if (payload.sstr or payload.catalog) and catalog is None:
+        raise HTTPException(status_code=422, detail="No local small-body catalog ingested")
+
+    # Bloques de cuerpos y sus nombres: explícitos, por nombre y catálogo completo
+    chunks, names = [], []
+    if payload.bodies:
+        chunks.append(kepler.elements_array(payload.bodies))
+        names += [f"body {k}" for k in range(len(payload.bodies))]
+    if payload.sstr:
+        rows = [catalog.find(s) for s in payload.sstr]
+        unknown = [s for s, row in zip(payload.sstr, rows) if row is None]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Not in catalog: {unknown}")
+        chunks.append(catalog.elements(rows))
+        names += [catalog.full_name[row].decode() for row in rows]
+    if not chunks and not payload.catalog:
+        raise HTTPException(status_code=422, detail="Give bodies, sstr or catalog=true")
+
+    def all_chunks():
+        for chunk in chunks:
+            yield from chunked(chunk)
+        if payload.catalog:
+            # El catálogo se lee por bloques del mmap: nunca entero en memoria
+            for start in range(0, len(catalog), SCREEN_CHUNK):
+                yield catalog.elements(np.arange(start, min(start + SCREEN_CHUNK, len(catalog))))
+
+    start_jd = payload.start_jd if payload.start_jd is not None else jd_now()
+    stop_jd = start_jd + 365.25 * payload.years
+    try:
+        hits = await screen_elements(all_chunks(), start_jd, stop_jd, payload.step_days,
+                                     payload.moid_max_au, payload.approach_max_au)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"Horizons unavailable (Earth orbit): {e}")
+
+    def name(index):
+        if index < len(names):
+            return names[index]
+        return catalog.full_name[index - len(names)].decode(errors="replace")
+
+    screened = len(names) + (len(catalog) if payload.catalog else 0)
+    return ScreeningResponse(start_jd=start_jd, stop_jd=stop_jd, screened=screened,
+                             results=[{**hit, "name": name(hit["index"])} for hit in hits[:payload.max_results]])
@@ -1,7 +1,11 @@
 from fastapi import APIRouter
-from pydantic import BaseModel
+from typing import List, Optional
 
-from services.population_service import estimate_population
+from pydantic import BaseModel, Field
+
+from services.compute_pool import compute_pool
+from services.population_service import (compute_population_detail, estimate_population_detail,
+                                         estimate_population_rings)
 
 router = APIRouter(
     prefix="/population",
@@ -19,21 +23,56 @@ class PopulationResponse(BaseModel):
     lon: float
     radius_m: float
     population_estimate: float
+    error_estimate: Optional[float] = None
+    resolution_m: Optional[float] = None
+
+class PopulationRingsRequest(BaseModel):
+    lat: float
+    lon: float
+    radii_m: List[float] = Field(..., min_length=1, max_length=64)
+
+class PopulationRing(BaseModel):
+    radius_m: float
+    population: int
+    ring_population: int
+
+class PopulationRingsResponse(BaseModel):
+    lat: float
+    lon: float
+    rings: List[PopulationRing]
 
 
 @router.post("/estimate", response_model=PopulationResponse,
             summary="Estimate population within a circle",
             description="""
                 Returns the estimated population within a circle defined by
-                latitude/longitude/radius in meters.
+                latitude/longitude/radius in meters, the resolution of the
+                population level used and an estimate of its error.
                 Coordinates are in WGS84.
                 """
             )
-def population(payload: PopulationRequest):
-    pop_est = estimate_population(payload.lon, payload.lat, payload.radius_m)
+async def population(payload: PopulationRequest):
+    # La memoización vive en este proceso: los aciertos no pasan por el pool
+    pop_est = await compute_pool.run_memoized(estimate_population_detail, compute_population_detail,
+                                              payload.lon, payload.lat, payload.radius_m)
     return PopulationResponse(
         lat=payload.lat,
         lon=payload.lon,
         radius_m=payload.radius_m,
-        population_estimate=pop_est,
-    )
\ No newline at end of file
+        population_estimate=pop_est["population"],
+        error_estimate=pop_est["error_estimate"],
+        resolution_m=pop_est["resolution_m"],
+    )
+
+
+@router.post("/rings", response_model=PopulationRingsResponse,
+            summary="Estimate population inside several concentric circles",
+            description="""
+                Returns, for each radius (ascending), the population inside the
+                circle and inside the ring between it and the previous radius.
+                The raster is read once for all radii. Coordinates are in WGS84.
+                """
+            )
+async def population_rings(payload: PopulationRingsRequest):
+    rings = await compute_pool.run(estimate_population_rings, payload.lon, payload.lat, payload.radii_m)
+    return PopulationRingsResponse(lat=payload.lat, lon=payload.lon, rings=rings)
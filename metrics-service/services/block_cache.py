@@ -0,0 +1,110 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+
+# --- CONFIG ---
+BLOCK_CACHE_MB = int(os.getenv("POPULATION_BLOCK_CACHE_MB", "256"))   # 0 = disabled
+BLOCK_SIZE = int(os.getenv("POPULATION_BLOCK_SIZE", "512"))           # cells per cached block side
+
+
+class BlockCache:
+    ''' LRU cache of decoded raster blocks, keyed by (raster path, block row, block col)
+        and bounded by total bytes.
+
+        Windows are assembled by copying each overlapping block slice straight into
+        the output array, so a query over hot blocks does no disk I/O or decompression.
+    '''
+
+    def __init__(self, max_bytes: int = BLOCK_CACHE_MB * 1024 * 1024, block_size: int = BLOCK_SIZE):
+        self.max_bytes = max_bytes
+        self.block_size = block_size
+        self._blocks: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _load(self, src: rasterio.io.DatasetReader, brow: int, bcol: int) -> np.ndarray:
+        b = self.block_size
+        row0, col0 = brow * b, bcol * b
+        window = Window(col0, row0, min(b, src.width - col0), min(b, src.height - row0))
+        block = src.read(1, window=window)
+        block.flags.writeable = False
+        return block
+
+    def block(self, src: rasterio.io.DatasetReader, brow: int, bcol: int) -> np.ndarray:
+        ''' Decoded block (read-only), from the cache or read through src. '''
+        key = (src.name, brow, bcol)
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is not None:
+                self._blocks.move_to_end(key)
+                self.hits += 1
+                return block
+            self.misses += 1
+
+        # Read outside the lock: other threads keep hitting the cache meanwhile
+        block = self._load(src, brow, bcol)
+        if block.nbytes > self.max_bytes:
+            return block
+        with self._lock:
+            if key not in self._blocks:
+                self._blocks[key] = block
+                self.nbytes += block.nbytes
+                while self.nbytes > self.max_bytes:
+                    _, old = self._blocks.popitem(last=False)
+                    self.nbytes -= old.nbytes
+                    self.evictions += 1
+        return block
+
+    def read(self, src: rasterio.io.DatasetReader, window: Window) -> np.ndarray:
+        ''' Band 1 of src over window, like src.read(1, window=window, boundless=True);
+            cells outside the raster get nodata (0 if the raster has none).
+        '''
+        if self.max_bytes <= 0:
+            return src.read(1, window=window, boundless=True)
+        row0, col0 = int(window.row_off), int(window.col_off)
+        nrows, ncols = int(window.height), int(window.width)
+        fill = src.nodata if src.nodata is not None else 0
+        out = np.full((nrows, ncols), fill, dtype=src.dtypes[0])
+
+        b = self.block_size
+        r_lo, r_hi = max(row0, 0), min(row0 + nrows, src.height)
+        c_lo, c_hi = max(col0, 0), min(col0 + ncols, src.width)
+        for brow in range(r_lo // b, (r_hi - 1) // b + 1) if r_hi > r_lo else ():
+            for bcol in range(c_lo // b, (c_hi - 1) // b + 1) if c_hi > c_lo else ():
+                block = self.block(src, brow, bcol)
+                # Overlap of block and window, in raster indices
+                ra, rb = max(r_lo, brow * b), min(r_hi, brow * b + block.shape[0])
+                ca, cb = max(c_lo, bcol * b), min(c_hi, bcol * b + block.shape[1])
+                out[ra - row0:rb - row0, ca - col0:cb - col0] = \
+                    block[ra - brow * b:rb - brow * b, ca - bcol * b:cb - bcol * b]
+        return out
+
+    def clear(self) -> None:
+        with self._lock:
+            self._blocks.clear()
+            self.nbytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "blocks": len(self._blocks),
+                "bytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "block_size": self.block_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+block_cache = BlockCache()
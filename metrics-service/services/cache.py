@@ -0,0 +1,231 @@
+import copy
+import functools
+import hashlib
+import math
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import fields, is_dataclass
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# --- CONFIG ---
+CACHE_MAXSIZE = int(os.getenv("METRICS_CACHE_MAXSIZE", "1024"))      # entradas por caché
+CACHE_TTL_S = float(os.getenv("METRICS_CACHE_TTL_S", "3600"))         # 0 = sin caducidad
+CACHE_SIG_DIGITS = int(os.getenv("METRICS_CACHE_SIG_DIGITS", "6"))    # cifras significativas de la clave
+CACHE_SHARED_PATH = os.getenv("METRICS_CACHE_PATH")                   # SQLite compartido entre workers
+
+_MISSING = object()
+
+
+def quantize(value: Any, sig: int = CACHE_SIG_DIGITS) -> Hashable:
+    ''' Canonical, hashable form of value with floats rounded to `sig` significant digits.
+        Dataclasses, pydantic models and dicts become sorted (name, value) tuples.
+    '''
+    if isinstance(value, bool) or value is None or isinstance(value, (int, str)):
+        return value
+    if isinstance(value, float):
+        if value == 0.0 or not math.isfinite(value):
+            return value
+        return float(f"{value:.{sig}g}")
+    if is_dataclass(value):
+        return (type(value).__name__,) + tuple(
+            (f.name, quantize(getattr(value, f.name), sig)) for f in fields(value))
+    if hasattr(value, "model_dump"):
+        return (type(value).__name__, quantize(value.model_dump(), sig))
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), quantize(v, sig)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(quantize(v, sig) for v in value)
+    if hasattr(value, "item"):  # escalar numpy
+        return quantize(value.item(), sig)
+    return repr(value)
+
+
+class SharedStore:
+    ''' File-backed (SQLite) key/value store so several uvicorn workers share results. '''
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+
+    @staticmethod
+    def _key(namespace: str, key: Hashable) -> str:
+        return namespace + ":" + hashlib.sha1(repr(key).encode()).hexdigest()
+
+    def get(self, namespace: str, key: Hashable) -> Any:
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires FROM cache WHERE key = ?",
+                                     (self._key(namespace, key),)).fetchone()
+        if row is None or (row[1] and row[1] < time.time()):
+            return _MISSING
+        return pickle.loads(row[0])
+
+    def set(self, namespace: str, key: Hashable, value: Any, ttl: float) -> None:
+        expires = time.time() + ttl if ttl else None
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                               (self._key(namespace, key), pickle.dumps(value), expires))
+
+    def clear(self, namespace: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache WHERE key LIKE ?", (namespace + ":%",))
+
+
+class TTLCache:
+    ''' Thread-safe in-process LRU cache with per-entry TTL, hit/miss counters and
+        an optional SharedStore behind it.
+    '''
+
+    def __init__(self, name: str, maxsize: int = CACHE_MAXSIZE, ttl: float = CACHE_TTL_S,
+                 shared: Optional[SharedStore] = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared = shared
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+
+        if self.shared is not None:
+            value = self.shared.get(self.name, key)
+            if value is not _MISSING:
+                self._put_local(key, value)
+                with self._lock:
+                    self.shared_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return _MISSING
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._put_local(key, value)
+        if self.shared is not None:
+            self.shared.set(self.name, key, value, self.ttl)
+
+    def _put_local(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+        if self.shared is not None:
+            self.shared.clear(self.name)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+            }
+
+
+# --- Registro de cachés ---
+_shared_store = SharedStore(CACHE_SHARED_PATH) if CACHE_SHARED_PATH else None
+CACHES: Dict[str, TTLCache] = {}
+
+
+def get_cache(name: str, maxsize: Optional[int] = None, ttl: Optional[float] = None,
+              shared: Optional[SharedStore] = None) -> TTLCache:
+    if name not in CACHES:
+        CACHES[name] = TTLCache(name,
+                                maxsize=CACHE_MAXSIZE if maxsize is None else maxsize,
+                                ttl=CACHE_TTL_S if ttl is None else ttl,
+                                shared=shared or _shared_store)
+    return CACHES[name]
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: cache.stats() for name, cache in CACHES.items()}
+
+
+_SHARED_STAT_FIELDS = {"ttl_s", "block_size"}   # iguales en todos los procesos: no se suman
+
+
+def merge_cache_stats(reports: list) -> Dict[str, Any]:
+    ''' Combine the stats() of the same cache in several processes: counters and sizes
+        are summed, hit_rate is recomputed from the totals.
+    '''
+    merged: Dict[str, Any] = {}
+    for report in reports:
+        for k, v in report.items():
+            if k == "hit_rate":
+                continue
+            if k not in merged:
+                merged[k] = v
+            elif k not in _SHARED_STAT_FIELDS:
+                merged[k] += v
+    hits = merged.get("hits", 0) + merged.get("shared_hits", 0)
+    lookups = hits + merged.get("misses", 0)
+    merged["hit_rate"] = hits / lookups if lookups else 0.0
+    return merged
+
+
+def memoize(name: str, maxsize: Optional[int] = None, ttl: Optional[float] = None,
+            sig: int = CACHE_SIG_DIGITS) -> Callable:
+    ''' Cache a pure function's results keyed by its quantized arguments.
+        Mutable results are deep-copied on the way out so callers cannot alter the cache.
+    '''
+    def decorator(func: Callable) -> Callable:
+        cache = get_cache(name, maxsize, ttl)
+
+        def key(*args, **kwargs) -> Hashable:
+            return (quantize(args, sig), quantize(kwargs, sig))
+
+        def copy_out(value: Any) -> Any:
+            return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            k = key(*args, **kwargs)
+            value = cache.get(k)
+            if value is _MISSING:
+                value = func(*args, **kwargs)
+                cache.set(k, value)
+            return copy_out(value)
+
+        # Para quien consulta la caché por su cuenta (compute_pool.run_memoized)
+        wrapper.cache = cache
+        wrapper.key = key
+        wrapper.copy_out = copy_out
+        return wrapper
+
+    return decorator
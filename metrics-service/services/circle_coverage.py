@@ -0,0 +1,132 @@
+import numpy as np
+import shapely
+import shapely.geometry as geometry
+from rasterio.features import rasterize
+
+# The circle helpers work in pixel coordinates of a north-up raster with square cells:
+# cell (row, col) covers [col, col + 1) x [row, row + 1), and the circle center
+# (cx, cy) and radius are given in the same units (fractional columns/rows).
+# polygon_coverage takes a polygon in the raster CRS and the window transform.
+
+
+def row_spans(rows: np.ndarray, cx: float, cy: float, radius_px: float):
+    ''' Column spans of each row against the circle, from the chord widths.
+
+        Args:
+            rows (np.ndarray): Row indices
+            cx, cy (float): Circle center in pixel coordinates
+            radius_px (float): Circle radius in pixels
+
+        Returns:
+            tuple: (out0, in0, in1, out1) int64 arrays. Cells [in0, in1) are fully
+                inside the circle, cells [out0, in0) and [in1, out1) may straddle
+                the boundary, and everything else in the row is outside.
+    '''
+    rows = np.asarray(rows, dtype=np.int64)
+    # Minimum and maximum vertical distance from the center to each row
+    d_top, d_bottom = np.abs(rows - cy), np.abs(rows + 1 - cy)
+    dy_far = np.maximum(d_top, d_bottom)
+    dy_near = np.where((rows <= cy) & (cy <= rows + 1), 0.0, np.minimum(d_top, d_bottom))
+    w_in = np.sqrt(np.maximum(radius_px ** 2 - dy_far ** 2, 0.0))
+    w_out = np.sqrt(np.maximum(radius_px ** 2 - dy_near ** 2, 0.0))
+    has_in = radius_px > dy_far
+    has_out = radius_px > dy_near
+
+    out0 = np.where(has_out, np.floor(cx - w_out), 0).astype(np.int64)
+    out1 = np.where(has_out, np.ceil(cx + w_out), 0).astype(np.int64)
+    in0 = np.where(has_in, np.ceil(cx - w_in), out0).astype(np.int64)
+    in1 = np.maximum(np.where(has_in, np.floor(cx + w_in), out0).astype(np.int64), in0)
+    return out0, in0, in1, out1
+
+
+def _span_cells(rows: np.ndarray, start: np.ndarray, stop: np.ndarray):
+    # (row, col) of every cell in [start, stop) of each row, without a Python loop
+    length = np.maximum(stop - start, 0)
+    n = int(length.sum())
+    first = np.repeat(np.cumsum(length) - length, length)
+    return np.repeat(rows, length), np.repeat(start, length) + (np.arange(n) - first)
+
+
+def edge_cells(rows: np.ndarray, out0: np.ndarray, in0: np.ndarray,
+               in1: np.ndarray, out1: np.ndarray):
+    ''' (rows, cols) of the boundary cells described by row_spans. '''
+    r_left, c_left = _span_cells(rows, out0, in0)
+    r_right, c_right = _span_cells(rows, in1, out1)
+    return np.concatenate([r_left, r_right]), np.concatenate([c_left, c_right])
+
+
+def cell_fraction(er: np.ndarray, ec: np.ndarray, cx: float, cy: float,
+                  radius_px: float, superres: int) -> np.ndarray:
+    ''' Fraction of each cell covered by the circle, as the share of its
+        superres x superres sub-point centers inside it (1 sub-point = cell center).
+    '''
+    sub = (np.arange(superres) + 0.5) / superres
+    dx = (ec - cx)[:, None, None] + sub[None, None, :]
+    dy = (er - cy)[:, None, None] + sub[None, :, None]
+    return ((dx ** 2 + dy ** 2) <= radius_px ** 2).mean(axis=(1, 2))
+
+
+def circle_coverage(nrows: int, ncols: int, cx: float, cy: float,
+                    radius_px: float, superres: int = 1) -> np.ndarray:
+    ''' Fractional coverage [0..1] of each cell of an (nrows, ncols) window by a circle.
+
+        Interior cells are set to 1 one row slice at a time and exterior cells stay 0,
+        so only the cells that straddle the boundary (O(perimeter)) are evaluated.
+
+        Args:
+            nrows, ncols (int): Window shape
+            cx, cy (float): Circle center in window pixel coordinates
+            radius_px (float): Circle radius in pixels
+            superres (int): Sub-points per side used on boundary cells
+
+        Returns:
+            np.ndarray: float32 (nrows, ncols) coverage mask
+    '''
+    mask = np.zeros((nrows, ncols), dtype=np.float32)
+    if radius_px <= 0 or nrows <= 0 or ncols <= 0:
+        return mask
+
+    rows = np.arange(nrows)
+    out0, in0, in1, out1 = (np.clip(a, 0, ncols) for a in row_spans(rows, cx, cy, radius_px))
+    for r in np.nonzero(in1 > in0)[0]:
+        mask[r, in0[r]:in1[r]] = 1.0
+
+    er, ec = edge_cells(rows, out0, in0, in1, out1)
+    if er.size:
+        mask[er, ec] = cell_fraction(er, ec, cx, cy, radius_px, superres)
+    return mask
+
+
+def polygon_coverage(shape, nrows: int, ncols: int, transform, superres: int = 4) -> np.ndarray:
+    ''' Fractional coverage [0..1] of each cell of a window by an arbitrary polygon.
+
+        Cells whose center is inside and that the boundary does not touch count 1,
+        the rest 0; only cells touched by the boundary are refined, as the share of
+        their superres x superres sub-points inside the (prepared) polygon.
+
+        Args:
+            shape: shapely (Multi)Polygon in the raster CRS
+            nrows, ncols (int): Window shape
+            transform (Affine): Window transform
+            superres (int): Sub-points per side used on boundary cells
+
+        Returns:
+            np.ndarray: float32 (nrows, ncols) coverage mask
+    '''
+    mask = np.zeros((nrows, ncols), dtype=np.float32)
+    if shape.is_empty or nrows <= 0 or ncols <= 0:
+        return mask
+
+    mask[:] = rasterize([(geometry.mapping(shape), 1)], out_shape=(nrows, ncols),
+                        transform=transform, fill=0, dtype="uint8")
+    edge = rasterize([(geometry.mapping(shape.boundary), 1)], out_shape=(nrows, ncols),
+                     transform=transform, fill=0, all_touched=True, dtype="uint8")
+    er, ec = np.nonzero(edge)
+    if er.size:
+        sub = (np.arange(superres) + 0.5) / superres
+        px = transform.c + (ec[:, None, None] + sub[None, None, :]) * transform.a
+        py = transform.f + (er[:, None, None] + sub[None, :, None]) * transform.e
+        px, py = np.broadcast_arrays(px, py)
+        shapely.prepare(shape)
+        mask[er, ec] = shapely.contains_xy(shape, px, py).mean(axis=(1, 2))
+    return mask
@@ -0,0 +1,246 @@
+import math
+from typing import Dict, List
+
+import numpy as np
+
+from services.kepler import ELEMENTS_DTYPE, propagate
+
+# --- CONFIG ---
+AU_KM = 149_597_870.7
+MOID_GRID = 256           # puntos de la órbita del cuerpo en la búsqueda gruesa
+MOID_CANDIDATES = 4       # mínimos locales refinados por cuerpo
+MOID_REFINE_ITER = 16     # cada iteración divide la ventana por 4
+MOID_NEWTON_ITER = 6      # Newton del punto más cercano de la órbita terrestre
+MOID_R_CAP_AU = 3.0       # el tramo de órbita más allá no puede dar una MOID terrestre útil
+APPROACH_REFINE_ITER = 6  # cada iteración divide la ventana temporal por 8
+APPROACH_REFINE_POINTS = 17
+APPROACH_MAX_PAIRS = 4_000_000  # cuerpos x épocas muestreadas a la vez (bloques del eje temporal)
+
+
+def _rotation(el: np.ndarray) -> np.ndarray:
+    # Plano orbital -> eclíptica: Rz(Ω) Rx(i) Rz(ω); columnas = ejes P y Q, forma (B, 3, 2)
+    cO, sO = np.cos(el["om"]), np.sin(el["om"])
+    ci, si = np.cos(el["i"]), np.sin(el["i"])
+    cw, sw = np.cos(el["w"]), np.sin(el["w"])
+    P = np.stack([cO * cw - sO * sw * ci, sO * cw + cO * sw * ci, sw * si], axis=-1)
+    Q = np.stack([-cO * sw - sO * cw * ci, -sO * sw + cO * cw * ci, cw * si], axis=-1)
+    return np.stack([P, Q], axis=-1)
+
+
+def _perihelion(el: np.ndarray) -> np.ndarray:
+    return np.where(np.isnan(el["q"]), np.abs(el["a"]) * np.abs(1.0 - el["e"]), el["q"])
+
+
+def _points_true_anomaly(el: np.ndarray, R: np.ndarray, nu: np.ndarray) -> np.ndarray:
+    # Puntos de la órbita en anomalía verdadera nu (B, ...); válido para toda e
+    p = _perihelion(el) * (1.0 + el["e"])
+    shape = (-1,) + (1,) * (nu.ndim - 1)
+    r = p.reshape(shape) / (1.0 + el["e"].reshape(shape) * np.cos(nu))
+    xy = np.stack([r * np.cos(nu), r * np.sin(nu)], axis=-1)
+    return np.einsum("bij,b...j->b...i", R, xy)
+
+
+def _nu_limit(el: np.ndarray) -> np.ndarray:
+    # Rango de anomalía verdadera con r <= max(R_CAP, 1.5 q): toda la elipse si cabe
+    q, e = _perihelion(el), el["e"]
+    r_cap = np.maximum(MOID_R_CAP_AU, 1.5 * q)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cos_lim = (q * (1.0 + e) / r_cap - 1.0) / e
+    return np.where(np.isfinite(cos_lim), np.arccos(np.clip(cos_lim, -1.0, 1.0)), np.pi)
+
+
+def _earth_nearest(P: np.ndarray, ae: float, ee: float, Re: np.ndarray) -> np.ndarray:
+    # Distancia de los puntos P (..., 3) a la elipse de referencia: Newton sobre la anomalía
+    # excéntrica E, arrancando en la dirección de P proyectada en el plano (converge en pocas
+    # iteraciones para órbitas casi circulares como la terrestre)
+    local = P @ Re                                   # coordenadas en el plano de la elipse
+    px, py = local[..., 0], local[..., 1]
+    theta = np.arctan2(py, px)
+    E = 2.0 * np.arctan(math.sqrt((1.0 - ee) / (1.0 + ee)) * np.tan(0.5 * theta))
+    be = ae * math.sqrt(1.0 - ee * ee)
+    for _ in range(MOID_NEWTON_ITER):
+        cE, sE = np.cos(E), np.sin(E)
+        dx, dy = px - ae * (cE - ee), py - be * sE
+        # g(E) = |P - r(E)|^2 / 2: g' = -(d · r'), g'' = r'·r' - d · r''
+        g1 = dx * ae * sE - dy * be * cE
+        g2 = (ae * sE) ** 2 + (be * cE) ** 2 + dx * ae * cE + dy * be * sE
+        E = E - g1 / np.where(g2 > 0, g2, 1.0)
+    cE, sE = np.cos(E), np.sin(E)
+    dz2 = np.einsum("...i,...i->...", P, P) - px * px - py * py   # fuera del plano
+    return np.sqrt((px - ae * (cE - ee)) ** 2 + (py - be * sE) ** 2 + np.maximum(dz2, 0.0))
+
+
+def moid(bodies: np.ndarray, earth: np.ndarray) -> Dict[str, np.ndarray]:
+    '''
+    Distancia mínima entre órbitas (MOID) de cada cuerpo con la órbita de referencia.
+
+    Para cada punto de la órbita del cuerpo la distancia a la elipse de referencia se
+    resuelve con Newton (problema 1D interior); sobre la anomalía verdadera del cuerpo
+    se buscan los MOID_CANDIDATES mínimos locales más bajos de una malla y se refinan
+    con mallas encogidas. Todo vectorizado sobre los cuerpos; robusto también con
+    órbitas casi coincidentes con la de referencia.
+
+    Args:
+        bodies (np.ndarray): registros ELEMENTS_DTYPE, forma (B,)
+        earth (np.ndarray): registro ELEMENTS_DTYPE de la órbita de referencia (elíptica)
+
+    Returns:
+        dict: moid_au (B,), nu (anomalía verdadera del cuerpo en el mínimo, B)
+    '''
+    el = np.asarray(bodies, dtype=ELEMENTS_DTYPE)
+    ea = np.asarray(earth, dtype=ELEMENTS_DTYPE).reshape(1)
+    B = el.size
+    R = _rotation(el)
+    ae, ee = float(ea["a"][0]), float(ea["e"][0])
+    Re = _rotation(ea)[0]
+
+    def dist(nu):
+        return _earth_nearest(_points_true_anomaly(el, R, nu), ae, ee, Re)
+
+    nu_lim = _nu_limit(el)
+    full = nu_lim >= np.pi
+    k = np.arange(MOID_GRID)
+    nu0 = (-1.0 + 2.0 * k / MOID_GRID)[None, :] * nu_lim[:, None]          # (B, G)
+    d = dist(nu0)
+
+    # Mínimos locales; en órbitas cerradas la malla da la vuelta
+    prev, nxt = np.roll(d, 1, axis=1), np.roll(d, -1, axis=1)
+    prev[~full, 0] = np.inf
+    nxt[~full, -1] = np.inf
+    score = np.where((d <= prev) & (d <= nxt), d, np.inf)
+    n_cand = min(MOID_CANDIDATES, MOID_GRID)
+    cand = np.argpartition(score, n_cand - 1, axis=1)[:, :n_cand]            # (B, K)
+    valid = np.isfinite(np.take_along_axis(score, cand, axis=1))
+    cand = np.where(valid, cand, np.argmin(score, axis=1)[:, None])
+    nu = np.take_along_axis(nu0, cand, axis=1)
+
+    # Refinamiento: 9 puntos alrededor de cada candidato, ventana /4 por iteración
+    offs = np.linspace(-1.0, 1.0, 9)
+    half = (2.0 * nu_lim / MOID_GRID)[:, None, None]
+    lim = nu_lim[:, None, None]
+    for _ in range(MOID_REFINE_ITER):
+        grid = nu[:, :, None] + half * offs
+        grid = np.where(full[:, None, None], grid, np.clip(grid, -lim, lim))
+        dd = dist(grid)
+        nu = np.take_along_axis(grid, dd.argmin(axis=2)[..., None], axis=2)[..., 0]
+        half = half / 4.0
+
+    final = dist(nu)                                                         # (B, K)
+    best = final.argmin(axis=1)
+    rows = np.arange(B)
+    return {"moid_au": final[rows, best], "nu": nu[rows, best]}
+
+
+def _distances(el: np.ndarray, earth: np.ndarray, t: np.ndarray) -> np.ndarray:
+    # |r_cuerpo - r_tierra| en UA; t de forma (T,) común o (B, T) por cuerpo
+    if t.ndim == 1:
+        return np.linalg.norm(propagate(el, t) - propagate(earth, t)[0], axis=-1)
+    # Épocas distintas por cuerpo: se propaga el par (cuerpo, época) como un cuerpo por fila
+    B, T = t.shape
+    rep = np.repeat(el, T)
+    flat = t.reshape(-1)
+    body = _propagate_pairs(rep, flat)
+    ref = propagate(earth, flat)[0]
+    return np.linalg.norm(body - ref, axis=-1).reshape(B, T)
+
+
+def _propagate_pairs(el: np.ndarray, t: np.ndarray) -> np.ndarray:
+    # Cuerpo k en la época t[k]: se desplaza la época de los elementos y se propaga a 0
+    shifted = el.copy()
+    shifted["epoch_jd"] = el["epoch_jd"] - t
+    return propagate(shifted, np.zeros(1))[:, 0]
+
+
+def sampling_steps(start_jd: float, stop_jd: float, step_days: float) -> int:
+    ''' Épocas muestreadas por close_approaches en [start_jd, stop_jd] con paso step_days. '''
+    return max(0, int(math.ceil((stop_jd + 0.5 * step_days - start_jd) / step_days)))
+
+
+def close_approaches(bodies: np.ndarray, earth: np.ndarray, start_jd: float, stop_jd: float,
+                     step_days: float, max_au: float) -> List[List[Dict[str, float]]]:
+    '''
+    Acercamientos a la Tierra en [start_jd, stop_jd] con distancia <= max_au.
+
+    Propaga cuerpos y Tierra con paso step_days, toma los mínimos locales de la
+    distancia y los refina con mallas temporales encogidas (vectorizado sobre todos
+    los mínimos a la vez). La velocidad relativa sale de diferencias centradas.
+
+    Returns:
+        list: por cuerpo, lista de {epoch_jd, miss_km, miss_au, v_rel_kms}
+    '''
+    el = np.asarray(bodies, dtype=ELEMENTS_DTYPE)
+    ea = np.asarray(earth, dtype=ELEMENTS_DTYPE).reshape(1)
+    n_t = sampling_steps(start_jd, stop_jd, step_days)
+    out: List[List[Dict[str, float]]] = [[] for _ in range(el.size)]
+    if el.size == 0 or n_t < 3:
+        return out
+
+    # Mínimos locales de la distancia muestreada, por bloques de épocas para acotar la
+    # memoria (B x bloque); cada bloque lleva una muestra vecina a cada lado
+    block = max(1, APPROACH_MAX_PAIRS // el.size)
+    b_parts, t_parts = [], []
+    for k0 in range(1, n_t - 1, block):
+        k1 = min(k0 + block, n_t - 1)
+        t = start_jd + step_days * np.arange(k0 - 1, k1 + 1)
+        d = _distances(el, ea, t)                                            # (B, k1 - k0 + 2)
+        near = (d[:, 1:-1] <= d[:, :-2]) & (d[:, 1:-1] <= d[:, 2:])
+        near &= d[:, 1:-1] <= max_au + 0.05 * step_days  # margen: el mínimo real puede ser algo menor
+        b, k = np.nonzero(near)
+        b_parts.append(b)
+        t_parts.append(t[k + 1])
+    b_idx = np.concatenate(b_parts)
+    if b_idx.size == 0:
+        return out
+
+    # Refinamiento conjunto de todos los mínimos: ventana ±step, malla de 17 puntos
+    center = np.concatenate(t_parts)
+    half = np.full(center.shape, float(step_days))
+    offs = np.linspace(-1.0, 1.0, APPROACH_REFINE_POINTS)
+    cand_el = el[b_idx]
+    for _ in range(APPROACH_REFINE_ITER):
+        grid = center[:, None] + half[:, None] * offs[None, :]
+        dd = _distances(cand_el, ea, grid)
+        center = grid[np.arange(grid.shape[0]), dd.argmin(axis=1)]
+        half = half / 8.0
+
+    h = 1.0 / 1440.0  # 1 minuto
+    tt = np.stack([center - h, center, center + h], axis=1)
+    rel = (_propagate_pairs(np.repeat(cand_el, 3), tt.reshape(-1)).reshape(-1, 3, 3)
+           - propagate(ea, tt.reshape(-1))[0].reshape(-1, 3, 3))
+    miss = np.linalg.norm(rel[:, 1], axis=-1)
+    v_rel = np.linalg.norm(rel[:, 2] - rel[:, 0], axis=-1) / (2.0 * h) * AU_KM / 86400.0
+
+    for b, epoch, m, v in zip(b_idx, center, miss, v_rel):
+        if m <= max_au:
+            out[b].append({"epoch_jd": float(epoch), "miss_au": float(m),
+                           "miss_km": float(m * AU_KM), "v_rel_kms": float(v)})
+    return out
+
+
+def screen(bodies: np.ndarray, earth: np.ndarray, start_jd: float, stop_jd: float, step_days: float,
+           moid_max_au: float, approach_max_au: float) -> List[Dict]:
+    '''
+    MOID de todos los cuerpos y, para los que quedan por debajo de moid_max_au,
+    búsqueda de acercamientos en la ventana. Pensado para ejecutarse por bloques de
+    cuerpos en el compute_pool.
+
+    Returns:
+        list: {index, moid_au, moid_km, encounters} de los cuerpos con MOID <= moid_max_au
+    '''
+    el = np.asarray(bodies, dtype=ELEMENTS_DTYPE)
+    if el.size == 0:
+        return []
+    m = moid(el, earth)["moid_au"]
+    hits = np.nonzero(m <= moid_max_au)[0]
+    encounters = close_approaches(el[hits], earth, start_jd, stop_jd, step_days, approach_max_au)
+    return [{"index": int(k), "moid_au": float(m[k]), "moid_km": float(m[k] * AU_KM), "encounters": enc}
+            for k, enc in zip(hits, encounters)]
+
+
+def earth_elements(data_dicc: dict) -> np.ndarray:
+    ''' ELEMENTS_DTYPE record from horizons_service.get_orbit_elements("399", "10"). '''
+    rec = np.empty(1, dtype=ELEMENTS_DTYPE)
+    rec[0] = (float(data_dicc["A"]), float(data_dicc["EC"]), float(data_dicc["IN"]),
+              float(data_dicc["OM"]), float(data_dicc["W"]), float(data_dicc["MA"]),
+              float(data_dicc["JDTDB"]), float(data_dicc["N"]), math.nan)
+    return rec
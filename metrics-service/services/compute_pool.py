@@ -0,0 +1,299 @@
+import asyncio
+import collections
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+
+from fastapi import HTTPException, status
+
+from services.cache import _MISSING, merge_cache_stats
+
+# --- CONFIG ---
+COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS", str(os.cpu_count() or 1)))  # 0 = run in threads
+COMPUTE_MAX_IN_FLIGHT = int(os.getenv("COMPUTE_MAX_IN_FLIGHT", str(4 * max(COMPUTE_WORKERS, 1))))
+COMPUTE_TASK_TIMEOUT_S = float(os.getenv("COMPUTE_TASK_TIMEOUT_S", "60"))
+COMPUTE_RETRY_AFTER_S = 1
+COMPUTE_ADMIT_POLL_S = 0.05   # espera de map_ordered cuando el pool está lleno y no tiene nada propio en curso
+
+
+# ---- Worker side ----
+_stats_queue = None        # cola hacia el proceso padre con las estadísticas de cachés
+_clear_generation = 0      # última limpieza de cachés pedida por el padre y aplicada aquí
+
+
+def _init_worker(block_cache_bytes: int, stats_queue) -> None:
+    global _stats_queue
+    from services import damage_grid  # noqa: F401
+    from services.block_cache import block_cache
+    from services.population_service import get_pyramid
+    from services.raster_pool import raster_pool
+
+    # La caché de bloques se reparte entre los workers: el pool entero usa POPULATION_BLOCK_CACHE_MB
+    block_cache.max_bytes = block_cache_bytes
+    _stats_queue = stats_queue
+    # Cada proceso abre sus propios rásteres al arrancar, no en la primera petición
+    for _, path, _ in get_pyramid().levels:
+        raster_pool.get(path)
+
+
+def worker_cache_stats() -> Dict[str, Dict[str, Any]]:
+    ''' Stats of this process's memo caches and raster block cache. '''
+    from services.block_cache import block_cache
+    from services.cache import cache_stats
+    return {**cache_stats(), "population_blocks": block_cache.stats()}
+
+
+def _run_task(clear_generation: int, fn: Callable, *args) -> Any:
+    # Envoltorio de cada tarea en el worker: aplica las limpiezas pendientes de
+    # /cache/clear y, al terminar, publica sus estadísticas para /cache/stats
+    global _clear_generation
+    if clear_generation != _clear_generation:
+        from services.block_cache import block_cache
+        from services.cache import CACHES
+        for cache in CACHES.values():
+            cache.clear()
+        block_cache.clear()
+        _clear_generation = clear_generation
+    try:
+        return fn(*args)
+    finally:
+        if _stats_queue is not None:
+            _stats_queue.put((os.getpid(), _clear_generation, worker_cache_stats()))
+
+
+class ComputePool:
+    ''' Process pool for CPU-heavy work (population estimates, damage grids).
+
+        Workers are spawned with the population rasters already open, so requests only
+        pay for the computation (with COMPUTE_WORKERS=0 a thread pool is used instead).
+        At most max_in_flight tasks may be queued or running; beyond that run() fails
+        fast with 429 so callers back off instead of piling up. Each task has a timeout
+        (504). A task that timed out keeps its worker busy until it finishes, and it
+        still counts against max_in_flight until then.
+
+        Workers report their cache stats after every task, and /cache/clear reaches
+        them with the next task they run (clear_caches); the raster block cache budget
+        is split between them.
+    '''
+
+    def __init__(self, workers: int = COMPUTE_WORKERS, max_in_flight: int = COMPUTE_MAX_IN_FLIGHT,
+                 timeout: float = COMPUTE_TASK_TIMEOUT_S):
+        self.workers = workers
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self._executor: Optional[Executor] = None
+        self._warm: List[Future] = []
+        self._lock = threading.Lock()
+        self._stats_queue = None
+        self._worker_stats: Dict[int, Dict[str, Dict[str, Any]]] = {}
+        self.clear_generation = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        if self.workers > 0:
+            from services.block_cache import BLOCK_CACHE_MB
+            # spawn: nada de fork con hilos/handles de GDAL del proceso padre
+            ctx = multiprocessing.get_context("spawn")
+            self._stats_queue = ctx.Queue()
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=ctx, initializer=_init_worker,
+                                                 initargs=(BLOCK_CACHE_MB * 1024 * 1024 // self.workers,
+                                                           self._stats_queue))
+            # Arranca ya los procesos (y su initializer) en vez de en la primera petición;
+            # con spawn se crean bajo demanda, así que una tarea vacía por worker
+            self._warm = [self._executor.submit(int) for _ in range(self.workers)]
+        else:
+            self._executor = ThreadPoolExecutor(self.max_in_flight, thread_name_prefix="compute")
+
+    def warm(self, timeout: Optional[float] = None) -> None:
+        ''' Start the pool and block until the workers have run their initializer. '''
+        self.start()
+        for future in self._warm:
+            future.result(timeout)
+
+    def shutdown(self) -> None:
+        self._reset()
+
+    # ---- Admission ----
+    def try_acquire(self) -> bool:
+        ''' Take an in-flight slot if one is free. '''
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                return False
+            self.in_flight += 1
+            return True
+
+    def acquire(self) -> None:
+        ''' Take an in-flight slot or raise 429. '''
+        if not self.try_acquire():
+            with self._lock:
+                self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                                detail="Compute pool saturated, retry later",
+                                headers={"Retry-After": str(COMPUTE_RETRY_AFTER_S)})
+
+    def release(self, *_) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+        self._drain_stats()
+
+    # ---- Execution ----
+    def submit(self, fn: Callable, *args) -> Future:
+        ''' Submit fn(*args) without taking a slot (use admit() for request work). '''
+        self.start()
+        if self.workers > 0:
+            args = (self.clear_generation, fn) + args
+            fn = _run_task
+        try:
+            return self._executor.submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died (OOM, segfault): replace the pool and retry once
+            self._reset()
+            self.start()
+            return self._executor.submit(fn, *args)
+
+    def admit(self, fn: Callable, *args, block: bool = True) -> Optional[Future]:
+        ''' Take a slot and submit fn(*args); the slot is freed when the task really
+            ends, not when the caller gives up. Saturated: 429, or None if not block.
+        '''
+        if block:
+            self.acquire()
+        elif not self.try_acquire():
+            return None
+        try:
+            future = self.submit(fn, *args)
+        except BaseException:
+            self.release()
+            raise
+        future.add_done_callback(self.release)
+        return future
+
+    def _reset(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._worker_stats.clear()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def wait(self, future: Future, timeout: Optional[float] = None) -> Any:
+        ''' Await a submitted task, 504 after timeout (default: the pool's). '''
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                                detail="Computation timed out")
+        except BrokenProcessPool:
+            self._reset()
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Compute worker crashed, retry later",
+                                headers={"Retry-After": str(COMPUTE_RETRY_AFTER_S)})
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        ''' Run fn(*args) in a worker process: 429 if saturated, 504 on timeout.
+            fn and its arguments must be picklable (module-level functions).
+        '''
+        return await self.wait(self.admit(fn, *args), timeout)
+
+    async def run_memoized(self, memoized: Callable, fn: Callable, *args) -> Any:
+        ''' run(fn, *args) through the memo cache of memoized (a services.cache.memoize
+            wrapper of fn) in this process, so hits skip the pool and /cache/stats sees them.
+        '''
+        key = memoized.key(*args)
+        value = memoized.cache.get(key)
+        if value is _MISSING:
+            value = await self.run(fn, *args)
+            memoized.cache.set(key, value)
+        return memoized.copy_out(value)
+
+    def map_ordered(self, fn: Callable, arg_tuples: Iterable[tuple]) -> AsyncIterator[Any]:
+        ''' fn(*args) for each tuple of arg_tuples, computed in parallel and yielded in order.
+
+            Every task takes its own slot (admit). The first one is admitted right here,
+            so a saturated pool fails with 429 before the caller starts answering; the
+            rest are submitted as the results are consumed, at most workers + 1 at a
+            time, waiting for their own results instead of failing when the pool is full.
+        '''
+        tasks = iter(arg_tuples)
+        pending = collections.deque()
+        first = next(tasks, None)
+        if first is not None:
+            pending.append(self.admit(fn, *first))
+        return self._map_rest(fn, tasks, pending)
+
+    async def _map_rest(self, fn: Callable, tasks, pending: collections.deque) -> AsyncIterator[Any]:
+        try:
+            for args in tasks:
+                future = self.admit(fn, *args, block=False)
+                while future is None:
+                    # Pool lleno: vaciar lo nuestro antes de pedir más plazas
+                    if pending:
+                        yield await self.wait(pending.popleft())
+                    else:
+                        await asyncio.sleep(COMPUTE_ADMIT_POLL_S)
+                    future = self.admit(fn, *args, block=False)
+                pending.append(future)
+                if len(pending) > max(self.workers, 1):
+                    yield await self.wait(pending.popleft())
+            while pending:
+                yield await self.wait(pending.popleft())
+        finally:
+            # Las tareas ya en marcha liberan su plaza al terminar
+            for future in pending:
+                future.cancel()
+
+    # ---- Worker caches ----
+    def _drain_stats(self) -> None:
+        stats_queue = self._stats_queue
+        if stats_queue is None:
+            return
+        while True:
+            try:
+                pid, generation, stats = stats_queue.get_nowait()
+            except (queue.Empty, OSError, ValueError):
+                return
+            with self._lock:
+                # Informes de antes de la última limpieza no cuentan
+                if generation == self.clear_generation:
+                    self._worker_stats[pid] = stats
+
+    def clear_caches(self) -> None:
+        ''' Clear the workers' caches: each one clears them before its next task. '''
+        with self._lock:
+            self.clear_generation += 1
+            self._worker_stats.clear()
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        ''' Cache stats summed over the workers (last report of each). '''
+        self._drain_stats()
+        with self._lock:
+            reports = list(self._worker_stats.values())
+        names = {name for report in reports for name in report}
+        return {name: merge_cache_stats([r[name] for r in reports if name in r]) for name in sorted(names)}
+
+    def stats(self) -> Dict[str, Any]:
+        self._drain_stats()
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "timeout_s": self.timeout,
+                "reporting_workers": len(self._worker_stats),
+            }
+
+
+compute_pool = ComputePool()
@@ -0,0 +1,129 @@
+import math
+import warnings
+from typing import Any, Dict, Tuple
+
+import numpy as np
+from rasterio.errors import NotGeoreferencedWarning
+from rasterio.io import MemoryFile
+
+from services.impact_metrics import Atmosphere, R_EARTH
+from services.impact_metrics_vec import VectorizedImpactMetrics
+
+# --- CONFIG ---
+TILE_SIZE = 256                 # px por tesela XYZ
+GRID_BLOCK_ROWS = 64            # filas por bloque al generar mallas grandes
+MAX_GRID_CELLS = 16_000_000     # límite de celdas por malla (4000 x 4000)
+QUANTITIES = ("fluence_Jm2", "overpressure_Pa")
+# Rango log10 usado para codificar cada magnitud en PNG de 8 bits
+PNG_LOG_RANGE = {
+    "fluence_Jm2": (2.0, 8.0),
+    "overpressure_Pa": (2.0, 6.0),
+}
+
+
+def great_circle_distance_m(lon0: float, lat0: float, lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+    ''' Haversine distance in meters from (lon0, lat0) to every (lon, lat), all in degrees. '''
+    phi0, phi = math.radians(lat0), np.radians(lat)
+    dphi = phi - phi0
+    dlmb = np.radians(lon) - math.radians(lon0)
+    a = np.sin(dphi / 2.0) ** 2 + math.cos(phi0) * np.cos(phi) * np.sin(dlmb / 2.0) ** 2
+    return 2.0 * R_EARTH * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def evaluate_field(E_joules: float, atm: Atmosphere, lon0: float, lat0: float,
+                   lon: np.ndarray, lat: np.ndarray, quantity: str) -> np.ndarray:
+    ''' Evaluate one damage quantity at each (lon, lat) point. Returns float32.
+
+        Args:
+            E_joules (float): Impact energy
+            atm (Atmosphere): Attenuation and burst altitude
+            lon0, lat0 (float): Impact point in WGS84
+            lon, lat (np.ndarray): Points to evaluate, broadcastable
+            quantity (str): "fluence_Jm2" or "overpressure_Pa"
+    '''
+    r_m = great_circle_distance_m(lon0, lat0, lon, lat)
+    if quantity == "fluence_Jm2":
+        # El punto de impacto exacto daría inf; se evalúa a 1 m
+        values = VectorizedImpactMetrics.thermal_exposure_at_distance(E_joules, np.maximum(r_m, 1.0), atm)
+    elif quantity == "overpressure_Pa":
+        values = VectorizedImpactMetrics.overpressure_collins_airburst(E_joules, atm.burst_altitude_m or 0.0, r_m)
+    else:
+        raise ValueError(f"Unknown quantity: {quantity}")
+    return values.astype(np.float32)
+
+
+# --- Malla lon/lat alrededor del impacto ---
+def grid_bounds(lon0: float, lat0: float, radius_km: float) -> Tuple[float, float, float, float]:
+    ''' Lon/lat bounding box (west, south, east, north) containing a circle of radius_km. '''
+    dlat = math.degrees(radius_km * 1000.0 / R_EARTH)
+    coslat = max(math.cos(math.radians(lat0)), 1e-6)
+    dlon = min(180.0, dlat / coslat)
+    return lon0 - dlon, max(-90.0, lat0 - dlat), lon0 + dlon, min(90.0, lat0 + dlat)
+
+
+def grid_block(E_joules: float, atm: Atmosphere, lon0: float, lat0: float,
+               radius_km: float, width: int, height: int, quantity: str,
+               start: int, rows: int = GRID_BLOCK_ROWS) -> np.ndarray:
+    ''' Rows [start, start + rows) of the lon/lat grid (north to south), float32. '''
+    west, south, east, north = grid_bounds(lon0, lat0, radius_km)
+    # Centros de celda
+    lon = west + (np.arange(width) + 0.5) * (east - west) / width
+    lat = north - (np.arange(start, min(start + rows, height)) + 0.5) * (north - south) / height
+    return evaluate_field(E_joules, atm, lon0, lat0, lon[None, :], lat[:, None], quantity)
+
+
+def grid_block_bytes(*args, **kwargs) -> bytes:
+    ''' grid_block serialized as raw float32 bytes (what the compute pool sends back). '''
+    return grid_block(*args, **kwargs).tobytes()
+
+
+# --- Teselas XYZ (Web Mercator) ---
+def tile_lonlat(z: int, x: int, y: int, size: int = TILE_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    ''' Lon/lat of pixel centers of the XYZ tile (z, x, y), as (1, size) and (size, 1) arrays. '''
+    n = 2 ** z
+    px = (x + (np.arange(size) + 0.5) / size) / n
+    py = (y + (np.arange(size) + 0.5) / size) / n
+    lon = px * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(math.pi * (1.0 - 2.0 * py))))
+    return lon[None, :], lat[:, None]
+
+
+def render_tile(E_joules: float, atm: Atmosphere, lon0: float, lat0: float,
+                z: int, x: int, y: int, quantity: str, size: int = TILE_SIZE) -> np.ndarray:
+    ''' Damage quantity on one Web Mercator tile, float32 (size, size). '''
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise ValueError(f"Tile out of range: {z}/{x}/{y}")
+    lon, lat = tile_lonlat(z, x, y, size)
+    return evaluate_field(E_joules, atm, lon0, lat0, lon, lat, quantity)
+
+
+def encode_png(values: np.ndarray, quantity: str) -> bytes:
+    ''' Encode a field as a single-band 8-bit PNG: 0 = below range (transparent),
+        1..255 = log10(value) linearly mapped over PNG_LOG_RANGE[quantity].
+    '''
+    vmin, vmax = PNG_LOG_RANGE[quantity]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scaled = (np.log10(values) - vmin) / (vmax - vmin)
+    band = np.where(np.isfinite(scaled) & (scaled >= 0),
+                    1 + np.round(np.clip(scaled, 0.0, 1.0) * 254), 0).astype(np.uint8)
+
+    height, width = band.shape
+    with MemoryFile() as mem, warnings.catch_warnings():
+        # Tesela XYZ: la georreferencia la da (z, x, y), no el fichero
+        warnings.simplefilter("ignore", NotGeoreferencedWarning)
+        with mem.open(driver="PNG", width=width, height=height, count=1,
+                      dtype="uint8", nodata=0) as dst:
+            dst.write(band, 1)
+        return mem.read()
+
+
+def render_tile_png(E_joules: float, atm: Atmosphere, lon0: float, lat0: float,
+                    z: int, x: int, y: int, quantity: str, size: int = TILE_SIZE) -> bytes:
+    ''' render_tile encoded with encode_png. '''
+    return encode_png(render_tile(E_joules, atm, lon0, lat0, z, x, y, quantity, size), quantity)
+
+
+def grid_metadata(lon0: float, lat0: float, radius_km: float, width: int, height: int) -> Dict[str, Any]:
+    west, south, east, north = grid_bounds(lon0, lat0, radius_km)
+    return {"width": width, "height": height, "dtype": "float32", "order": "row-major, north to south",
+            "bounds": [west, south, east, north]}
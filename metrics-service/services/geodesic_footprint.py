@@ -0,0 +1,115 @@
+import math
+import os
+from functools import lru_cache
+
+import numpy as np
+import pyproj
+import shapely
+import shapely.geometry as geometry
+from shapely.affinity import translate
+from shapely.ops import unary_union
+
+# --- CONFIG ---
+GEOD = pyproj.Geod(ellps="WGS84")
+FOOTPRINT_LAT_BAND_DEG = 0.01      # footprints are cached per latitude band of this width
+FOOTPRINT_MAX_SAGITTA_M = 25.0     # max gap between the true circle and its polygon edges
+FOOTPRINT_MIN_VERTICES = 64
+FOOTPRINT_MAX_VERTICES = 8192
+FOOTPRINT_DENSIFY_DEG = 0.25       # max edge length (degrees) of straight clip edges before projecting
+FOOTPRINT_CACHE_SIZE = int(os.getenv("FOOTPRINT_CACHE_SIZE", "4096"))
+
+_WORLD = geometry.box(-180.0, -90.0, 180.0, 90.0)
+
+
+def n_vertices(radius_m: float) -> int:
+    ''' Vertices needed so that no polygon edge is more than FOOTPRINT_MAX_SAGITTA_M
+        inside the circle: sagitta = r (1 - cos(pi / n)) ~ r pi^2 / (2 n^2).
+    '''
+    n = math.ceil(math.pi * math.sqrt(radius_m / (2.0 * FOOTPRINT_MAX_SAGITTA_M)))
+    return int(min(max(n, FOOTPRINT_MIN_VERTICES), FOOTPRINT_MAX_VERTICES))
+
+
+@lru_cache(maxsize=FOOTPRINT_CACHE_SIZE)
+def _ring_offsets(lat_band: float, radius_m: float):
+    # Geodesic circle centered at (0, lat_band): longitudes are relative to the center,
+    # so the same ring serves any center longitude by translation.
+    n = n_vertices(radius_m)
+    az = np.linspace(0.0, 360.0, n, endpoint=False)
+    lons, lats, _ = GEOD.fwd(np.zeros(n), np.full(n, lat_band), az, np.full(n, radius_m))
+    # Continuous longitudes (may go beyond +-180 and, around a pole, span 360)
+    dlon = np.degrees(np.unwrap(np.radians(lons)))
+    pole = 0
+    for sign in (1, -1):
+        if GEOD.inv(0.0, lat_band, 0.0, 90.0 * sign)[2] < radius_m:
+            pole = sign
+    dlon.flags.writeable = False
+    lats.flags.writeable = False
+    return dlon, lats, pole
+
+
+def geodesic_footprint(lon: float, lat: float, radius_m: float):
+    ''' True geodesic circle on the WGS84 ellipsoid as a lon/lat polygon.
+
+        The ring is densified so that edges stay within FOOTPRINT_MAX_SAGITTA_M of the
+        circle, split at the antimeridian and, when the circle contains a pole, closed
+        along that pole. The shape is cached per (latitude band, radius) and translated
+        to the requested center.
+
+        Args:
+            lon (float): Longitude of circle center in WGS84
+            lat (float): Latitude of circle center in WGS84
+            radius_m (float): Geodesic radius in meters
+
+        Returns:
+            shapely Polygon or MultiPolygon in WGS84 lon/lat, inside [-180, 180] x [-90, 90]
+    '''
+    if radius_m <= 0:
+        return geometry.Polygon()
+    if radius_m >= math.pi * GEOD.b:
+        raise ValueError(f"Radius too large for a geodesic circle: {radius_m} m")
+
+    band = round(lat / FOOTPRINT_LAT_BAND_DEG) * FOOTPRINT_LAT_BAND_DEG
+    dlon, lats, pole = _ring_offsets(band, float(round(radius_m)))
+    lons = dlon + lon
+    lats = lats + (lat - band)
+
+    if pole == 0:
+        shape = geometry.Polygon(np.column_stack([lons, lats]))
+    else:
+        # Ring spans 360 degrees of longitude: close it along the pole
+        pole_lat = 90.0 * pole
+        end = lons[0] + (360.0 if lons[-1] > lons[0] else -360.0)
+        coords = np.vstack([np.column_stack([lons, lats]),
+                            [[end, lats[0]], [end, pole_lat], [lons[0], pole_lat]]])
+        shape = geometry.Polygon(coords)
+    if not shape.is_valid:
+        shape = shapely.make_valid(shape)
+
+    # Pieces beyond the antimeridian are moved back into [-180, 180]
+    parts = []
+    for shift in (-360.0, 0.0, 360.0):
+        piece = shape.intersection(translate(_WORLD, xoff=shift))
+        if not piece.is_empty:
+            parts.append(translate(piece, xoff=-shift))
+    return unary_union(parts)
+
+
+def project_footprint(footprint, proj_to_raster: callable):
+    ''' Project a lon/lat footprint to the raster CRS, densifying the straight
+        clip edges (antimeridian, poles) first so they follow the projection.
+        proj_to_raster takes coordinate arrays (a pyproj Transformer.transform):
+        all vertices are projected in one call.
+    '''
+    dense = shapely.segmentize(footprint, FOOTPRINT_DENSIFY_DEG)
+    return shapely.transform(dense, lambda xy: np.column_stack(proj_to_raster(xy[:, 0], xy[:, 1])))
+
+
+def planar_distortion(footprint_proj, x0: float, y0: float, radius_m: float) -> float:
+    ''' Max relative difference between the projected footprint boundary and a
+        planar circle of radius_m around (x0, y0). inf if the footprint is split.
+    '''
+    if footprint_proj.is_empty or footprint_proj.geom_type != "Polygon" or len(footprint_proj.interiors):
+        return math.inf
+    xy = np.asarray(footprint_proj.exterior.coords)
+    d = np.hypot(xy[:, 0] - x0, xy[:, 1] - y0)
+    return float(np.max(np.abs(d / radius_m - 1.0)))
@@ -1,15 +1,37 @@
 # services/horizons_service.py
-import re, math, httpx
+import os, time
+import numpy as np
 from datetime import datetime, timezone
 import asyncio
 
-HZ = "https://ssd.jpl.nasa.gov/api/horizons.api"
-_semaphore = asyncio.Semaphore(2)   # límite: 1 request concurrente
+from services.cache import _MISSING, SharedStore, get_cache
+from services.upstream import UpstreamUnavailable, upstream
 
-async def get_orbit_elements(command: str, center: str):
-    # Pedimos EXACTAMENTE un instante con TLIST (UTC)
-    now_utc_str = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+HZ = "https://ssd.jpl.nasa.gov/api/horizons.api"   # concurrencia limitada por host en services.upstream
+
+# --- CONFIG ---
+HORIZONS_EPOCH_BUCKET_S = float(os.getenv("HORIZONS_EPOCH_BUCKET_S", "21600"))  # época = inicio del tramo (6 h)
+HORIZONS_MAX_STALE_S = float(os.getenv("HORIZONS_MAX_STALE_S", "86400"))        # servir tramos pasados hasta 24 h
+HORIZONS_REFRESH_AHEAD_S = float(os.getenv("HORIZONS_REFRESH_AHEAD_S", "1800")) # pedir el tramo siguiente antes
+HORIZONS_STALE_IF_ERROR_S = float(os.getenv("HORIZONS_STALE_IF_ERROR_S", "604800"))  # Horizons caído: hasta 7 días
+HORIZONS_CACHE_PATH = os.getenv("HORIZONS_CACHE_PATH")                          # SQLite opcional en disco
+HORIZONS_TLIST_MAX = int(os.getenv("HORIZONS_TLIST_MAX", "400"))                # épocas por consulta en las series
+
+# Elementos por (command, center, tramo de época); con disco sobreviven a reinicios
+_elements_cache = get_cache("horizons_elements", maxsize=256,
+                            ttl=HORIZONS_EPOCH_BUCKET_S + max(HORIZONS_MAX_STALE_S, HORIZONS_STALE_IF_ERROR_S),
+                            shared=SharedStore(HORIZONS_CACHE_PATH) if HORIZONS_CACHE_PATH else None)
+# Series multi-época por (command, center, épocas)
+_series_cache = get_cache("horizons_series", maxsize=64, ttl=HORIZONS_MAX_STALE_S)
+_inflight = {}          # clave -> Task: peticiones simultáneas comparten una sola consulta
+_refresh_tasks = set()  # referencias a los refrescos en segundo plano
+
+
+def _epoch_bucket(t: float) -> int:
+    return int(t // HORIZONS_EPOCH_BUCKET_S)
 
+
+async def _fetch_result(command: str, center: str, tlist: str, **extra) -> str:
     params = {
         "format": "json",
         "EPHEM_TYPE": "ELEMENTS",
@@ -21,66 +43,213 @@ async def get_orbit_elements(command: str, center: str):
         "OUT_UNITS": "AU-D",
         "ANG_FORMAT": "DEG",
         "CSV_FORMAT": "YES",
-        "ELEM_LABELS": "YES",   # si Horizons lo respeta, tendremos cabeceras
-        "TLIST": f"'{now_utc_str}'",
+        "ELEM_LABELS": "YES",   # cabecera de columnas: parse_element_table la valida
+        "TLIST": tlist,
         "OBJ_DATA": "NO",
+        **extra,
     }
-    async with _semaphore:
-        async with httpx.AsyncClient(timeout=20) as client:
-            r = await client.get(HZ, params=params)
-            r.raise_for_status()
-            data = r.json()
-            if "result" not in data:
-                raise ValueError(f"Horizons: respuesta inesperada {data}")
-            #print(data['result'])
-            parsed = parse_elements(data["result"])
-            return parsed
+    r = await upstream.get(HZ, params=params)
+    r.raise_for_status()
+    data = r.json()
+    if "result" not in data:
+        raise ValueError(f"Horizons: respuesta inesperada {data}")
+    return data["result"]
 
 
-def parse_elements(data):
-    data_labels = [
-        "JDTDB",            # Julian Day (TDB)
-        "CalendarDate",     # Calendar Date (TDB)
-        "EC",               # Eccentricity (e)
-        "QR",               # Periapsis distance (q, AU)
-        "IN",               # Inclination (deg)
-        "OM",               # Longitude of Ascending Node (Ω, deg)
-        "W",                # Argument of Periapsis (ω, deg)
-        "Tp",               # Time of periapsis (JDTDB)
-        "N",                # Mean motion (deg/day)
-        "MA",               # Mean anomaly (deg)
-        "TA",               # True anomaly (deg)
-        "A",                # Semi-major axis (AU)
-        "AD",               # Apoapsis distance (Q, AU)
-        "PR"                # Orbital period (days)
-    ]
-
-    data_values = data.split('$$SOE')[1].split('$$EOE')[0].split(',')
-    data_dicc = {a : b for a, b in zip(data_labels, data_values)}
-
-    keys = ['A','EC','IN','OM','W','MA','PR','N','JDTDB']
-    sub_dicc = {k: data_dicc[k] for k in keys if k in data_dicc}
-
-    # Convertir a radianes los que son ángulos
-    for k in ['IN', 'OM', 'W', 'MA', 'N']:
-        if k in sub_dicc:
-            sub_dicc[k] = math.radians(float(sub_dicc[k]))
-    
-    return normalize_numeric_dict(sub_dicc)
-
-def normalize_numeric_dict(data_dicc: dict) -> dict:
-    clean = {}
-    for k, v in data_dicc.items():
-        if not isinstance(v, str):
-            clean[k] = v
+async def _fetch_elements(command: str, center: str, epoch: datetime) -> dict:
+    # Pedimos EXACTAMENTE un instante con TLIST (UTC)
+    epoch_utc_str = epoch.strftime("%Y-%m-%d %H:%M:%S")
+    return parse_elements(await _fetch_result(command, center, f"'{epoch_utc_str}'"))
+
+
+def _load_bucket(command: str, center: str, bucket: int) -> asyncio.Task:
+    # Una sola consulta por clave aunque lleguen varias peticiones a la vez
+    key = (command, center, bucket)
+    task = _inflight.get(key)
+    if task is None:
+        async def load():
+            try:
+                epoch = datetime.fromtimestamp(bucket * HORIZONS_EPOCH_BUCKET_S, timezone.utc)
+                elements = await _fetch_elements(command, center, epoch)
+                _elements_cache.set(key, elements)
+                return elements
+            finally:
+                _inflight.pop(key, None)
+
+        task = _inflight[key] = asyncio.create_task(load())
+    return task
+
+
+def _refresh_in_background(command: str, center: str, bucket: int) -> None:
+    if (command, center, bucket) in _inflight:
+        return
+    task = _load_bucket(command, center, bucket)
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_done)
+
+
+def _refresh_done(task: asyncio.Task) -> None:
+    _refresh_tasks.discard(task)
+    # Un refresco fallido no afecta a nadie: se reintenta en la siguiente petición
+    if not task.cancelled():
+        task.exception()
+
+
+async def get_orbit_elements(command: str, center: str):
+    ''' Elementos osculadores de `command` respecto a `center` en el inicio del tramo
+        de época actual (HORIZONS_EPOCH_BUCKET_S). Se cachean por (command, center, tramo);
+        cerca del final del tramo se pide el siguiente en segundo plano, y si el actual
+        aún no está se sirve uno anterior con menos de HORIZONS_MAX_STALE_S de antigüedad
+        (HORIZONS_STALE_IF_ERROR_S si Horizons no responde).
+    '''
+    now = time.time()
+    bucket = _epoch_bucket(now)
+
+    elements = _elements_cache.get((command, center, bucket))
+    if elements is not _MISSING:
+        if now >= (bucket + 1) * HORIZONS_EPOCH_BUCKET_S - HORIZONS_REFRESH_AHEAD_S:
+            if _elements_cache.get((command, center, bucket + 1)) is _MISSING:
+                _refresh_in_background(command, center, bucket + 1)
+        return dict(elements)
+
+    # Tramo actual sin datos: vale uno anterior dentro de la ventana de obsolescencia
+    elements = _latest_cached(command, center, bucket, now - HORIZONS_MAX_STALE_S)
+    if elements is not _MISSING:
+        _refresh_in_background(command, center, bucket)
+        return dict(elements)
+
+    try:
+        return dict(await asyncio.shield(_load_bucket(command, center, bucket)))
+    except UpstreamUnavailable:
+        # Horizons lento o caído (o circuito abierto): mejor elementos viejos que un error
+        elements = _latest_cached(command, center, bucket, now - HORIZONS_STALE_IF_ERROR_S)
+        if elements is _MISSING:
+            raise
+        return dict(elements)
+
+
+def _latest_cached(command: str, center: str, bucket: int, since: float):
+    # Tramo anterior más reciente en caché cuyo fin sea posterior a `since`
+    for previous in range(bucket - 1, _epoch_bucket(since) - 1, -1):
+        elements = _elements_cache.get((command, center, previous))
+        if elements is not _MISSING:
+            return elements
+    return _MISSING
+
+
+async def get_many_orbit_elements(bodies: dict) -> dict:
+    ''' Elementos de varios cuerpos {nombre: (command, center)} a la vez: las consultas
+        van en paralelo (con el límite por host de services.upstream) y los que están en caché no esperan.
+        Devuelve {nombre: elementos o la excepción de ese cuerpo}.
+    '''
+    names = list(bodies)
+    results = await asyncio.gather(*(get_orbit_elements(*bodies[n]) for n in names),
+                                   return_exceptions=True)
+    return dict(zip(names, results))
+
+
+# Columnas de la tabla CSV de elementos (EPHEM_TYPE=ELEMENTS, CSV_FORMAT=YES), en orden
+ELEMENT_LABELS = (
+    "JDTDB",            # Julian Day (TDB)
+    "CalendarDate",     # Calendar Date (TDB)
+    "EC",               # Eccentricity (e)
+    "QR",               # Periapsis distance (q, AU)
+    "IN",               # Inclination (deg)
+    "OM",               # Longitude of Ascending Node (Ω, deg)
+    "W",                # Argument of Periapsis (ω, deg)
+    "Tp",               # Time of periapsis (JDTDB)
+    "N",                # Mean motion (deg/day)
+    "MA",               # Mean anomaly (deg)
+    "TA",               # True anomaly (deg)
+    "A",                # Semi-major axis (AU)
+    "AD",               # Apoapsis distance (Q, AU)
+    "PR",               # Orbital period (days)
+)
+ANGLE_LABELS = ("IN", "OM", "W", "N", "MA", "TA")   # se devuelven en radianes (N en rad/día)
+_HEADER_ALIASES = {"Calendar Date (TDB)": "CalendarDate"}
+
+
+def _table_header(preamble: str):
+    # Última línea con texto antes de $$SOE que no sea el separador de asteriscos
+    for line in reversed(preamble.splitlines()):
+        line = line.strip()
+        if line and not line.startswith("*"):
+            if "JDTDB" not in line:
+                return None   # Horizons no puso etiquetas (ELEM_LABELS ignorado)
+            return [_HEADER_ALIASES.get(c.strip(), c.strip()) for c in line.rstrip(",").split(",")]
+    return None
+
+
+async def get_elements_series(command: str, center: str, epochs_jd) -> dict:
+    ''' Elementos osculadores de `command` respecto a `center` en varias épocas (JD TDB).
+
+        Una sola consulta TLIST por cada HORIZONS_TLIST_MAX épocas (en paralelo, con el
+        límite por host de services.upstream) y una sola pasada de parse_element_table.
+        Devuelve {etiqueta: np.ndarray} como parse_element_table, una fila por época.
+    '''
+    epochs = tuple(float(jd) for jd in epochs_jd)
+    key = (command, center, epochs)
+    table = _series_cache.get(key)
+    if table is _MISSING:
+        chunks = [epochs[k:k + HORIZONS_TLIST_MAX] for k in range(0, len(epochs), HORIZONS_TLIST_MAX)]
+        results = await asyncio.gather(*(
+            _fetch_result(command, center, " ".join(f"'{jd:.9f}'" for jd in chunk), TLIST_TYPE="JD")
+            for chunk in chunks))
+        tables = [parse_element_table(result) for result in results]
+        for chunk, t in zip(chunks, tables):
+            if t["JDTDB"].size != len(chunk):
+                raise ValueError(f"Horizons: {t['JDTDB'].size} rows for {len(chunk)} requested epochs")
+        table = {k: np.concatenate([t[k] for t in tables]) for k in tables[0]}
+        _series_cache.set(key, table)
+    return {k: v.copy() for k, v in table.items()}
+
+
+def parse_element_table(result: str) -> dict:
+    ''' Todas las filas del bloque $$SOE ... $$EOE de una tabla de elementos de Horizons.
+
+        La cabecera de columnas sobre $$SOE se comprueba contra ELEMENT_LABELS (si Horizons
+        no la pone, cada fila debe tener igualmente ese número de columnas). Las columnas
+        numéricas pasan directamente a arrays float64, un valor por época; ángulos y
+        movimiento medio en radianes.
+
+        Args:
+            result (str): texto "result" de una respuesta ELEMENTS de Horizons con CSV_FORMAT=YES
+
+        Returns:
+            dict: {etiqueta: np.ndarray} para cada etiqueta de ELEMENT_LABELS salvo CalendarDate
+    '''
+    start = result.find("$$SOE")
+    end = result.find("$$EOE", start)
+    if start < 0 or end < 0:
+        raise ValueError(f"Horizons: no $$SOE/$$EOE block in response: {result[:200]!r}")
+
+    header = _table_header(result[:start])
+    if header is not None and tuple(header) != ELEMENT_LABELS:
+        raise ValueError(f"Horizons: unexpected element columns {header}")
+
+    ncols = len(ELEMENT_LABELS)
+    rows = []
+    for line in result[start + 5:end].splitlines():
+        if not line.strip():
             continue
-        val = v.strip()
-        try:
-            num = float(val)
-            # Formato decimal sin notación científica
-            # Ajusta el número de decimales según lo que necesites
-            clean[k] = f"{num:.12f}".rstrip("0").rstrip(".")
-        except ValueError:
-            # No es número → dejar como string limpio
-            clean[k] = val
-    return clean
+        cells = line.rstrip().rstrip(",").split(",")
+        if len(cells) != ncols:
+            raise ValueError(f"Horizons: expected {ncols} columns, got {len(cells)}: {line!r}")
+        rows.append(cells)
+    if not rows:
+        raise ValueError("Horizons: empty $$SOE block")
+
+    table = {}
+    for k, label in enumerate(ELEMENT_LABELS):
+        if label == "CalendarDate":
+            continue
+        column = np.array([row[k] for row in rows], dtype=np.float64)
+        table[label] = np.radians(column) if label in ANGLE_LABELS else column
+    return table
+
+
+def parse_elements(data):
+    ''' Elementos de la primera época de una respuesta de Horizons, como float (ángulos en radianes). '''
+    table = parse_element_table(data)
+    keys = ['A', 'EC', 'IN', 'OM', 'W', 'MA', 'PR', 'N', 'JDTDB']
+    return {k: float(table[k][0]) for k in keys}
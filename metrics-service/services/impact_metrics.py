@@ -1,6 +1,8 @@
 import math
 from dataclasses import dataclass
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Sequence
+
+from services.cache import memoize
 
 # =======================
 # Utilidades y constantes
@@ -14,6 +16,9 @@ T_STAR = 3000.0             # K (temperatura efectiva bola de fuego, simplif.)
 GRAVITY = 9.80665           # m/s^2
 RHO_TARGET = 2_500.0        # kg/m^3 densidad objetivo (suelo rocoso típico)
 YIELD_STRENGTH = 3e6        # Pa (orden magnitud; para transiciones cráter simple/compuesto)
+PX_MACH = 75_000.0          # Pa (sobrepresión de referencia, región Mach)
+RX_MACH = 290.0             # m (distancia escalada de referencia, región Mach)
+SAMPLE_R_KM = (1, 5, 10, 20, 50, 100)  # km, distancias de muestra del perfil térmico resumido
 
 def joules_to_megatons(joules: float) -> float:
     return joules / J_PER_MT
@@ -53,6 +58,12 @@ class Target:
     density_kgm3: float = RHO_TARGET
     water_depth_m: Optional[float] = None  # m (None si impacto terrestre)
 
+@dataclass
+class IsobarSolution:
+    radius_m: Optional[float]       # None si el umbral no se alcanza; R_max si "beyond_range"
+    branch: Optional[str] = None    # "regular" | "mach" | "transition" | "beyond_range"
+    in_discontinuity: bool = False  # solución en el salto regular/Mach en rm1 ("transition")
+
 @dataclass
 class ImpactScenario:
     is_airburst: bool
@@ -169,7 +180,8 @@ class ImpactMetrics:
     @staticmethod
     def corrected_exposure(E_joules: float, r_m: float, eta: float = 3e-3) -> float:
         Rf = ImpactMetrics.fireball_radius(E_joules)
-        phi0 = ImpactMetrics.thermal_exposure_at_distance(E_joules, r_m, eta)
+        # Exposición base en superficie (semiesfera), sin atmósfera explícita
+        phi0 = ImpactMetrics.thermal_exposure_at_distance(E_joules, r_m, Atmosphere(), eta)
         f = ImpactMetrics.horizon_fraction(r_m, Rf)
         return f * phi0
 
@@ -185,14 +197,12 @@ class ImpactMetrics:
 
     # ---- Sobrepresión (airburst) ----
     @staticmethod
-    def overpressure_collins_airburst(E_joules: float, burst_altitude_m: float, r_m: float) -> float:
+    def _overpressure_params(E_joules: float, burst_altitude_m: float):
         """
-        Sobrepresión (Pa) en el suelo a distancia r_m para una explosión aérea a altura h.
-        Implementa pieza a pieza (regular vs Mach reflection) con escalado ~ E^(1/3).
+        Parámetros escalados del modelo de sobrepresión: (scale, h1, p0, beta, rm1).
         """
         E_kt = joules_to_kilotons(E_joules)
         scale = E_kt ** (1.0 / 3.0) if E_kt > 0 else 1.0
-        r1 = r_m / scale
         h1 = burst_altitude_m / scale if burst_altitude_m > 0 else 1e-6
 
         # Región cercana (parámetros ajustables)
@@ -202,43 +212,131 @@ class ImpactMetrics:
         # Radio de transición a reflexión Mach
         denom = (550.0 - h1)
         rm1 = 1e12 if denom <= 0 else 550.0 * (h1 ** 1.2) / (1.2 * denom)
+        return scale, h1, p0, beta, rm1
+
+    @staticmethod
+    def _overpressure_mach(r1: float) -> float:
+        # Lejana (Mach): forma funcional simplificada
+        return PX_MACH * (RX_MACH / (4.0 * r1)) * (1.0 + 3.0 * ((r1 / RX_MACH) ** 1.3))
+
+    @staticmethod
+    def _overpressure_mach_deriv(r1: float) -> float:
+        return 0.25 * PX_MACH * (-RX_MACH / r1 ** 2 + 0.9 * (r1 / RX_MACH) ** -0.7 / RX_MACH)
+
+    @staticmethod
+    def overpressure_collins_airburst(E_joules: float, burst_altitude_m: float, r_m: float) -> float:
+        """
+        Sobrepresión (Pa) en el suelo a distancia r_m para una explosión aérea a altura h.
+        Implementa pieza a pieza (regular vs Mach reflection) con escalado ~ E^(1/3).
+        """
+        scale, h1, p0, beta, rm1 = ImpactMetrics._overpressure_params(E_joules, burst_altitude_m)
+        r1 = r_m / scale
 
         if r1 <= rm1:
             p = p0 * math.exp(-beta * r1)
         else:
-            # Lejana (Mach): forma funcional simplificada
-            PX = 75_000.0    # Pa
-            RX = 290.0       # m
-            p = PX * (RX / (4.0 * r1)) * (1.0 + 3.0 * ((r1 / RX) ** 1.3))
+            p = ImpactMetrics._overpressure_mach(r1)
 
         return max(0.0, p)
 
     @staticmethod
-    def radius_for_overpressure_airburst(E_joules: float, burst_altitude_m: float,
-                                         p_threshold_kpa: float,
-                                         R_min: float = 10.0, R_max: float = 1_000_000.0,
-                                         tol: float = 1.0, maxiter: int = 100) -> Optional[float]:
+    @memoize("isobars")
+    def isobar_radii_airburst(E_joules: float, burst_altitude_m: float,
+                              thresholds_kpa: Optional[Dict[str, float]] = None,
+                              R_min: float = 10.0, R_max: float = 1_000_000.0,
+                              tol: float = 1.0, maxiter: int = 50) -> Dict[str, IsobarSolution]:
         """
-        Búsqueda binaria de radio (m) donde la sobrepresión ≈ p_threshold_kpa.
-        Devuelve None si no se alcanza.
+        Radio (m) donde la sobrepresión cae por primera vez al umbral, para todos
+        los umbrales a la vez (por defecto damage_thresholds_kpa).
+          - Rama regular: p0 * exp(-beta * r1) se invierte de forma analítica.
+          - Rama Mach: Newton acotado por bisección sobre el tramo decreciente.
+          - Si el umbral cae dentro del salto en rm1, se devuelve rm1 con
+            branch="transition" e in_discontinuity=True.
+          - Si la sobrepresión sigue por encima del umbral en R_max, se devuelve
+            R_max (cota inferior) con branch="beyond_range".
+        radius_m es None si la sobrepresión ya es menor que el umbral en R_min.
         """
-        target_Pa = p_threshold_kpa * 1_000.0
-        f = lambda R: ImpactMetrics.overpressure_collins_airburst(E_joules, burst_altitude_m, R) - target_Pa
+        if thresholds_kpa is None:
+            thresholds_kpa = ImpactMetrics.damage_thresholds_kpa()
+
+        scale, h1, p0, beta, rm1 = ImpactMetrics._overpressure_params(E_joules, burst_altitude_m)
+        lo1, hi1 = R_min / scale, R_max / scale
+        p_lo = ImpactMetrics.overpressure_collins_airburst(E_joules, burst_altitude_m, R_min)
+
+        # Límites a ambos lados del salto regular -> Mach
+        p_rm1_regular = p0 * math.exp(-beta * rm1)
+        p_rm1_mach = ImpactMetrics._overpressure_mach(rm1)
+        # La forma Mach solo decrece hasta su mínimo (d/dr1 = 0)
+        r1_mach_min = RX_MACH * (1.0 / 0.9) ** (1.0 / 1.3)
+        beyond_range = IsobarSolution(R_max, "beyond_range")
+
+        out = {}
+        for key, kpa in thresholds_kpa.items():
+            p_t = kpa * 1_000.0
+            if p_t <= 0 or p_lo < p_t:
+                out[key] = IsobarSolution(None)
+                continue
+
+            start = lo1
+            if lo1 <= rm1:
+                if p_rm1_regular <= p_t:
+                    r1 = math.log(p0 / p_t) / beta
+                    R = r1 * scale
+                    out[key] = IsobarSolution(R, "regular") if R <= R_max else beyond_range
+                    continue
+                if p_rm1_mach <= p_t:
+                    R = rm1 * scale
+                    out[key] = IsobarSolution(R, "transition", True) if R <= R_max else beyond_range
+                    continue
+                start = rm1
+
+            end = min(r1_mach_min, hi1)
+            # Sin cruce en el tramo decreciente: por encima del umbral hasta R_max
+            # (o hasta el mínimo de la forma Mach, que luego vuelve a crecer)
+            if start >= end or ImpactMetrics._overpressure_mach(end) > p_t:
+                out[key] = beyond_range
+                continue
+
+            r1 = ImpactMetrics._solve_mach(p_t, start, end, tol / scale, maxiter)
+            out[key] = IsobarSolution(r1 * scale, "mach")
 
-        if f(R_min) < 0:
-            return None
+        return out
 
-        lo, hi = R_min, R_max
+    @staticmethod
+    def _solve_mach(p_t: float, lo: float, hi: float, tol: float, maxiter: int) -> float:
+        """
+        Newton sobre la rama Mach, con bisección de respaldo si el paso sale de [lo, hi].
+        Requiere f(lo) >= 0 >= f(hi).
+        """
+        x = 0.5 * (lo + hi)
         for _ in range(maxiter):
-            mid = 0.5 * (lo + hi)
-            val = f(mid)
-            if abs(hi - lo) <= tol:
-                return mid
-            if val > 0:
-                lo = mid
+            fx = ImpactMetrics._overpressure_mach(x) - p_t
+            if fx > 0:
+                lo = x
             else:
-                hi = mid
-        return 0.5 * (lo + hi)
+                hi = x
+            d = ImpactMetrics._overpressure_mach_deriv(x)
+            x_new = x - fx / d if d != 0 else 0.5 * (lo + hi)
+            if not (lo < x_new < hi):
+                x_new = 0.5 * (lo + hi)
+            if abs(x_new - x) <= tol:
+                return x_new
+            x = x_new
+        return x
+
+    @staticmethod
+    def radius_for_overpressure_airburst(E_joules: float, burst_altitude_m: float,
+                                         p_threshold_kpa: float,
+                                         R_min: float = 10.0, R_max: float = 1_000_000.0,
+                                         tol: float = 1.0, maxiter: int = 100) -> Optional[float]:
+        """
+        Radio (m) donde la sobrepresión ≈ p_threshold_kpa (ver isobar_radii_airburst).
+        Devuelve None si no se alcanza, y R_max si sigue por encima del umbral en R_max.
+        """
+        sol = ImpactMetrics.isobar_radii_airburst(
+            E_joules, burst_altitude_m, {"threshold": p_threshold_kpa},
+            R_min=R_min, R_max=R_max, tol=tol, maxiter=maxiter)
+        return sol["threshold"].radius_m
 
     # ---- Cráter (impacto en suelo) ----
     @staticmethod
@@ -293,10 +391,10 @@ class ImpactMetrics:
 
     # ---- “Runner” principal para un escenario ----
     @staticmethod
-    def summarize(asteroid: Asteroid, scenario: ImpactScenario, target: Target, atm: Atmosphere) -> Dict[str, Any]:
-        E = ImpactMetrics.kinetic_energy(asteroid)
-        W_mt = joules_to_megatons(E)
-
+    def summarize(asteroid: Asteroid, scenario: ImpactScenario, target: Target, atm: Atmosphere,
+                  sample_r_km: Sequence[float] = SAMPLE_R_KM) -> Dict[str, Any]:
+        # La caché guarda solo la física: la clave redondea las entradas, así que el eco
+        # de "inputs" (y las distancias del perfil) se rehace con los argumentos de esta llamada
         out = {
             "inputs": {
                 "diameter_m": asteroid.diameter_m,
@@ -307,6 +405,20 @@ class ImpactMetrics:
                 "target_density_kgm3": target.density_kgm3,
                 "water_depth_m": target.water_depth_m,
             },
+            **ImpactMetrics._summary_physics(asteroid, scenario, target, atm, sample_r_km),
+        }
+        for entry, rk in zip(out["thermal_profile"], sample_r_km):
+            entry["r_km"] = rk
+        return out
+
+    @staticmethod
+    @memoize("summarize")
+    def _summary_physics(asteroid: Asteroid, scenario: ImpactScenario, target: Target, atm: Atmosphere,
+                         sample_r_km: Sequence[float]) -> Dict[str, Any]:
+        E = ImpactMetrics.kinetic_energy(asteroid)
+        W_mt = joules_to_megatons(E)
+
+        out = {
             "energy": {
                 "E_joules": E,
                 "yield_megatons": W_mt,
@@ -314,24 +426,28 @@ class ImpactMetrics:
             },
         }
 
-        # Térmico genérico (distancia de ejemplo; la UI usará perfiles radiales)
-        sample_r_km = [1, 5, 10, 20, 50, 100]
+        # Térmico genérico (distancias de ejemplo; perfil completo en radial_profile)
+        tau = ImpactMetrics.thermal_duration_tau(E)  # no depende de la distancia
         thermal = []
         for rk in sample_r_km:
             r_m = rk * 1000.0
             phi = ImpactMetrics.corrected_exposure(E, r_m)
-            tau = ImpactMetrics.thermal_duration_tau(E)
             thermal.append({"r_km": rk, "fluence_Jm2": phi, "duration_s": tau})
         out["thermal_profile"] = thermal
 
         if scenario.is_airburst and atm.burst_altitude_m:
-            # Isóbaras para 1/3/5 psi
-            thresholds = ImpactMetrics.damage_thresholds_kpa()
-            isobars = {}
-            for key, kpa in thresholds.items():
-                R = ImpactMetrics.radius_for_overpressure_airburst(E, atm.burst_altitude_m, kpa)
-                isobars[key] = None if R is None else R / 1000.0
-            out["overpressure_isobars_km"] = isobars
+            # Isóbaras para 1/3/5/10 psi (todas en una pasada)
+            solutions = ImpactMetrics.isobar_radii_airburst(E, atm.burst_altitude_m)
+            out["overpressure_isobars_km"] = {
+                key: None if sol.radius_m is None else sol.radius_m / 1000.0
+                for key, sol in solutions.items()
+            }
+            out["overpressure_isobars_discontinuity"] = {
+                key: sol.in_discontinuity for key, sol in solutions.items()
+            }
+            out["overpressure_isobars_beyond_range"] = {
+                key: sol.branch == "beyond_range" for key, sol in solutions.items()
+            }
 
         else:
             # Impacto en suelo: cráter + Mw
@@ -0,0 +1,575 @@
+import math
+from dataclasses import fields, is_dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from services.impact_metrics import (
+    ImpactMetrics, Asteroid, Atmosphere, Target, ImpactScenario,
+    J_PER_MT, J_PER_KT, R_EARTH, SIGMA, T_STAR, GRAVITY, PX_MACH, RX_MACH, SAMPLE_R_KM,
+)
+
+# =======================
+# Tipos estructurados
+# =======================
+# Un campo por atributo del dataclass escalar. Los Optional[float] se guardan
+# como NaN cuando valen None (p. ej. burst_altitude_m o water_depth_m).
+ASTEROID_DTYPE = np.dtype([
+    ("diameter_m", "f8"),
+    ("velocity_mps", "f8"),
+    ("density_kgm3", "f8"),
+    ("shape_factor", "f8"),
+    ("porosity", "f8"),
+])
+
+ATMOSPHERE_DTYPE = np.dtype([
+    ("k_atenuacion", "f8"),
+    ("burst_altitude_m", "f8"),
+])
+
+TARGET_DTYPE = np.dtype([
+    ("density_kgm3", "f8"),
+    ("water_depth_m", "f8"),
+])
+
+SCENARIO_DTYPE = np.dtype([
+    ("is_airburst", "?"),
+    ("latitude_deg", "f8"),
+    ("longitude_deg", "f8"),
+])
+
+# Códigos de IsobarSolution.branch en los arrays "branch"
+ISOBAR_BRANCHES = (None, "regular", "mach", "transition", "beyond_range")
+
+
+def to_structured(items: Iterable[Any], dtype: np.dtype) -> np.ndarray:
+    """
+    Convierte una lista de dataclasses (Asteroid, Target...) o dicts en un
+    array estructurado de numpy. None -> NaN (False en los campos booleanos;
+    un NaN en un campo booleano es un error, numpy lo convertiría en True).
+    """
+    rows = []
+    for item in items:
+        if is_dataclass(item):
+            item = {f.name: getattr(item, f.name) for f in fields(item)}
+        row = []
+        for name in dtype.names:
+            value = item.get(name)
+            if dtype[name] == np.bool_:
+                value = _check_flag(name, False if value is None else value)
+            elif value is None:
+                value = math.nan
+            row.append(value)
+        rows.append(tuple(row))
+    return np.array(rows, dtype=dtype)
+
+
+def _field(obj: Any, name: str, default: Any) -> np.ndarray:
+    """
+    Lee un campo de un array estructurado, un dict de arrays o un dataclass
+    con atributos array. Los campos ausentes toman el valor por defecto del
+    dataclass escalar; None se traduce a NaN.
+    """
+    value = _get(obj, name, default)
+    if value is None:
+        value = math.nan
+    return np.asarray(value, dtype=float)
+
+
+def _get(obj: Any, name: str, default: Any) -> Any:
+    if isinstance(obj, np.ndarray) and obj.dtype.names is not None:
+        return obj[name] if name in obj.dtype.names else default
+    if isinstance(obj, Mapping):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def _check_flag(name: str, value: Any) -> Any:
+    """Rechaza NaN en un flag booleano: bool(nan) es True y activaría la rama."""
+    if np.any(np.isnan(np.asarray(value, dtype=float))):
+        raise ValueError(f"{name} must be a boolean, got NaN")
+    return value
+
+
+def _flag(obj: Any, name: str, default: bool) -> np.ndarray:
+    """Como _field, para un flag booleano: None -> default, NaN -> ValueError."""
+    value = _get(obj, name, default)
+    if value is None:
+        value = default
+    return np.asarray(_check_flag(name, value)).astype(bool)
+
+
+def _optional(values: np.ndarray) -> np.ndarray:
+    """Equivalente vectorial de `x or 0.0` para Optional[float] codificado con NaN."""
+    return np.where(np.isnan(values), 0.0, values)
+
+
+# =======================
+# Núcleo vectorizado
+# =======================
+class VectorizedImpactMetrics:
+    """
+    Versión numpy de ImpactMetrics: mismas fórmulas, evaluadas elemento a
+    elemento con broadcasting sobre arrays de escenarios.
+    Los resultados que en la versión escalar son None se devuelven como NaN.
+    """
+
+    # ---- Energía ----
+    @staticmethod
+    def kinetic_energy(asteroid: Any) -> np.ndarray:
+        """
+        Energia cinética (J).
+        """
+        r = _field(asteroid, "diameter_m", math.nan) / 2.0
+        shape_factor = _field(asteroid, "shape_factor", 1.0)
+        porosity = _field(asteroid, "porosity", 0.0)
+        volume = (4.0 / 3.0) * math.pi * (r ** 3) * shape_factor
+        density_effective = _field(asteroid, "density_kgm3", math.nan) * (1.0 - porosity)
+        mass = volume * density_effective
+        return 0.5 * mass * (_field(asteroid, "velocity_mps", math.nan) ** 2)
+
+    @staticmethod
+    def kinetic_energy_megatons(asteroid: Any) -> np.ndarray:
+        return VectorizedImpactMetrics.kinetic_energy(asteroid) / J_PER_MT
+
+    # ---- Bola de fuego / térmico ----
+    @staticmethod
+    def fireball_radius(E_joules) -> np.ndarray:
+        return 0.002 * (np.asarray(E_joules, dtype=float) ** (1.0 / 3.0))
+
+    @staticmethod
+    def horizon_fraction(r_m, Rf) -> np.ndarray:
+        """
+        Corrección geométrica por curvatura (ver ImpactMetrics.horizon_fraction).
+        """
+        r_m = np.asarray(r_m, dtype=float)
+        Rf = np.asarray(Rf, dtype=float)
+        delta = r_m / R_EARTH
+        h = (1.0 - np.cos(delta)) * R_EARTH
+        hidden = h >= Rf
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(hidden, 0.0, h / np.where(hidden, 1.0, Rf))
+        G = np.arccos(np.clip(ratio, -1.0, 1.0))
+        f = (2.0 / math.pi) * (G - ratio * np.sin(G))
+        return np.where(hidden, 0.0, np.clip(f, 0.0, 1.0))
+
+    @staticmethod
+    def thermal_exposure_at_distance(E_joules, horizontal_distance_m,
+                                     atmosfera: Any, eta=3e-3) -> np.ndarray:
+        """
+        Exposición térmica (J/m^2); ramas suelo/aire igual que la versión escalar.
+        Distancias <= 0 devuelven inf.
+        """
+        E = np.asarray(E_joules, dtype=float)
+        r = np.asarray(horizontal_distance_m, dtype=float)
+        k = _field(atmosfera, "k_atenuacion", 0.1)
+        h = _optional(_field(atmosfera, "burst_altitude_m", None))
+        E, r, k, h, eta = np.broadcast_arrays(E, r, k, h, np.asarray(eta, dtype=float))
+
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            # Explosión en suelo: media esfera
+            ground = eta * E / (2.0 * math.pi * (r ** 2))
+
+            # Explosión aérea
+            distance = np.sqrt(r ** 2 + h ** 2)
+            cos_theta = np.clip(h / distance, 0.0, 1.0)
+            G = 0.5 + 0.5 * (h / (h + r))
+            air_mass = distance / (h + 1.0)
+            tau = np.exp(-k * air_mass)
+            Rf = VectorizedImpactMetrics.fireball_radius(E)
+            frec_visible = VectorizedImpactMetrics.horizon_fraction(r, Rf)
+            air = eta * E * cos_theta * tau * G * frec_visible / (4.0 * math.pi * distance ** 2)
+
+        out = np.where(h == 0, ground, air)
+        return np.where(r <= 0, math.inf, out)
+
+    @staticmethod
+    def corrected_exposure(E_joules, r_m, eta=3e-3) -> np.ndarray:
+        Rf = VectorizedImpactMetrics.fireball_radius(E_joules)
+        phi0 = VectorizedImpactMetrics.thermal_exposure_at_distance(
+            E_joules, r_m, {"burst_altitude_m": 0.0}, eta)
+        f = VectorizedImpactMetrics.horizon_fraction(r_m, Rf)
+        return f * phi0
+
+    @staticmethod
+    def thermal_duration_tau(E_joules, eta=3e-3, T_star=T_STAR) -> np.ndarray:
+        """
+        Duración característica del pulso térmico (s).
+        """
+        E = np.asarray(E_joules, dtype=float)
+        Rf = VectorizedImpactMetrics.fireball_radius(E)
+        denom = 2.0 * math.pi * (Rf ** 2) * SIGMA * (T_star ** 4)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(denom <= 0, 0.0, (eta * E) / denom)
+
+    # ---- Sobrepresión (airburst) ----
+    @staticmethod
+    def _overpressure_params(E_joules, burst_altitude_m):
+        """
+        Parámetros escalados del modelo de sobrepresión: (scale, h1, p0, beta, rm1).
+        """
+        E_kt = np.asarray(E_joules, dtype=float) / J_PER_KT
+        h = np.asarray(burst_altitude_m, dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            scale = np.where(E_kt > 0, np.abs(E_kt) ** (1.0 / 3.0), 1.0)
+            h1 = np.where(h > 0, h / scale, 1e-6)
+            p0 = 3.14e11 * (h1 ** -2.6)
+            beta = 34.87 * (h1 ** -1.73)
+            denom = 550.0 - h1
+            rm1 = np.where(denom <= 0, 1e12, 550.0 * (h1 ** 1.2) / (1.2 * denom))
+        return scale, h1, p0, beta, rm1
+
+    @staticmethod
+    def _overpressure_mach(r1) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            return PX_MACH * (RX_MACH / (4.0 * r1)) * (1.0 + 3.0 * ((r1 / RX_MACH) ** 1.3))
+
+    @staticmethod
+    def _overpressure_mach_deriv(r1) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            return 0.25 * PX_MACH * (-RX_MACH / r1 ** 2 + 0.9 * (r1 / RX_MACH) ** -0.7 / RX_MACH)
+
+    @staticmethod
+    def overpressure_collins_airburst(E_joules, burst_altitude_m, r_m) -> np.ndarray:
+        """
+        Sobrepresión (Pa) en el suelo, regular vs Mach reflection, escalado ~ E^(1/3).
+        """
+        scale, h1, p0, beta, rm1 = VectorizedImpactMetrics._overpressure_params(E_joules, burst_altitude_m)
+        r1 = np.asarray(r_m, dtype=float) / scale
+
+        with np.errstate(over="ignore", invalid="ignore"):
+            near = p0 * np.exp(-beta * r1)
+        far = VectorizedImpactMetrics._overpressure_mach(r1)
+        p = np.where(r1 <= rm1, near, far)
+
+        return np.maximum(0.0, p)
+
+    @staticmethod
+    def isobar_radii_airburst(E_joules, burst_altitude_m,
+                              thresholds_kpa: Optional[Dict[str, float]] = None,
+                              R_min: float = 10.0, R_max: float = 1_000_000.0,
+                              tol: float = 1.0, maxiter: int = 50) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Versión vectorial de ImpactMetrics.isobar_radii_airburst. Por umbral
+        devuelve arrays "radius_m" (NaN = None), "branch" (índice en
+        ISOBAR_BRANCHES) e "in_discontinuity".
+        """
+        if thresholds_kpa is None:
+            thresholds_kpa = ImpactMetrics.damage_thresholds_kpa()
+
+        E, h = np.broadcast_arrays(np.asarray(E_joules, dtype=float),
+                                   np.asarray(burst_altitude_m, dtype=float))
+        scale, h1, p0, beta, rm1 = VectorizedImpactMetrics._overpressure_params(E, h)
+        lo1, hi1 = R_min / scale, R_max / scale
+        p_lo = VectorizedImpactMetrics.overpressure_collins_airburst(E, h, R_min)
+
+        with np.errstate(over="ignore", invalid="ignore"):
+            p_rm1_regular = p0 * np.exp(-beta * rm1)
+        p_rm1_mach = VectorizedImpactMetrics._overpressure_mach(rm1)
+        r1_mach_min = RX_MACH * (1.0 / 0.9) ** (1.0 / 1.3)
+
+        out = {}
+        for key, kpa in thresholds_kpa.items():
+            p_t = np.broadcast_to(np.asarray(kpa, dtype=float) * 1_000.0, E.shape)
+            pending = (p_t > 0) & (p_lo >= p_t)
+
+            radius = np.full(E.shape, math.nan)
+            branch = np.zeros(E.shape, dtype=np.int8)
+
+            # Rama regular: inversión analítica
+            in_regular = pending & (lo1 <= rm1)
+            regular = in_regular & (p_rm1_regular <= p_t)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                r1_reg = np.log(p0 / p_t) / beta
+            radius = np.where(regular, r1_reg * scale, radius)
+            branch = np.where(regular, 1, branch)
+
+            # Umbral dentro del salto en rm1
+            transition = in_regular & ~regular & (p_rm1_mach <= p_t)
+            radius = np.where(transition, rm1 * scale, radius)
+            branch = np.where(transition, 3, branch)
+
+            # Rama Mach: Newton acotado sobre el tramo decreciente
+            start = np.where(in_regular, rm1, lo1)
+            end = np.minimum(r1_mach_min, hi1)
+            mach_pending = pending & ~regular & ~transition
+            mach = (mach_pending & (start < end)
+                    & (VectorizedImpactMetrics._overpressure_mach(end) <= p_t))
+            if mach.any():
+                r1_mach = VectorizedImpactMetrics._solve_mach(
+                    p_t[mach], start[mach], end[mach], tol / scale[mach], maxiter)
+                radius[mach] = r1_mach * scale[mach]
+                branch[mach] = 2
+
+            # Por encima del umbral hasta R_max: R_max como cota inferior
+            beyond = (mach_pending & ~mach) | (radius > R_max)
+            radius = np.where(beyond, R_max, radius)
+            branch = np.where(beyond, 4, branch)
+            out[key] = {"radius_m": radius, "branch": branch, "in_discontinuity": branch == 3}
+
+        return out
+
+    @staticmethod
+    def _solve_mach(p_t, lo, hi, tol, maxiter: int) -> np.ndarray:
+        """
+        Newton sobre la rama Mach para todos los escenarios a la vez, con
+        bisección de respaldo cuando el paso sale de [lo, hi].
+        """
+        lo, hi = lo.copy(), hi.copy()
+        x = 0.5 * (lo + hi)
+        active = np.ones(x.shape, dtype=bool)
+        for _ in range(maxiter):
+            fx = VectorizedImpactMetrics._overpressure_mach(x) - p_t
+            lo = np.where(active & (fx > 0), x, lo)
+            hi = np.where(active & ~(fx > 0), x, hi)
+            d = VectorizedImpactMetrics._overpressure_mach_deriv(x)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                x_new = np.where(d != 0, x - fx / d, 0.5 * (lo + hi))
+            x_new = np.where((lo < x_new) & (x_new < hi), x_new, 0.5 * (lo + hi))
+            x_new = np.where(active, x_new, x)
+            active = active & (np.abs(x_new - x) > tol)
+            x = x_new
+            if not active.any():
+                break
+        return x
+
+    @staticmethod
+    def radius_for_overpressure_airburst(E_joules, burst_altitude_m, p_threshold_kpa,
+                                         R_min: float = 10.0, R_max: float = 1_000_000.0,
+                                         tol: float = 1.0, maxiter: int = 100) -> np.ndarray:
+        """
+        Radio (m) donde la sobrepresión ≈ p_threshold_kpa. NaN donde la escalar devuelve None
+        (R_max donde sigue por encima del umbral en R_max).
+        """
+        sol = VectorizedImpactMetrics.isobar_radii_airburst(
+            E_joules, burst_altitude_m, {"threshold": p_threshold_kpa},
+            R_min=R_min, R_max=R_max, tol=tol, maxiter=maxiter)
+        return sol["threshold"]["radius_m"]
+
+    # ---- Cráter ----
+    @staticmethod
+    def crater_diameter_simple(E_joules, target: Any) -> np.ndarray:
+        """
+        Diámetro de cráter final (m), escala pi-group simplificada.
+        """
+        k = 1.8e-3
+        rho_t = _field(target, "density_kgm3", Target.density_kgm3)
+        rho_i_over_rho_t = 3000.0 / np.maximum(rho_t, 1.0)
+        D = k * (GRAVITY ** -0.17) * (rho_i_over_rho_t ** 0.11) * (np.asarray(E_joules, dtype=float) ** 0.29)
+        return np.maximum(0.0, D)
+
+    # ---- Magnitud sísmica (Mw) ----
+    @staticmethod
+    def seismic_magnitude_Mw(E_joules, coupling=1e-4) -> np.ndarray:
+        E_s = np.maximum(1.0, coupling * np.asarray(E_joules, dtype=float))
+        return (np.log10(E_s) - 4.8) / 1.5
+
+    # ---- Tsunami ----
+    @staticmethod
+    def tsunami_wave_height_coast(E_joules, depth_m, range_km=100.0) -> np.ndarray:
+        """
+        Altura de ola en costa (m). Profundidad NaN (sin agua) o <= 0 da 0.
+        """
+        E = np.asarray(E_joules, dtype=float)
+        depth = _optional(np.asarray(depth_m, dtype=float))
+        c = 0.012
+        h = c * (E ** 0.25) / (np.maximum(depth, 1.0) ** 0.5 * np.maximum(range_km, 1.0) ** 0.75)
+        return np.where(depth <= 0, 0.0, np.maximum(0.0, h))
+
+    # ---- Perfil radial ----
+    @staticmethod
+    def _profile_curves(E: float, burst_altitude_m: float, Rf: float, r_m: np.ndarray):
+        fluence = VectorizedImpactMetrics.corrected_exposure(E, r_m)
+        overpressure = VectorizedImpactMetrics.overpressure_collins_airburst(E, burst_altitude_m, r_m)
+        visible = VectorizedImpactMetrics.horizon_fraction(r_m, Rf)
+        return fluence, overpressure, visible
+
+    @staticmethod
+    def radial_profile(E_joules: float, burst_altitude_m: Optional[float] = None,
+                       r_km: Optional[Sequence[float]] = None,
+                       r_min_km: float = 0.1, r_max_km: float = 1000.0,
+                       n_initial: int = 32, max_points: int = 256,
+                       tol: float = 0.05, min_ratio: float = 1.001) -> Dict[str, Any]:
+        """
+        Fluencia térmica (J/m^2), sobrepresión (Pa) y fracción visible de la bola
+        de fuego en función de la distancia.
+
+        Con r_km se evalúa esa malla tal cual. Si no, se parte de n_initial
+        puntos log-espaciados y se insertan puntos medios (en log r) donde la
+        interpolación lineal de log(fluencia), log(sobrepresión) o la fracción
+        visible se desvía más de tol, hasta max_points o hasta que el
+        intervalo sea menor que min_ratio.
+        Los términos que no dependen de r (Rf, duración) se calculan una vez.
+        """
+        E = float(E_joules)
+        h = float(burst_altitude_m or 0.0)
+        Rf = float(VectorizedImpactMetrics.fireball_radius(E))
+        duration = float(VectorizedImpactMetrics.thermal_duration_tau(E))
+
+        def curves(r_m):
+            return VectorizedImpactMetrics._profile_curves(E, h, Rf, r_m)
+
+        def shape(fluence, overpressure, visible):
+            # Espacio donde se mide la no linealidad: log para magnitudes positivas
+            with np.errstate(divide="ignore"):
+                return np.stack([np.log(np.maximum(fluence, 1e-300)),
+                                 np.log(np.maximum(overpressure, 1e-300)),
+                                 visible])
+
+        if r_km is not None:
+            r_m = np.asarray(r_km, dtype=float) * 1000.0
+            fluence, overpressure, visible = curves(r_m)
+        else:
+            r_m = np.geomspace(r_min_km * 1000.0, r_max_km * 1000.0, n_initial)
+            fluence, overpressure, visible = curves(r_m)
+            while r_m.size < max_points:
+                mid = np.sqrt(r_m[:-1] * r_m[1:])
+                m_fl, m_op, m_vis = curves(mid)
+                y = shape(fluence, overpressure, visible)
+                err = np.max(np.abs(shape(m_fl, m_op, m_vis) - 0.5 * (y[:, :-1] + y[:, 1:])), axis=0)
+                err = np.where(r_m[1:] / r_m[:-1] > min_ratio, err, 0.0)
+
+                refine = np.nonzero(err > tol)[0]
+                if refine.size == 0:
+                    break
+                budget = max_points - r_m.size
+                if refine.size > budget:
+                    refine = refine[np.argsort(err[refine])[::-1][:budget]]
+
+                order = np.argsort(np.concatenate([r_m, mid[refine]]))
+                r_m = np.concatenate([r_m, mid[refine]])[order]
+                fluence = np.concatenate([fluence, m_fl[refine]])[order]
+                overpressure = np.concatenate([overpressure, m_op[refine]])[order]
+                visible = np.concatenate([visible, m_vis[refine]])[order]
+
+        return {
+            "E_joules": E,
+            "fireball_radius_m": Rf,
+            "duration_s": duration,
+            "r_km": r_m / 1000.0,
+            "fluence_Jm2": fluence,
+            "overpressure_Pa": overpressure,
+            "horizon_fraction": visible,
+        }
+
+    # ---- “Runner” para N escenarios ----
+    @staticmethod
+    def summarize(asteroid: Any, scenario: Any, target: Any, atm: Any,
+                  sample_r_km=SAMPLE_R_KM) -> Dict[str, Any]:
+        """
+        Igual que ImpactMetrics.summarize pero devolviendo arrays (una fila por
+        escenario). Los campos que no aplican a una rama valen NaN.
+        """
+        E = VectorizedImpactMetrics.kinetic_energy(asteroid)
+        burst = _field(atm, "burst_altitude_m", None)
+        water = _field(target, "water_depth_m", None)
+        is_airburst = np.broadcast_to(
+            _flag(scenario, "is_airburst", False), E.shape)
+        airburst = is_airburst & (_optional(burst) != 0)
+        ground = ~airburst
+
+        r_m = np.asarray(sample_r_km, dtype=float) * 1000.0
+        fluence = VectorizedImpactMetrics.corrected_exposure(E[..., None], r_m)
+        tau = VectorizedImpactMetrics.thermal_duration_tau(E)
+
+        # Los escenarios de suelo usan umbral infinito: quedan resueltos (NaN) sin iterar
+        thresholds = {
+            key: np.where(airburst, kpa, math.inf)
+            for key, kpa in ImpactMetrics.damage_thresholds_kpa().items()
+        }
+        solutions = VectorizedImpactMetrics.isobar_radii_airburst(E, _optional(burst), thresholds)
+        isobars = {key: sol["radius_m"] / 1000.0 for key, sol in solutions.items()}
+        discontinuity = {key: sol["in_discontinuity"] & airburst for key, sol in solutions.items()}
+        beyond_range = {key: (sol["branch"] == 4) & airburst for key, sol in solutions.items()}
+
+        crater = np.where(ground, VectorizedImpactMetrics.crater_diameter_simple(E, target), math.nan)
+        Mw = np.where(ground, VectorizedImpactMetrics.seismic_magnitude_Mw(E), math.nan)
+        has_water = ground & (_optional(water) > 0)
+        tsunami = np.where(
+            has_water,
+            VectorizedImpactMetrics.tsunami_wave_height_coast(E, water, range_km=100.0),
+            math.nan,
+        )
+
+        return {
+            "E_joules": E,
+            "yield_megatons": E / J_PER_MT,
+            "yield_kilotons": E / J_PER_KT,
+            "sample_r_km": np.asarray(sample_r_km),
+            "fluence_Jm2": fluence,
+            "duration_s": tau,
+            "is_airburst": airburst,
+            "overpressure_isobars_km": isobars,
+            "overpressure_isobars_discontinuity": discontinuity,
+            "overpressure_isobars_beyond_range": beyond_range,
+            "crater_final_diameter_m": crater,
+            "seismic_Mw": Mw,
+            "tsunami_H_100km_m": tsunami,
+        }
+
+    @staticmethod
+    def summarize_many(asteroids: List[Asteroid], scenarios: List[ImpactScenario],
+                       targets: List[Target], atms: List[Atmosphere]) -> List[Dict[str, Any]]:
+        """
+        Evalúa N escenarios de una vez y devuelve una lista de dicts con la
+        misma forma que ImpactMetrics.summarize.
+        """
+        lengths = {len(asteroids), len(scenarios), len(targets), len(atms)}
+        if len(lengths) > 1:
+            raise ValueError("asteroids, scenarios, targets and atms must have the same length, got "
+                             f"{len(asteroids)}, {len(scenarios)}, {len(targets)}, {len(atms)}")
+        res = VectorizedImpactMetrics.summarize(
+            to_structured(asteroids, ASTEROID_DTYPE),
+            to_structured(scenarios, SCENARIO_DTYPE),
+            to_structured(targets, TARGET_DTYPE),
+            to_structured(atms, ATMOSPHERE_DTYPE),
+        )
+        sample_r_km = res["sample_r_km"].tolist()
+
+        out = []
+        for i, (asteroid, scenario, target, atm) in enumerate(zip(asteroids, scenarios, targets, atms)):
+            E = float(res["E_joules"][i])
+            summary = {
+                "inputs": {
+                    "diameter_m": asteroid.diameter_m,
+                    "velocity_mps": asteroid.velocity_mps,
+                    "density_kgm3": asteroid.density_kgm3,
+                    "is_airburst": scenario.is_airburst,
+                    "burst_altitude_m": atm.burst_altitude_m,
+                    "target_density_kgm3": target.density_kgm3,
+                    "water_depth_m": target.water_depth_m,
+                },
+                "energy": {
+                    "E_joules": E,
+                    "yield_megatons": float(res["yield_megatons"][i]),
+                    "yield_kilotons": float(res["yield_kilotons"][i]),
+                },
+                "thermal_profile": [
+                    {"r_km": rk, "fluence_Jm2": float(phi), "duration_s": float(res["duration_s"][i])}
+                    for rk, phi in zip(sample_r_km, res["fluence_Jm2"][i])
+                ],
+            }
+
+            if res["is_airburst"][i]:
+                summary["overpressure_isobars_km"] = {
+                    key: _none_if_nan(R[i]) for key, R in res["overpressure_isobars_km"].items()
+                }
+                summary["overpressure_isobars_discontinuity"] = {
+                    key: bool(flag[i]) for key, flag in res["overpressure_isobars_discontinuity"].items()
+                }
+                summary["overpressure_isobars_beyond_range"] = {
+                    key: bool(flag[i]) for key, flag in res["overpressure_isobars_beyond_range"].items()
+                }
+            else:
+                summary["crater"] = {"final_diameter_m": float(res["crater_final_diameter_m"][i])}
+                summary["seismic"] = {"Mw": float(res["seismic_Mw"][i])}
+                if not math.isnan(res["tsunami_H_100km_m"][i]):
+                    summary["tsunami"] = {"H_100km_m": float(res["tsunami_H_100km_m"][i])}
+
+            out.append(summary)
+        return out
+
+
+def _none_if_nan(value: float) -> Optional[float]:
+    value = float(value)
+    return None if math.isnan(value) else value
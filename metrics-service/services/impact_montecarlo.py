@@ -0,0 +1,168 @@
+import math
+import secrets
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from services.impact_metrics import ImpactMetrics, J_PER_MT
+from services.impact_metrics_vec import VectorizedImpactMetrics
+
+# --- CONFIG ---
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+CHUNK_SIZE = 50_000          # muestras evaluadas por bloque (acota la memoria intermedia)
+MAX_SAMPLES = 1_000_000
+SEED_BITS = 53               # semillas generadas: exactas como número JSON (double)
+
+
+# =======================
+# Distribuciones de entrada
+# =======================
+@dataclass
+class Distribution:
+    """
+    Distribución de un parámetro de entrada.
+      - fixed:      a = valor
+      - uniform:    a = mínimo, b = máximo
+      - loguniform: a = mínimo, b = máximo (ambos > 0)
+      - normal:     a = media, b = desviación típica
+      - lognormal:  a = mediana, b = sigma de ln(x)
+    """
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        if self.kind == "fixed":
+            return np.full(n, float(self.a))
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b, n)
+        if self.kind == "loguniform":
+            return np.exp(rng.uniform(math.log(self.a), math.log(self.b), n))
+        if self.kind == "normal":
+            return rng.normal(self.a, self.b, n)
+        if self.kind == "lognormal":
+            return rng.lognormal(math.log(self.a), self.b, n)
+        raise ValueError(f"Distribución desconocida: {self.kind}")
+
+
+@dataclass
+class MonteCarloInputs:
+    """
+    Entradas inciertas del escenario. El diámetro puede darse directamente o
+    deducirse de la magnitud absoluta H y el albedo geométrico:
+        D[km] = 1329 / sqrt(albedo) * 10^(-H/5)
+    """
+    velocity_mps: Distribution
+    density_kgm3: Distribution
+    diameter_m: Optional[Distribution] = None
+    h_magnitude: Optional[Distribution] = None
+    albedo: Optional[Distribution] = None
+    porosity: Distribution = field(default_factory=lambda: Distribution("fixed", 0.0))
+    shape_factor: Distribution = field(default_factory=lambda: Distribution("fixed", 1.0))
+    burst_altitude_m: Optional[Distribution] = None  # None -> impacto en suelo
+    target_density_kgm3: float = 2_500.0
+    water_depth_m: Optional[float] = None
+
+
+def diameter_from_h(h_magnitude: np.ndarray, albedo: np.ndarray) -> np.ndarray:
+    """Diámetro (m) a partir de la magnitud absoluta H y el albedo."""
+    return 1329.0e3 / np.sqrt(albedo) * 10.0 ** (-h_magnitude / 5.0)
+
+
+# =======================
+# Muestreo y evaluación
+# =======================
+_STREAMS = ("diameter_m", "h_magnitude", "albedo", "velocity_mps", "density_kgm3",
+            "porosity", "shape_factor", "burst_altitude_m")
+
+
+def _draw(inputs: MonteCarloInputs, rngs: Dict[str, np.random.Generator], n: int) -> Dict[str, np.ndarray]:
+    if inputs.diameter_m is not None:
+        diameter = inputs.diameter_m.sample(rngs["diameter_m"], n)
+    elif inputs.h_magnitude is not None and inputs.albedo is not None:
+        h_mag = inputs.h_magnitude.sample(rngs["h_magnitude"], n)
+        albedo = np.clip(inputs.albedo.sample(rngs["albedo"], n), 1e-3, 1.0)
+        diameter = diameter_from_h(h_mag, albedo)
+    else:
+        raise ValueError("Hace falta diameter_m o bien h_magnitude y albedo")
+
+    burst = (np.zeros(n) if inputs.burst_altitude_m is None
+             else np.maximum(inputs.burst_altitude_m.sample(rngs["burst_altitude_m"], n), 0.0))
+    return {
+        "diameter_m": np.maximum(diameter, 0.0),
+        "velocity_mps": np.maximum(inputs.velocity_mps.sample(rngs["velocity_mps"], n), 0.0),
+        "density_kgm3": np.maximum(inputs.density_kgm3.sample(rngs["density_kgm3"], n), 0.0),
+        "porosity": np.clip(inputs.porosity.sample(rngs["porosity"], n), 0.0, 0.99),
+        "shape_factor": np.maximum(inputs.shape_factor.sample(rngs["shape_factor"], n), 0.0),
+        "burst_altitude_m": burst,
+    }
+
+
+def run_monte_carlo(inputs: MonteCarloInputs, n_samples: int = 100_000,
+                    seed: Optional[int] = None,
+                    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+                    chunk_size: int = CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Propaga la incertidumbre de las entradas por las fórmulas vectorizadas de
+    ImpactMetrics y devuelve bandas de percentiles por magnitud.
+
+    Cada parámetro tiene su propio flujo aleatorio derivado de `seed`, de modo
+    que el resultado no depende de chunk_size. Solo se guardan las salidas
+    escalares (float32) de cada muestra; los intermedios viven por bloque.
+    Las magnitudes que no aplican a una muestra (isóbaras en impacto en suelo,
+    cráter en airburst...) se excluyen de sus percentiles.
+    """
+    if not 0 < n_samples <= MAX_SAMPLES:
+        raise ValueError(f"n_samples debe estar entre 1 y {MAX_SAMPLES}")
+
+    # Sin semilla se genera una y se devuelve, para poder repetir la ejecución.
+    # SeedSequence().entropy tiene 128 bits: ni cabe en un int64 ni sobrevive a un cliente JS
+    if seed is None:
+        seed = secrets.randbits(SEED_BITS)
+    seq = np.random.SeedSequence(seed)
+    seeds = seq.spawn(len(_STREAMS))
+    rngs = {name: np.random.default_rng(s) for name, s in zip(_STREAMS, seeds)}
+    thresholds = ImpactMetrics.damage_thresholds_kpa()
+
+    names = (["energy_megatons", "crater_diameter_m", "seismic_Mw", "tsunami_height_m"]
+             + [f"isobar_{key}_km" for key in thresholds])
+    results = {name: np.empty(n_samples, dtype=np.float32) for name in names}
+
+    V = VectorizedImpactMetrics
+    target = {"density_kgm3": inputs.target_density_kgm3}
+    for start in range(0, n_samples, chunk_size):
+        n = min(chunk_size, n_samples - start)
+        chunk = slice(start, start + n)
+        s = _draw(inputs, rngs, n)
+
+        E = V.kinetic_energy(s)
+        airburst = s["burst_altitude_m"] > 0
+        results["energy_megatons"][chunk] = E / J_PER_MT
+
+        solutions = V.isobar_radii_airburst(
+            E, s["burst_altitude_m"],
+            {key: np.where(airburst, kpa, math.inf) for key, kpa in thresholds.items()})
+        for key, sol in solutions.items():
+            results[f"isobar_{key}_km"][chunk] = sol["radius_m"] / 1000.0
+
+        results["crater_diameter_m"][chunk] = np.where(
+            airburst, math.nan, V.crater_diameter_simple(E, target))
+        results["seismic_Mw"][chunk] = np.where(airburst, math.nan, V.seismic_magnitude_Mw(E))
+        if inputs.water_depth_m and inputs.water_depth_m > 0:
+            results["tsunami_height_m"][chunk] = np.where(
+                airburst, math.nan, V.tsunami_wave_height_coast(E, inputs.water_depth_m))
+        else:
+            results["tsunami_height_m"][chunk] = math.nan
+
+    bands = {}
+    for name, values in results.items():
+        valid = values[~np.isnan(values)]
+        band = {"valid_fraction": valid.size / n_samples}
+        if valid.size:
+            for q, v in zip(percentiles, np.percentile(valid, percentiles)):
+                band[f"p{q:g}"] = float(v)
+            band["mean"] = float(valid.mean(dtype=np.float64))
+        bands[name] = band
+
+    return {"n_samples": n_samples, "seed": seed, "bands": bands}
@@ -0,0 +1,187 @@
+import math
+import numpy as np
+
+# --- CONFIG ---
+GM_SUN = 0.01720209895 ** 2        # AU^3/día^2 (constante gaussiana al cuadrado)
+KEPLER_TOL = 1e-14                 # tolerancia de Newton (rad)
+KEPLER_MAX_ITER = 50
+PARABOLIC_TOL = 1e-10              # |e - 1| por debajo: órbita parabólica (ecuación de Barker)
+MAX_PROPAGATION_PAIRS = 4_000_000  # cuerpos x épocas por petición
+
+# Un registro por cuerpo; angulos en radianes, como OrbitElts/OrbitResponse
+ELEMENTS_DTYPE = np.dtype([
+    ("a", "f8"),          # semieje mayor (UA; negativo en hipérbolas); NaN = q / (1 - e)
+    ("e", "f8"),
+    ("i", "f8"),
+    ("om", "f8"),         # Ω
+    ("w", "f8"),          # ω
+    ("ma", "f8"),         # anomalía media en epoch_jd
+    ("epoch_jd", "f8"),
+    ("n", "f8"),          # movimiento medio (rad/día); NaN = derivado de a y gm
+    ("q", "f8"),          # distancia de perihelio (UA); NaN = |a| |1 - e|
+])
+
+
+def _x_minus_sin(x: np.ndarray) -> np.ndarray:
+    # x - sin x sin cancelación para |x| pequeño (serie hasta x^11)
+    out = x - np.sin(x)
+    small = np.abs(x) < 0.5
+    if small.any():
+        xs = x[small]
+        x2 = xs * xs
+        out[small] = xs * x2 / 6.0 * (1 - x2 / 20 * (1 - x2 / 42 * (1 - x2 / 72 * (1 - x2 / 110))))
+    return out
+
+
+def _sinh_minus_x(x: np.ndarray) -> np.ndarray:
+    # sinh x - x sin cancelación para |x| pequeño (serie hasta x^11)
+    out = np.sinh(x) - x
+    small = np.abs(x) < 0.5
+    if small.any():
+        xs = x[small]
+        x2 = xs * xs
+        out[small] = xs * x2 / 6.0 * (1 + x2 / 20 * (1 + x2 / 42 * (1 + x2 / 72 * (1 + x2 / 110))))
+    return out
+
+
+def solve_elliptic(M: np.ndarray, e: np.ndarray) -> np.ndarray:
+    '''
+    Anomalía excéntrica E de M = E - e sin E (0 <= e < 1), Newton vectorizado.
+    El arranque de Danby (M + 0.85 e) converge también cerca de e = 1. La ecuación
+    se evalúa como (1 - e) E + e (E - sin E) para no perder precisión con e ≈ 1 y E pequeño.
+    '''
+    # Reducción a [-π, π) solo si hace falta: redondea M al ulp de π, y cerca del
+    # perihelio de las casi parabólicas M es de ese orden
+    M = np.where(np.abs(M) > np.pi, np.remainder(M + np.pi, 2 * np.pi) - np.pi, M)
+    E = M + 0.85 * e * np.where(M >= 0, 1.0, -1.0)
+    # e ≈ 1 y M pequeño: M ≈ (1 - e) E + e E^3 / 6
+    near = (e > 0.9) & (np.abs(M) < 0.1)
+    if near.any():
+        E[near] = np.cbrt(6.0 * M[near] / e[near])
+    one_minus_e = 1.0 - e
+    active = np.ones(E.shape, dtype=bool)
+    for _ in range(KEPLER_MAX_ITER):
+        Ea, ea, oa = E[active], e[active], one_minus_e[active]
+        f = oa * Ea + ea * _x_minus_sin(Ea) - M[active]
+        # 1 - e cos E = (1 - e) + 2 e sin^2(E/2)
+        step = f / (oa + 2.0 * ea * np.sin(0.5 * Ea) ** 2)
+        E[active] = Ea - step
+        active[active] = np.abs(step) > KEPLER_TOL * np.abs(E[active])
+        if not active.any():
+            break
+    return E
+
+
+def solve_hyperbolic(M: np.ndarray, e: np.ndarray) -> np.ndarray:
+    '''
+    Anomalía hiperbólica H de M = e sinh H - H (e > 1), Newton vectorizado
+    con arranque asinh(M / e) (cerca de e = 1, arranque cúbico de Barker).
+    Se evalúa como (e - 1) H + e (sinh H - H), como en solve_elliptic.
+    '''
+    H = np.arcsinh(M / e)
+    near = e < 1.1
+    if near.any():
+        # e ≈ 1: M ≈ (e - 1) H + e H^3 / 6
+        H[near] = np.cbrt(6.0 * M[near] / e[near])
+    e_minus_one = e - 1.0
+    active = np.ones(H.shape, dtype=bool)
+    for _ in range(KEPLER_MAX_ITER):
+        Ha, ea, da = H[active], e[active], e_minus_one[active]
+        f = da * Ha + ea * _sinh_minus_x(Ha) - M[active]
+        # e cosh H - 1 = (e - 1) + 2 e sinh^2(H/2)
+        step = f / (da + 2.0 * ea * np.sinh(0.5 * Ha) ** 2)
+        H[active] = Ha - step
+        active[active] = np.abs(step) > KEPLER_TOL * np.maximum(1.0, np.abs(H[active]))
+        if not active.any():
+            break
+    return H
+
+
+def solve_parabolic(W: np.ndarray) -> np.ndarray:
+    '''
+    tan(ν/2) de la ecuación de Barker s + s^3 / 3 = W, en forma cerrada.
+    '''
+    y = np.cbrt(1.5 * W + np.sqrt(2.25 * W * W + 1.0))
+    return y - 1.0 / y
+
+
+def propagate(elements: np.ndarray, epochs_jd: np.ndarray, gm: float = GM_SUN) -> np.ndarray:
+    '''
+    Posiciones heliocéntricas (eclíptica J2000, UA) de cada cuerpo en cada época.
+
+    Resuelve Kepler para todos los pares (cuerpo, época) a la vez: elípticas con
+    Newton, hiperbólicas con Newton sobre H y parabólicas (|e - 1| < PARABOLIC_TOL)
+    con Barker. Las coordenadas en el plano orbital usan q = a (1 - e) para no perder
+    precisión cerca del perihelio en órbitas casi parabólicas.
+
+    Args:
+        elements (np.ndarray): registros ELEMENTS_DTYPE, forma (n_bodies,)
+        epochs_jd (np.ndarray): épocas (JD TDB), forma (n_epochs,)
+        gm (float): parámetro gravitatorio central (UA^3/día^2)
+
+    Returns:
+        np.ndarray: float64 de forma (n_bodies, n_epochs, 3)
+    '''
+    el = np.asarray(elements, dtype=ELEMENTS_DTYPE)
+    t = np.asarray(epochs_jd, dtype=np.float64)
+    parabolic = np.abs(el["e"] - 1.0) < PARABOLIC_TOL
+    q = np.where(np.isnan(el["q"]), np.abs(el["a"]) * np.abs(1.0 - el["e"]), el["q"])
+    with np.errstate(divide="ignore"):
+        a = np.where(np.isnan(el["a"]) & ~parabolic, q / (1.0 - el["e"]), el["a"])
+    e, a, q = el["e"][:, None], a[:, None], q[:, None]
+
+    # Movimiento medio: dado, o n = sqrt(gm / |a|^3) (parábola: sqrt(gm / (2 q^3)))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        n_kepler = np.where(parabolic, np.sqrt(gm / (2.0 * q[:, 0] ** 3)), np.sqrt(gm / np.abs(a[:, 0]) ** 3))
+    n = np.where(np.isnan(el["n"]), n_kepler, el["n"])[:, None]
+    M = el["ma"][:, None] + n * (t[None, :] - el["epoch_jd"][:, None])
+
+    shape = (el.size, t.size)
+    x = np.empty(shape)
+    y = np.empty(shape)
+    elliptic = (el["e"] < 1.0) & ~parabolic
+    hyperbolic = (el["e"] > 1.0) & ~parabolic
+
+    if elliptic.any():
+        rows = np.nonzero(elliptic)[0]
+        Mb, eb, ab, qb = M[rows], np.broadcast_to(e[rows], M[rows].shape), a[rows], q[rows]
+        E = solve_elliptic(Mb, np.ascontiguousarray(eb))
+        # x = a (cos E - e) = q - 2 a sin^2(E/2)
+        x[rows] = qb - 2.0 * ab * np.sin(0.5 * E) ** 2
+        y[rows] = ab * np.sqrt((1.0 - eb) * (1.0 + eb)) * np.sin(E)
+    if hyperbolic.any():
+        rows = np.nonzero(hyperbolic)[0]
+        Mb, eb, ab, qb = M[rows], np.broadcast_to(e[rows], M[rows].shape), -np.abs(a[rows]), q[rows]
+        H = solve_hyperbolic(Mb, np.ascontiguousarray(eb))
+        # x = a (cosh H - e) = q + 2 a sinh^2(H/2), con a < 0
+        x[rows] = qb + 2.0 * ab * np.sinh(0.5 * H) ** 2
+        y[rows] = -ab * np.sqrt((eb - 1.0) * (eb + 1.0)) * np.sinh(H)
+    if parabolic.any():
+        rows = np.nonzero(parabolic)[0]
+        s = solve_parabolic(M[rows])
+        x[rows] = q[rows] * (1.0 - s * s)
+        y[rows] = 2.0 * q[rows] * s
+
+    # Plano orbital -> eclíptica: Rz(Ω) Rx(i) Rz(ω)
+    cO, sO = np.cos(el["om"])[:, None], np.sin(el["om"])[:, None]
+    ci, si = np.cos(el["i"])[:, None], np.sin(el["i"])[:, None]
+    cw, sw = np.cos(el["w"])[:, None], np.sin(el["w"])[:, None]
+    out = np.empty(shape + (3,))
+    out[..., 0] = (cO * cw - sO * sw * ci) * x + (-cO * sw - sO * cw * ci) * y
+    out[..., 1] = (sO * cw + cO * sw * ci) * x + (-sO * sw + cO * cw * ci) * y
+    out[..., 2] = (sw * si) * x + (cw * si) * y
+    return out
+
+
+def propagate_bytes(elements: np.ndarray, epochs_jd: np.ndarray, gm: float = GM_SUN) -> bytes:
+    ''' propagate() as packed little-endian float32 (body, epoch, xyz), for the compute pool. '''
+    return propagate(elements, epochs_jd, gm).astype("<f4").tobytes()
+
+
+def elements_array(records) -> np.ndarray:
+    ''' ELEMENTS_DTYPE array from dicts/models with the ELEMENTS_DTYPE field names (missing n, q -> NaN). '''
+    out = np.empty(len(records), dtype=ELEMENTS_DTYPE)
+    for k, rec in enumerate(records):
+        get = rec.get if isinstance(rec, dict) else lambda f, d=None, r=rec: getattr(r, f, d)
+        out[k] = tuple(math.nan if get(f) is None else float(get(f)) for f in ELEMENTS_DTYPE.names)
+    return out
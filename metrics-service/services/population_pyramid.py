@@ -0,0 +1,161 @@
+import math
+import os
+
+import numpy as np
+import rasterio
+import rasterio.shutil
+from rasterio.enums import Resampling
+from rasterio.warp import reproject
+from rasterio.windows import Window
+
+from services.raster_pool import raster_pool
+
+# --- CONFIG ---
+PYRAMID_DIR = os.getenv("POPULATION_PYRAMID_DIR", "data/pyramid")
+PYRAMID_LEVELS_M = (100, 250, 1000, 5000, 25000)   # cell size of each level (m)
+CELL_BUDGET = int(os.getenv("POPULATION_CELL_BUDGET", "4000000"))  # max cells per query window
+BUILD_BLOCK = 512   # output cells per block side while building a level
+
+
+def level_path(res_m: int, pyramid_dir: str = PYRAMID_DIR) -> str:
+    return os.path.join(pyramid_dir, f"GHS_POP_pyramid_{res_m}m.tif")
+
+
+def _aggregate_block(src, out_window: Window, factor: float, out_transform) -> np.ndarray:
+    # Population is a count: aggregate by sum, treating nodata as 0
+    rows, cols = int(out_window.height), int(out_window.width)
+    k = int(round(factor))
+    if abs(factor - k) < 1e-9:
+        # Integer factor: exact block sum
+        window = Window(out_window.col_off * k, out_window.row_off * k, cols * k, rows * k)
+        data = src.read(1, window=window, boundless=True, fill_value=0).astype(np.float64)
+        if src.nodata is not None:
+            data[data == src.nodata] = 0.0
+        return data.reshape(rows, k, cols, k).sum(axis=(1, 3)).astype(np.float32)
+
+    # Fractional factor: area-weighted sum (GDAL "sum" resampling) from a source window with margin
+    window = Window(math.floor(out_window.col_off * factor) - 1, math.floor(out_window.row_off * factor) - 1,
+                    math.ceil(cols * factor) + 3, math.ceil(rows * factor) + 3)
+    data = src.read(1, window=window, boundless=True, fill_value=0).astype(np.float32)
+    if src.nodata is not None:
+        data[data == src.nodata] = 0.0
+    out = np.zeros((rows, cols), dtype=np.float32)
+    reproject(data, out,
+              src_transform=src.window_transform(window), src_crs=src.crs,
+              dst_transform=rasterio.windows.transform(out_window, out_transform), dst_crs=src.crs,
+              resampling=Resampling.sum)
+    return out
+
+
+def build_level(source_path: str, res_m: int, out_path: str) -> str:
+    ''' Aggregate a population raster to a coarser cell size, preserving totals,
+        and store it as a tiled, DEFLATE-compressed Cloud Optimized GeoTIFF.
+
+        Args:
+            source_path (str): Finer population raster (same CRS as the output)
+            res_m (int): Output cell size in meters
+            out_path (str): Destination .tif
+
+        Returns:
+            str: out_path
+    '''
+    with rasterio.open(source_path) as src:
+        src_res = abs(src.transform.a)
+        factor = res_m / src_res
+        if factor < 1:
+            raise ValueError(f"Cannot build a {res_m} m level from a {src_res:g} m raster")
+        width = math.ceil(src.width / factor)
+        height = math.ceil(src.height / factor)
+        out_transform = src.transform * rasterio.Affine.scale(factor)
+
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+        tmp_path = f"{out_path}.{os.getpid()}.tmp.tif"
+        profile = dict(driver="GTiff", width=width, height=height, count=1, dtype="float32",
+                       crs=src.crs, transform=out_transform, nodata=None,
+                       tiled=True, blockxsize=BUILD_BLOCK, blockysize=BUILD_BLOCK,
+                       compress="deflate", predictor=3, BIGTIFF="IF_SAFER")
+        with rasterio.open(tmp_path, "w", **profile) as dst:
+            for row in range(0, height, BUILD_BLOCK):
+                for col in range(0, width, BUILD_BLOCK):
+                    window = Window(col, row, min(BUILD_BLOCK, width - col), min(BUILD_BLOCK, height - row))
+                    dst.write(_aggregate_block(src, window, factor, out_transform), 1, window=window)
+
+    # Reorder as COG (no overviews: each level is its own aggregate)
+    rasterio.shutil.copy(tmp_path, out_path, driver="COG", compress="DEFLATE",
+                         predictor="YES", overviews="NONE", BIGTIFF="IF_SAFER")
+    os.remove(tmp_path)
+    return out_path
+
+
+def build_pyramid(sources: dict, pyramid_dir: str = PYRAMID_DIR, levels=PYRAMID_LEVELS_M) -> dict:
+    ''' Build every pyramid level from the GHS-POP sources.
+
+        Each level is aggregated from the coarsest source or level that is still at least
+        as fine (e.g. 250 m from 100 m, 5 km from 1 km); levels that match a source resolution
+        point to the source itself instead of a copy.
+
+        Args:
+            sources (dict): {cell size in m: raster path}, e.g. {100: "..._100_...tif"}
+            pyramid_dir (str): Output directory
+            levels (tuple): Cell sizes to build
+
+        Returns:
+            dict: {cell size in m: path} of every level
+    '''
+    sources = dict(sources)
+    paths = {}
+    for res_m in sorted(levels):
+        if res_m not in sources:
+            finer = [r for r in sources if r <= res_m]
+            if not finer:
+                raise ValueError(f"No source raster fine enough for the {res_m} m level")
+            # Built levels also feed the coarser ones (25 km from 5 km)
+            sources[res_m] = build_level(sources[max(finer)], res_m, level_path(res_m, pyramid_dir))
+        paths[res_m] = sources[res_m]
+    return paths
+
+
+class PopulationPyramid:
+    ''' Population levels, finest first. Readers and WGS84 -> raster transformers
+        come from the per-thread raster_pool, so select() is safe from any thread.
+    '''
+
+    def __init__(self, paths: dict, cell_budget: int = CELL_BUDGET):
+        self.cell_budget = cell_budget
+        self.levels = []
+        for res_m in sorted(paths):
+            with rasterio.open(paths[res_m]) as src:
+                crs = src.crs
+            self.levels.append((res_m, paths[res_m], crs))
+
+    @classmethod
+    def open(cls, sources: dict, pyramid_dir: str = PYRAMID_DIR, levels=PYRAMID_LEVELS_M,
+             cell_budget: int = CELL_BUDGET) -> "PopulationPyramid":
+        ''' Open the built levels found in pyramid_dir plus the source rasters. '''
+        paths = {res_m: path for res_m, path in sources.items() if os.path.exists(path)}
+        for res_m in levels:
+            if res_m not in paths and os.path.exists(level_path(res_m, pyramid_dir)):
+                paths[res_m] = level_path(res_m, pyramid_dir)
+        return cls(paths, cell_budget)
+
+    def select(self, radius_m: float):
+        ''' Finest level whose window for radius_m stays under the cell budget
+            (the coarsest level if none does).
+
+            Returns:
+                tuple: (cell size in m, DatasetReader, WGS84 -> raster transform)
+        '''
+        if not self.levels:
+            raise RuntimeError("No population rasters available")
+        level = next((lv for lv in self.levels if (2.0 * radius_m / lv[0] + 1) ** 2 <= self.cell_budget),
+                     self.levels[-1])
+        res_m, path, crs = level
+        return res_m, raster_pool.get(path), raster_pool.transformer("EPSG:4326", crs)
+
+
+if __name__ == "__main__":
+    from services.population_service import RASTER_HIGHRES_PATH, RASTER_LOWRES_PATH
+
+    built = build_pyramid({100: RASTER_HIGHRES_PATH, 1000: RASTER_LOWRES_PATH})
+    for res, path in built.items():
+        print(f"{res:>6} m  {path}")
@@ -0,0 +1,173 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import rasterio
+
+from services.circle_coverage import cell_fraction, edge_cells, row_spans
+from services.raster_pool import raster_pool
+
+# --- CONFIG ---
+SAT_CACHE_DIR = os.getenv("POPULATION_SAT_DIR", os.path.join(
+    os.getenv("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "metrics-service", "sat"))  # .npy tiles (memory-mapped)
+SAT_TILE_SIZE = 1024  # raster cells per tile side
+SAT_MAX_TILES = int(os.getenv("POPULATION_SAT_MAX_TILES", "256"))  # memory-mapped tiles kept open per raster
+
+
+class PopulationSAT:
+    ''' Summed-area table (integral image) of a population raster, split in tiles.
+
+        Each tile stores S[i, j] = sum of the tile cells above and left of (i, j),
+        with a zero first row/column, as a float64 .npy file opened memory-mapped.
+        Tiles are built from the raster the first time they are touched (or all at
+        once with build_all) and reused afterwards, so any rectangle sum costs
+        4 lookups per tile it overlaps. Nodata cells count as 0. At most max_tiles
+        tiles stay mapped; the least recently used one is dropped beyond that.
+    '''
+
+    def __init__(self, path: str, name: str, cache_dir: str = SAT_CACHE_DIR,
+                 tile_size: int = SAT_TILE_SIZE, max_tiles: int = SAT_MAX_TILES):
+        self.path = path
+        self.name = name
+        self.cache_dir = cache_dir
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+        src = raster_pool.get(path)
+        self.height = src.height
+        self.width = src.width
+        self.nodata = src.nodata
+        self._tiles: "OrderedDict[tuple[int, int], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # --- Tiles ---
+    def _tile_path(self, trow: int, tcol: int) -> str:
+        return os.path.join(self.cache_dir, f"{self.name}_{self.tile_size}_{trow}_{tcol}.npy")
+
+    def _build_tile(self, trow: int, tcol: int, path: str) -> None:
+        t = self.tile_size
+        window = rasterio.windows.Window(tcol * t, trow * t, t, t)
+        data = raster_pool.get(self.path).read(1, window=window, boundless=True, fill_value=0).astype(np.float64)
+        if self.nodata is not None:
+            data[data == self.nodata] = 0.0
+        sat = np.zeros((t + 1, t + 1), dtype=np.float64)
+        np.cumsum(np.cumsum(data, axis=0), axis=1, out=sat[1:, 1:])
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp, sat)
+        os.replace(tmp, path)  # atómico: otros workers nunca ven un fichero a medias
+
+    def tile(self, trow: int, tcol: int) -> np.ndarray:
+        key = (trow, tcol)
+        with self._lock:
+            sat = self._tiles.get(key)
+            if sat is not None:
+                self._tiles.move_to_end(key)
+                return sat
+            path = self._tile_path(trow, tcol)
+            if not os.path.exists(path):
+                self._build_tile(trow, tcol, path)
+            sat = np.load(path, mmap_mode="r")
+            self._tiles[key] = sat
+            # Un mapa desalojado se cierra cuando nadie lo referencia
+            while len(self._tiles) > max(self.max_tiles, 1):
+                self._tiles.popitem(last=False)
+        return sat
+
+    def build_all(self) -> None:
+        ''' Precompute every tile of the raster. '''
+        t = self.tile_size
+        for trow in range(-(-self.height // t)):
+            for tcol in range(-(-self.width // t)):
+                self.tile(trow, tcol)
+
+    # --- Queries ---
+    def row_span_sums(self, rows: np.ndarray, col0: np.ndarray, col1: np.ndarray) -> np.ndarray:
+        ''' Sum of cells [col0, col1) of each row, in raster indices (vectorized).
+            Cells outside the raster count as 0.
+        '''
+        rows = np.asarray(rows, dtype=np.int64)
+        col0 = np.clip(np.asarray(col0, dtype=np.int64), 0, self.width)
+        col1 = np.clip(np.asarray(col1, dtype=np.int64), 0, self.width)
+        out = np.zeros(rows.shape, dtype=np.float64)
+        valid = (rows >= 0) & (rows < self.height) & (col1 > col0)
+        if not valid.any():
+            return out
+
+        t = self.tile_size
+        idx = np.nonzero(valid)[0]
+        r, c0, c1 = rows[idx], col0[idx], col1[idx]
+        trows = r // t
+        for trow in np.unique(trows):
+            sel = trows == trow
+            rr = r[sel] - trow * t
+            for tcol in range(c0[sel].min() // t, (c1[sel].max() - 1) // t + 1):
+                lo = np.clip(c0[sel] - tcol * t, 0, t)
+                hi = np.clip(c1[sel] - tcol * t, 0, t)
+                if not (hi > lo).any():
+                    continue
+                sat = self.tile(int(trow), int(tcol))
+                s = (sat[rr + 1, hi] - sat[rr, hi]) - (sat[rr + 1, lo] - sat[rr, lo])
+                out[idx[sel]] += np.where(hi > lo, s, 0.0)
+        return out
+
+    def rect_sum(self, row0: int, col0: int, row1: int, col1: int) -> float:
+        ''' Sum over rows [row0, row1) and cols [col0, col1), 4 lookups per tile. '''
+        row0, row1 = max(0, row0), min(self.height, row1)
+        col0, col1 = max(0, col0), min(self.width, col1)
+        if row1 <= row0 or col1 <= col0:
+            return 0.0
+        t = self.tile_size
+        total = 0.0
+        for trow in range(row0 // t, (row1 - 1) // t + 1):
+            r0, r1 = max(row0 - trow * t, 0), min(row1 - trow * t, t)
+            for tcol in range(col0 // t, (col1 - 1) // t + 1):
+                c0, c1 = max(col0 - tcol * t, 0), min(col1 - tcol * t, t)
+                sat = self.tile(trow, tcol)
+                total += sat[r1, c1] - sat[r0, c1] - sat[r1, c0] + sat[r0, c0]
+        return float(total)
+
+    def circle_sum(self, cx: float, cy: float, radius_px: float, superres: int = 4) -> float:
+        ''' Population inside a circle given in fractional pixel coordinates.
+            See circle_sum_detail.
+        '''
+        return self.circle_sum_detail(cx, cy, radius_px, superres)[0]
+
+    def circle_sum_detail(self, cx: float, cy: float, radius_px: float,
+                          superres: int = 4) -> tuple[float, float]:
+        ''' Population inside a circle given in fractional pixel coordinates.
+
+            Cells fully inside the circle are summed row by row from the SAT
+            (O(rows)); only the boundary cells are refined, each weighted by the
+            fraction of its superres x superres sub-points inside the circle.
+
+            Returns:
+                tuple: (sum, error estimate), the same error as population_service.masked_sum
+                    (only boundary cells contribute to it)
+        '''
+        if radius_px <= 0:
+            return 0.0, 0.0
+        rows = np.arange(int(np.floor(cy - radius_px)), int(np.ceil(cy + radius_px)))
+        out0, in0, in1, out1 = row_spans(rows, cx, cy, radius_px)
+        total = float(self.row_span_sums(rows, in0, in1).sum())
+        error = 0.0
+
+        er, ec = edge_cells(rows, out0, in0, in1, out1)
+        if er.size:
+            values = self.row_span_sums(er, ec, ec + 1)
+            frac = cell_fraction(er, ec, cx, cy, radius_px, superres)
+            total += float(np.sum(values * frac))
+            error = float(np.sum(values * np.minimum(frac, 1.0 - frac)))
+        return total, error
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def sat_for(src: rasterio.io.DatasetReader) -> PopulationSAT:
+    ''' SAT index of an open population raster (one per raster file). '''
+    name = os.path.splitext(os.path.basename(src.name))[0]
+    with _indexes_lock:
+        if name not in _indexes:
+            _indexes[name] = PopulationSAT(src.name, name)
+        return _indexes[name]
@@ -1,57 +1,133 @@
+import os
+from functools import lru_cache
+
 import rasterio
 import numpy as np
-import shapely.geometry as geometry
-from shapely.ops import transform as shapely_transform
-import pyproj
-from rasterio.features import rasterize
+
+from services.block_cache import block_cache
+from services.cache import memoize
+from services.circle_coverage import circle_coverage, polygon_coverage
+from services.geodesic_footprint import GEOD, geodesic_footprint, planar_distortion, project_footprint
+from services.population_pyramid import PopulationPyramid
+from services.raster_pool import raster_pool
 
 
 # --- CONFIG ---
 RASTER_HIGHRES_PATH = "data/GHS_POP_E2025_GLOBE_R2023A_54009_100_V1_0.tif" # 100 m
 RASTER_LOWRES_PATH = "data/GHS_POP_E2025_GLOBE_R2023A_54009_1000_V1_0.tif"  # 1 km
 SUPERRES = 4  # Supersampling factor for edges, the greater the more precise but slower
-THRESHOLD_SUPERRES = 1200000  #threshold to disable superres (1,200 km)
-THRESHOLD_RADIUS_M = 100000  #threshold to switch between resolutions (100 km)
+RINGS_BLOCK_ROWS = 128  # raster rows processed at a time by estimate_population_rings
+GEODESIC_MAX_DISTORTION = 0.02  # use the planar circle while the projected geodesic circle stays within 2% of it
+POPULATION_USE_SAT = os.getenv("POPULATION_USE_SAT", "0") == "1"  # planar circles from the summed-area tables (services.population_sat)
 
-# --- load rasters in memory ---
-try:
-    src_high = rasterio.open(RASTER_HIGHRES_PATH)
-    src_low = rasterio.open(RASTER_LOWRES_PATH)
-    proj_to_raster_high = pyproj.Transformer.from_crs("EPSG:4326", src_high.crs, always_xy=True).transform
-    proj_to_raster_low = pyproj.Transformer.from_crs("EPSG:4326", src_low.crs, always_xy=True).transform    
-except IOError: 
-    src_high = None 
-    src_low = None 
-    proj_to_raster_high = None 
-    proj_to_raster_low = None 
-    
 
+@lru_cache(maxsize=1)
+def get_pyramid() -> PopulationPyramid:
+    ''' GHS-POP sources plus the aggregated levels built with `python -m services.population_pyramid`;
+        each query uses the finest level whose window fits in POPULATION_CELL_BUDGET cells.
+        Opened on first use (or by the startup warmup), not at import.
+    '''
+    return PopulationPyramid.open({100: RASTER_HIGHRES_PATH, 1000: RASTER_LOWRES_PATH})
 
 
 def estimate_population(lon: float, lat: float, radius_m: float) -> int:
-    ''' Estimate population within a circle defined by (lon, lat) center and radius in meters. 
-        Uses supersampling to improve edge accuracy.
-    
-        Returns a population estimate.
-        
+    ''' Estimate population within a circle defined by (lon, lat) center and radius in meters.
+        See estimate_population_detail.
+
         Args:
             lon (float): Longitude of circle center in WGS84
             lat (float): Latitude of circle center in WGS84
             radius_m (float): Radius of circle in meters
-        
+
         Returns:
             int: Estimated population within the circle
     '''
+    return estimate_population_detail(lon, lat, radius_m)["population"]
+
+
+@memoize("population")
+def estimate_population_detail(lon: float, lat: float, radius_m: float) -> dict:
+    ''' compute_population_detail, memoized in the calling process. The /population
+        router looks the memo up itself before dispatching compute_population_detail
+        to the compute pool (compute_pool.run_memoized).
+    '''
+    return compute_population_detail(lon, lat, radius_m)
 
-    # Select raster and projection based on radius
-    src, proj_to_raster = select_raster_and_transform(radius_m)
-    nodata = src.nodata
 
-    # Get circle in raster CRS
-    circle = get_proyected_circle(lon, lat, radius_m, proj_to_raster)
+def compute_population_detail(lon: float, lat: float, radius_m: float) -> dict:
+    ''' Estimate population within a circle defined by (lon, lat) center and radius in meters,
+        with the pyramid level used and an error estimate.
 
-    # Circle bounds in raster indices
-    minx, miny, maxx, maxy = circle.bounds
+        The level is the finest one whose window fits in the cell budget. The circle is
+        geodesic; while the raster projection keeps it within GEODESIC_MAX_DISTORTION of a
+        planar circle, the planar one is used. Boundary cells are supersampled.
+
+        Args:
+            lon (float): Longitude of circle center in WGS84
+            lat (float): Latitude of circle center in WGS84
+            radius_m (float): Radius of circle in meters
+
+        Returns:
+            dict: population (int), error_estimate (people that may lie on the other side
+                of the boundary inside partially covered cells) and resolution_m (level used)
+    '''
+    if radius_m <= 0:
+        return {"population": 0, "error_estimate": 0.0, "resolution_m": None}
+
+    # Select pyramid level based on radius
+    resolution_m, src, proj_to_raster = get_pyramid().select(radius_m)
+    result = {"population": 0, "error_estimate": 0.0, "resolution_m": resolution_m}
+
+    # True geodesic circle in raster CRS
+    footprint = get_geodesic_footprint(lon, lat, radius_m, proj_to_raster)
+    x0, y0 = proj_to_raster(lon, lat)
+
+    # Small distortion: planar circle with distance-based coverage (fast path)
+    planar = planar_distortion(footprint, x0, y0, radius_m) <= GEODESIC_MAX_DISTORTION
+    if planar and POPULATION_USE_SAT:
+        # Same circle answered from the summed-area table: O(rows) interior + boundary cells.
+        # Tiles are built on first touch (or with PopulationSAT.build_all) under POPULATION_SAT_DIR
+        from services.population_sat import sat_for
+        cx, cy = ~src.transform * (x0, y0)
+        pop_est, error = sat_for(src).circle_sum_detail(cx, cy, radius_m / abs(src.transform.a), SUPERRES)
+    elif planar:
+        window_data = read_window(src, (x0 - radius_m, y0 - radius_m, x0 + radius_m, y0 + radius_m))
+        if window_data is None:
+            return result
+        data, window_transform = window_data
+
+        # Coverage fraction of each cell, from its distance to the center:
+        # interior = 1, exterior = 0, boundary cells supersampled (SUPERRES x SUPERRES)
+        cx, cy = ~window_transform * (x0, y0)
+        mask = circle_coverage(data.shape[0], data.shape[1], cx, cy,
+                               radius_m / abs(window_transform.a), SUPERRES)
+        pop_est, error = masked_sum(src, data, mask)
+    else:
+        # Otherwise rasterize the geodesic footprint, one window per part
+        # (a circle crossing the antimeridian has one part on each side)
+        pop_est, error = 0.0, 0.0
+        for part in getattr(footprint, "geoms", [footprint]):
+            window_data = read_window(src, part.bounds)
+            if window_data is None:
+                continue
+            data, window_transform = window_data
+            mask = polygon_coverage(part, data.shape[0], data.shape[1], window_transform, SUPERRES)
+            part_pop, part_error = masked_sum(src, data, mask)
+            pop_est += part_pop
+            error += part_error
+
+    result["population"] = int(round(pop_est))
+    result["error_estimate"] = error
+    return result
+
+
+def read_window(src: rasterio.io.DatasetReader, bounds: tuple):
+    ''' Read the raster window covering bounds (minx, miny, maxx, maxy) in raster CRS.
+
+        Returns:
+            tuple: (data, window_transform), or None if bounds fall outside the raster
+    '''
+    minx, miny, maxx, maxy = bounds
     row_min, col_min = src.index(minx, maxy)
     row_max, col_max = src.index(maxx, miny)
 
@@ -61,52 +137,185 @@ def estimate_population(lon: float, lat: float, radius_m: float) -> int:
 
     nrows, ncols = row_max - row_min + 1, col_max - col_min + 1
     if nrows <= 0 or ncols <= 0:
-        return 0
+        return None
 
     window = rasterio.windows.Window(col_min, row_min, ncols, nrows)
-    data = src.read(1, window=window, boundless=True)
-    window_transform = src.window_transform(window)
-
-    # Rasterize the circle to the window grid
-    # Supersampling: create a finer grid, rasterize, and reduce
-    if SUPERRES > 1 and radius_m < THRESHOLD_SUPERRES:
-        highres_shape = (nrows * SUPERRES, ncols * SUPERRES)
-        mask_hr = rasterize(
-            [(geometry.mapping(circle), 1)],
-            out_shape=highres_shape,
-            transform=window_transform * rasterio.Affine.scale(1 / SUPERRES),
-            fill=0,
-            dtype="float32",
-        )
-        # Reduce: average SUPERRES×SUPERRES blocks to get fraction [0..1]
-        mask = mask_hr.reshape(nrows, SUPERRES, ncols, SUPERRES).mean(axis=(1, 3))
-    else:
-        mask = rasterize(
-            [(geometry.mapping(circle), 1)],
-            out_shape=(nrows, ncols),
-            transform=window_transform,
-            fill=0,
-            dtype="float32",
-        )
-
-    # Multiply raster values by mask (covered fraction)
+    data = block_cache.read(src, window)
+    return data, src.window_transform(window)
+
+
+def masked_sum(src: rasterio.io.DatasetReader, data: np.ndarray, mask: np.ndarray) -> tuple[float, float]:
+    ''' Sum of raster values weighted by mask (covered fraction), skipping nodata.
+
+        Returns:
+            tuple: (sum, error estimate). The error assumes people are not spread
+                uniformly inside partially covered cells: sum(value * min(f, 1 - f)).
+    '''
+    nodata = src.nodata
     valid = (nodata is None) or (data != nodata)
-    pop_est = int(np.sum(data[valid] * mask[valid]).round())
+    values = data[valid].astype(np.float64)
+    frac = mask[valid]
+    return float(np.sum(values * frac)), float(np.sum(values * np.minimum(frac, 1.0 - frac)))
 
-    return pop_est
 
+def estimate_population_rings(lon: float, lat: float, radii_m: list[float]) -> list[dict]:
+    ''' Population inside several concentric circles in a single raster pass.
+        The window of the outermost circle is read once and the distance of every
+        cell is computed once; each cell is binned into its ring, and only
+        cells crossed by a circle are supersampled. N radii cost one read instead of N.
 
-def select_raster_and_transform(radius_m: float) -> tuple[rasterio.io.DatasetReader, callable]:
-    if radius_m > THRESHOLD_RADIUS_M:
-        return src_low, proj_to_raster_low
+        Distances are geodesic, as in compute_population_detail: while the raster
+        projection keeps the outermost circle within GEODESIC_MAX_DISTORTION of a
+        planar circle, planar distances in the raster CRS are used (fast path).
+
+        Args:
+            lon (float): Longitude of circles center in WGS84
+            lat (float): Latitude of circles center in WGS84
+            radii_m (list[float]): Radii in meters (any order, duplicates ignored)
+
+        Returns:
+            list[dict]: One entry per radius in ascending order with
+                radius_m, population (inside the circle) and ring_population
+                (between the previous radius and this one)
+    '''
+    radii = np.unique(np.asarray([r for r in radii_m if r > 0], dtype=np.float64))
+    if radii.size == 0:
+        return []
+
+    # The outermost circle decides the pyramid level, as in compute_population_detail
+    r_max = float(radii[-1])
+    _, src, proj_to_raster = get_pyramid().select(r_max)
+    footprint = get_geodesic_footprint(lon, lat, r_max, proj_to_raster)
+    x0, y0 = proj_to_raster(lon, lat)
+
+    ring_sums = np.zeros(radii.size + 1)
+    if planar_distortion(footprint, x0, y0, r_max) <= GEODESIC_MAX_DISTORTION:
+        window_data = read_window(src, (x0 - r_max, y0 - r_max, x0 + r_max, y0 + r_max))
+        if window_data is not None:
+            ring_sums += planar_ring_sums(src, *window_data, x0, y0, radii)
     else:
-        return src_high, proj_to_raster_high
-    
+        # One window per footprint part (both sides of the antimeridian)
+        to_lonlat = raster_pool.transformer(src.crs, "EPSG:4326")
+        for part in getattr(footprint, "geoms", [footprint]):
+            window_data = read_window(src, part.bounds)
+            if window_data is not None:
+                ring_sums += geodesic_ring_sums(src, *window_data, lon, lat, (x0, y0), to_lonlat, radii)
+
+    ring_pop = ring_sums[:-1]
+    cumulative = np.cumsum(ring_pop)
+    return [
+        {"radius_m": float(r), "population": int(round(c)), "ring_population": int(round(p))}
+        for r, c, p in zip(radii, cumulative, ring_pop)
+    ]
+
+
+def _ring_data(src: rasterio.io.DatasetReader, data: np.ndarray) -> np.ndarray:
+    # float64 copy with nodata as 0 (the block cache array is shared)
+    data = data.astype(np.float64)
+    if src.nodata is not None:
+        data[data == src.nodata] = 0.0
+    return data
+
+
+def planar_ring_sums(src: rasterio.io.DatasetReader, data: np.ndarray, t, x0: float, y0: float,
+                     radii: np.ndarray) -> np.ndarray:
+    ''' Population of a window binned by ring (radii ascending, last bin = beyond the
+        last radius), from planar distances to (x0, y0) in the raster CRS.
+    '''
+    data = _ring_data(src, data)
+    nrows, ncols = data.shape
+    ss = SUPERRES
+    sub = (np.arange(ss) + 0.5) / ss - 0.5
+    half_diag = 0.5 * np.hypot(t.a, t.e)
+    # Cell-center offsets to the circles center, in raster CRS units
+    dx = t.c + (np.arange(ncols) + 0.5) * t.a - x0
+    bins = radii.size + 1
+    ring_sums = np.zeros(bins)
+
+    for start in range(0, nrows, RINGS_BLOCK_ROWS):
+        stop = min(start + RINGS_BLOCK_ROWS, nrows)
+        dy = t.f + (np.arange(start, stop) + 0.5) * t.e - y0
+        dist = np.hypot(dx[None, :], dy[:, None])
+        block = data[start:stop]
+
+        # Ring index: first radius >= distance (beyond r_max falls in the last bin)
+        ring = np.searchsorted(radii, dist, side="left")
+        # Cells whose square may cross a circle need sub-point sampling
+        gap_out = np.abs(radii[np.minimum(ring, radii.size - 1)] - dist)
+        gap_in = np.abs(dist - radii[np.maximum(ring - 1, 0)])
+        edge = np.minimum(gap_out, gap_in) < half_diag if ss > 1 else np.zeros_like(dist, dtype=bool)
+
+        inner = ~edge
+        ring_sums += np.bincount(ring[inner], weights=block[inner], minlength=bins)
+
+        if edge.any():
+            er, ec = np.nonzero(edge)
+            px = dx[ec][:, None, None] + sub[None, None, :] * t.a
+            py = dy[er][:, None, None] + sub[None, :, None] * t.e
+            sub_ring = np.searchsorted(radii, np.hypot(px, py), side="left")
+            sub_w = np.broadcast_to(block[er, ec][:, None, None] / (ss * ss), sub_ring.shape)
+            ring_sums += np.bincount(sub_ring.ravel(), weights=sub_w.ravel(), minlength=bins)
+    return ring_sums
+
+
+def geodesic_ring_sums(src: rasterio.io.DatasetReader, data: np.ndarray, t, lon: float, lat: float,
+                       center_xy: tuple, to_lonlat: callable, radii: np.ndarray) -> np.ndarray:
+    ''' Population of a window binned by ring, from geodesic distances on the WGS84
+        ellipsoid. A cell is binned whole when its four corners fall in the same ring
+        (and it does not hold the center); the others are supersampled.
+    '''
+    data = _ring_data(src, data)
+    nrows, ncols = data.shape
+    ss = SUPERRES
+    sub = (np.arange(ss) + 0.5) / ss
+    bins = radii.size + 1
+    ring_sums = np.zeros(bins)
+    center_col, center_row = (int(np.floor(v)) for v in ~t * center_xy)
+
+    def rings_at(cols, rows):
+        # Ring index of raster points given in fractional window (col, row)
+        x, y = np.broadcast_arrays(t.c + cols * t.a, t.f + rows * t.e)
+        plon, plat = to_lonlat(x.ravel(), y.ravel())
+        dist = GEOD.inv(np.full(x.size, lon), np.full(x.size, lat), plon, plat)[2]
+        # Points outside the projection domain (inf/NaN) count as beyond every radius
+        dist = np.where(np.isfinite(dist), dist, np.inf)
+        return np.searchsorted(radii, dist, side="left").reshape(x.shape)
+
+    for start in range(0, nrows, RINGS_BLOCK_ROWS):
+        stop = min(start + RINGS_BLOCK_ROWS, nrows)
+        corner = rings_at(np.arange(ncols + 1)[None, :], np.arange(start, stop + 1)[:, None])
+        lo = np.minimum.reduce([corner[:-1, :-1], corner[:-1, 1:], corner[1:, :-1], corner[1:, 1:]])
+        hi = np.maximum.reduce([corner[:-1, :-1], corner[:-1, 1:], corner[1:, :-1], corner[1:, 1:]])
+        block = data[start:stop]
+
+        edge = lo != hi
+        if start <= center_row < stop and 0 <= center_col < ncols:
+            edge[center_row - start, center_col] = True
+        if ss == 1:
+            edge[:] = False
+
+        inner = ~edge
+        ring_sums += np.bincount(lo[inner], weights=block[inner], minlength=bins)
+
+        if edge.any():
+            er, ec = np.nonzero(edge)
+            sub_ring = rings_at(ec[:, None, None] + sub[None, None, :], start + er[:, None, None] + sub[None, :, None])
+            sub_w = np.broadcast_to(block[er, ec][:, None, None] / (ss * ss), sub_ring.shape)
+            ring_sums += np.bincount(sub_ring.ravel(), weights=sub_w.ravel(), minlength=bins)
+    return ring_sums
+
+
+def select_raster_and_transform(radius_m: float) -> tuple[rasterio.io.DatasetReader, callable]:
+    _, src, proj_to_raster = get_pyramid().select(radius_m)
+    return src, proj_to_raster
+
+
+def get_geodesic_footprint(lon: float, lat: float, radius_m: float,
+                           proj_to_raster: callable):
+    ''' Get the true geodesic circle (radius_m on the WGS84 ellipsoid) in the raster CRS.
+        It follows the projection distortion, and it is split at the antimeridian
+        and closed over the pole when needed.
 
-def get_proyected_circle(lon: float, lat: float, radius_m: float,
-                         proj_to_raster: callable) -> geometry.Polygon:
-    ''' Get a shapely circle in the raster CRS from lon, lat and radius in meters.
-    
         Args:
             lon (float): Longitude of circle center in WGS84
             lat (float): Latitude of circle center in WGS84
@@ -114,10 +323,6 @@ def get_proyected_circle(lon: float, lat: float, radius_m: float,
             proj_to_raster (callable): Function to project from WGS84 to raster CRS
 
         Returns:
-            shapely.geometry.Circle: The projected circle in the raster CRS
+            shapely.geometry.Polygon | MultiPolygon: The footprint in the raster CRS
     '''
-    # Proyected point to CRS raster
-    pt = geometry.Point(lon, lat)
-    pt_proj = shapely_transform(proj_to_raster, pt)
-    circle = pt_proj.buffer(radius_m)
-    return circle
+    return project_footprint(geodesic_footprint(lon, lat, radius_m), proj_to_raster)
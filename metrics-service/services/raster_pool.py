@@ -0,0 +1,69 @@
+import os
+import threading
+from typing import Any, Dict
+
+import pyproj
+import rasterio
+from rasterio.env import set_gdal_config
+
+# --- CONFIG ---
+GDAL_CACHEMAX_MB = int(os.getenv("GDAL_CACHEMAX_MB", "512"))      # GDAL block cache (whole process)
+GDAL_NUM_THREADS = os.getenv("GDAL_NUM_THREADS", "ALL_CPUS")       # threads for block decompression
+
+set_gdal_config("GDAL_CACHEMAX", GDAL_CACHEMAX_MB)
+set_gdal_config("GDAL_NUM_THREADS", GDAL_NUM_THREADS)
+
+
+class RasterPool:
+    ''' Per-thread rasterio handles and pyproj transformers.
+
+        GDAL datasets and PROJ transformers must not be used from several threads at
+        once, so every thread (FastAPI's threadpool workers included) gets its own
+        handle per path, opened on first use and reused afterwards. The GDAL block
+        cache is shared by all of them.
+    '''
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.opened = 0
+        self._threads = set()
+
+    def _handles(self) -> Dict[Any, Any]:
+        handles = getattr(self._local, "handles", None)
+        if handles is None:
+            handles = self._local.handles = {}
+            with self._lock:
+                self._threads.add(threading.get_ident())
+        return handles
+
+    def get(self, path: str) -> rasterio.io.DatasetReader:
+        ''' This thread's reader for path. '''
+        handles = self._handles()
+        src = handles.get(path)
+        if src is None or src.closed:
+            src = handles[path] = rasterio.open(path)
+            with self._lock:
+                self.opened += 1
+        return src
+
+    def transformer(self, crs_from: Any, crs_to: Any) -> callable:
+        ''' This thread's transform function between two CRS (always_xy). '''
+        handles = self._handles()
+        key = ("transformer", str(crs_from), str(crs_to))
+        fn = handles.get(key)
+        if fn is None:
+            fn = handles[key] = pyproj.Transformer.from_crs(crs_from, crs_to, always_xy=True).transform
+        return fn
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "threads": len(self._threads),
+                "handles_opened": self.opened,
+                "gdal_cachemax_mb": GDAL_CACHEMAX_MB,
+                "gdal_num_threads": GDAL_NUM_THREADS,
+            }
+
+
+raster_pool = RasterPool()
@@ -0,0 +1,256 @@
+import csv
+import json
+import math
+import os
+import re
+import sys
+import threading
+from array import array
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from services.kepler import ELEMENTS_DTYPE
+
+# --- CONFIG ---
+CATALOG_DIR = os.getenv("SBDB_CATALOG_DIR", "data/sbdb_catalog")
+ELEMENT_COLUMNS = ("a", "e", "i", "om", "w", "ma", "per", "epoch")   # SBDB field names (deg, AU, days, JD TDB)
+NAME_BYTES = 64   # fixed width of the full_name column
+KEY_BYTES = 48    # fixed width of the lookup keys
+
+GAUSS_K_DEG = math.degrees(0.01720209895)   # mean motion (deg/day) at a = 1 AU
+
+
+def normalize_key(sstr: str) -> str:
+    ''' Lookup form of a name, designation or SPK-ID: lower case, single spaces. '''
+    return " ".join(str(sstr).lower().split())
+
+
+# ---- Input formats ----
+def _sbdb_row_keys(full_name: str, pdes: str, name: str, spkid: str) -> list:
+    # " 99942 Apophis (2004 MN4)" -> "99942 apophis (2004 mn4)", "99942 apophis", "2004 mn4"
+    keys = [full_name, pdes, name, spkid]
+    m = re.match(r"^\s*(.*?)\s*\(([^)]*)\)\s*$", full_name)
+    if m:
+        keys += [m.group(1), m.group(2)]
+    return keys
+
+
+def _iter_sbdb_table(fields: list, rows) -> Iterator[Tuple[str, list, list]]:
+    col = {f: k for k, f in enumerate(fields)}
+    missing = {"full_name", *ELEMENT_COLUMNS} - set(col)
+    if missing:
+        raise ValueError(f"SBDB export without columns {sorted(missing)}")
+    for row in rows:
+        def get(f):
+            v = row[col[f]] if f in col else None
+            return "" if v is None else str(v).strip()
+        full_name = get("full_name")
+        values = []
+        for f in ELEMENT_COLUMNS:
+            try:
+                values.append(float(get(f)))
+            except ValueError:
+                values.append(math.nan)
+        if not math.isfinite(values[ELEMENT_COLUMNS.index("per")]) and values[0] > 0:
+            values[ELEMENT_COLUMNS.index("per")] = 360.0 / (GAUSS_K_DEG * values[0] ** -1.5)
+        yield full_name, values, _sbdb_row_keys(full_name, get("pdes"), get("name"), get("spkid"))
+
+
+def read_sbdb_csv(path: str) -> Iterator[Tuple[str, list, list]]:
+    ''' CSV export of the SBDB query API (header with spkid, full_name, pdes, name, a, e, i, om, w, ma, per, epoch). '''
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        yield from _iter_sbdb_table([h.strip() for h in next(reader)], reader)
+
+
+def read_sbdb_json(path: str) -> Iterator[Tuple[str, list, list]]:
+    ''' JSON output of the SBDB query API ({"fields": [...], "data": [[...], ...]}). '''
+    with open(path, encoding="utf-8") as f:
+        j = json.load(f)
+    yield from _iter_sbdb_table(j["fields"], j["data"])
+
+
+_PACKED = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+
+def _unpack_epoch(packed: str) -> float:
+    # "K24AH" -> 2024-10-17.0 TT -> JD
+    year = 100 * (_PACKED.index(packed[0])) + int(packed[1:3])
+    month, day = _PACKED.index(packed[3]), _PACKED.index(packed[4])
+    if month <= 2:
+        year, month = year - 1, month + 12
+    a = year // 100
+    b = 2 - a + a // 4
+    return math.floor(365.25 * (year + 4716)) + math.floor(30.6001 * (month + 1)) + day + b - 1524.5
+
+
+def _unpack_number(packed: str) -> Optional[int]:
+    # Numeradas: "00001", "A0001" (100001), "~0000" (620000 en base 62)
+    packed = packed.strip()
+    if len(packed) != 5:
+        return None
+    if packed[0] == "~":
+        n = 0
+        for c in packed[1:]:
+            n = n * 62 + _PACKED.index(c)
+        return 620000 + n
+    if packed[1:].isdigit() and packed[0] in _PACKED:
+        return _PACKED.index(packed[0]) * 10000 + int(packed[1:])
+    return None
+
+
+def read_mpcorb(path: str) -> Iterator[Tuple[str, list, list]]:
+    ''' MPC's MPCORB.DAT (fixed columns; header lines up to the "-----" separator are skipped). '''
+    with open(path, encoding="utf-8", errors="replace") as f:
+        lines = iter(f)
+        for line in lines:
+            if line.startswith("-----"):
+                break
+        else:  # sin cabecera: el fichero empieza directamente por los registros
+            f.seek(0)
+            lines = iter(f)
+        for line in lines:
+            if len(line) < 103 or not line[:7].strip():
+                continue
+            try:
+                ma, w, om, i, e, n, a = (float(line[s:t]) for s, t in
+                                         ((26, 35), (37, 46), (48, 57), (59, 68), (70, 79), (80, 91), (92, 103)))
+                epoch = _unpack_epoch(line[20:25])
+            except ValueError:
+                continue
+            readable = line[166:194].strip()
+            number = _unpack_number(line[:7])
+            keys = [readable]
+            m = re.match(r"^\((\d+)\)\s*(.*)$", readable)
+            if m:
+                keys += [m.group(1), m.group(2)]
+            if number is not None:
+                keys += [str(number), str(20000000 + number)]   # SPK-ID de las numeradas (2e7 + número)
+            per = 360.0 / n if n > 0 else math.nan
+            yield readable, [a, e, i, om, w, ma, per, epoch], keys
+
+
+def read_export(path: str) -> Iterator[Tuple[str, list, list]]:
+    lower = path.lower()
+    if lower.endswith(".json"):
+        return read_sbdb_json(path)
+    if lower.endswith(".csv"):
+        return read_sbdb_csv(path)
+    return read_mpcorb(path)
+
+
+# ---- Ingest ----
+def ingest(path: str, catalog_dir: str = CATALOG_DIR) -> int:
+    ''' Build the columnar catalog from an SBDB (CSV/JSON) or MPCORB.DAT export.
+
+        Each element column is a float64 .npy and the names a fixed-width bytes .npy;
+        the index is a sorted array of normalized keys (name, designation, SPK-ID...)
+        with the row of each, so a lookup is a binary search over memory-mapped files.
+
+        Args:
+            path (str): Export file (.csv / .json from the SBDB query API, otherwise MPCORB format)
+            catalog_dir (str): Output directory (replaced atomically per file)
+
+        Returns:
+            int: Number of objects ingested
+    '''
+    columns = [array("d") for _ in ELEMENT_COLUMNS]
+    names, index_keys, index_rows = [], [], array("i")
+    for row, (full_name, values, keys) in enumerate(read_export(path)):
+        for column, value in zip(columns, values):
+            column.append(value)
+        names.append(full_name.encode("utf-8")[:NAME_BYTES])
+        for key in {normalize_key(k) for k in keys if k}:
+            encoded = key.encode("utf-8")
+            if len(encoded) <= KEY_BYTES:
+                index_keys.append(encoded)
+                index_rows.append(row)
+
+    os.makedirs(catalog_dir, exist_ok=True)
+    keys = np.array(index_keys, dtype=f"S{KEY_BYTES}")
+    rows = np.frombuffer(index_rows, dtype=np.int32)
+    # Orden estable: ante claves repetidas gana el primer objeto del fichero
+    order = np.argsort(keys, kind="stable")
+    keys, rows = keys[order], rows[order]
+    first = np.ones(keys.size, dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+
+    arrays = {f"{c}.npy": np.frombuffer(col, dtype=np.float64) for c, col in zip(ELEMENT_COLUMNS, columns)}
+    arrays["full_name.npy"] = np.array(names, dtype=f"S{NAME_BYTES}")
+    arrays["index_keys.npy"] = keys[first]
+    arrays["index_rows.npy"] = rows[first]
+    for filename, data in arrays.items():
+        tmp = os.path.join(catalog_dir, filename + ".tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, data)
+        os.replace(tmp, os.path.join(catalog_dir, filename))
+    return len(names)
+
+
+# ---- Lookup ----
+class SmallBodyCatalog:
+    ''' Memory-mapped small-body elements with a sorted key index. '''
+
+    def __init__(self, catalog_dir: str = CATALOG_DIR):
+        self.catalog_dir = catalog_dir
+        load = lambda name: np.load(os.path.join(catalog_dir, name), mmap_mode="r")
+        self.columns = {c: load(f"{c}.npy") for c in ELEMENT_COLUMNS}
+        self.full_name = load("full_name.npy")
+        self.index_keys = load("index_keys.npy")
+        self.index_rows = load("index_rows.npy")
+
+    def __len__(self) -> int:
+        return self.full_name.shape[0]
+
+    def find(self, sstr: str) -> Optional[int]:
+        ''' Row of the object named sstr (name, designation or SPK-ID), or None. '''
+        key = normalize_key(sstr).encode("utf-8")
+        if not key or len(key) > KEY_BYTES:
+            return None
+        k = int(np.searchsorted(self.index_keys, key))
+        if k < self.index_keys.shape[0] and self.index_keys[k] == key:
+            return int(self.index_rows[k])
+        return None
+
+    def elements(self, rows) -> np.ndarray:
+        ''' ELEMENTS_DTYPE records (angles in radians) of the given rows, for services.kepler. '''
+        rows = np.asarray(rows)
+        out = np.empty(rows.shape[0], dtype=ELEMENTS_DTYPE)
+        for f in ("a", "e"):
+            out[f] = self.columns[f][rows]
+        for f in ("i", "om", "w", "ma"):
+            out[f] = np.radians(self.columns[f][rows])
+        out["epoch_jd"] = self.columns["epoch"][rows]
+        out["n"] = 2.0 * np.pi / self.columns["per"][rows]
+        out["q"] = np.nan
+        return out
+
+    def lookup(self, sstr: str) -> Optional[Dict[str, float]]:
+        ''' Elements of sstr as SBDB labels them (angles in degrees), or None if unknown. '''
+        row = self.find(sstr)
+        if row is None:
+            return None
+        elements = {c: float(col[row]) for c, col in self.columns.items()}
+        elements["full_name"] = self.full_name[row].decode("utf-8", errors="replace")
+        return elements
+
+
+_catalog: Optional[SmallBodyCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> Optional[SmallBodyCatalog]:
+    ''' Process catalog, opened on first use; None if it has not been ingested. '''
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None and os.path.exists(os.path.join(CATALOG_DIR, "index_keys.npy")):
+                _catalog = SmallBodyCatalog(CATALOG_DIR)
+    return _catalog
+
+
+if __name__ == "__main__":
+    # python -m services.sbdb_catalog <export.csv|export.json|MPCORB.DAT>
+    n = ingest(sys.argv[1])
+    print(f"{n} objects -> {CATALOG_DIR}")
@@ -0,0 +1,89 @@
+import asyncio
+import collections
+import os
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from services import close_approach
+from services.compute_pool import compute_pool
+from services.horizons_service import get_orbit_elements
+
+# --- CONFIG ---
+SCREEN_CHUNK = int(os.getenv("SCREEN_CHUNK", "512"))   # cuerpos por tarea del compute_pool
+SCREEN_MAX_STEPS = int(os.getenv("SCREEN_MAX_STEPS", "400000"))   # épocas muestreadas por cuerpo (~110 años a 0.1 días)
+
+
+def jd_now() -> float:
+    return time.time() / 86400.0 + 2440587.5
+
+
+async def earth_elements() -> np.ndarray:
+    # La órbita terrestre sale de Horizons, igual que /horizons/earth (y de su caché)
+    return close_approach.earth_elements(await get_orbit_elements(command="399", center="10"))
+
+
+async def screen_elements(chunks, start_jd: float, stop_jd: float, step_days: float,
+                          moid_max_au: float, approach_max_au: float) -> List[Dict]:
+    '''
+    MOID y acercamientos de bloques de cuerpos (iterable de arrays ELEMENTS_DTYPE),
+    repartidos entre los workers del compute_pool. Los índices del resultado son
+    globales (posición en la concatenación de los bloques).
+
+    Raises:
+        ValueError: si la ventana necesita más de SCREEN_MAX_STEPS épocas por cuerpo
+
+    Returns:
+        list: {index, moid_au, moid_km, encounters}, por MOID creciente
+    '''
+    steps = close_approach.sampling_steps(start_jd, stop_jd, step_days)
+    if steps > SCREEN_MAX_STEPS:
+        raise ValueError(f"{steps} epochs per body (window / step_days); the limit is {SCREEN_MAX_STEPS}")
+    earth = await earth_elements()
+    args = (earth, start_jd, stop_jd, step_days, moid_max_au, approach_max_au)
+
+    # Cada bloque ocupa su propia plaza del pool hasta que termina de verdad
+    # (429 antes de empezar si está lleno); como mucho workers + 1 en cola a la vez
+    offsets = collections.deque()
+
+    def tasks():
+        offset = 0
+        for chunk in chunks:
+            offsets.append(offset)
+            offset += len(chunk)
+            yield (chunk, *args)
+
+    hits: List[Dict] = []
+    async for chunk_hits in compute_pool.map_ordered(close_approach.screen, tasks()):
+        offset = offsets.popleft()
+        for hit in chunk_hits:
+            hit["index"] += offset
+            hits.append(hit)
+
+    hits.sort(key=lambda h: h["moid_au"])
+    return hits
+
+
+def chunked(elements: np.ndarray, size: int = SCREEN_CHUNK):
+    for start in range(0, len(elements), size):
+        yield elements[start:start + size]
+
+
+async def nominal_miss(elements: np.ndarray, years: float, approach_max_au: float = 0.05) -> Optional[Dict]:
+    '''
+    Distancia nominal de paso de un cuerpo a la Tierra en los próximos `years` años:
+    el acercamiento más cercano si lo hay (con su época y velocidad relativa) y,
+    si no, la MOID como cota inferior.
+    '''
+    start = jd_now()
+    hits = await screen_elements([elements], start, start + 365.25 * years, 1.0,
+                                 float("inf"), approach_max_au)
+    if not hits:
+        return None
+    hit = hits[0]
+    if hit["encounters"]:
+        closest = min(hit["encounters"], key=lambda enc: enc["miss_km"])
+        return {"miss_km": closest["miss_km"], "epoch_jd": closest["epoch_jd"],
+                "v_rel_kms": closest["v_rel_kms"], "moid_km": hit["moid_km"]}
+    return {"miss_km": hit["moid_km"], "epoch_jd": None, "v_rel_kms": None, "moid_km": hit["moid_km"]}
@@ -0,0 +1,354 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from services.cache import _MISSING, TTLCache
+from services.upstream_backend import MODES, UPSTREAM_MODE, make_transport, recording_store
+
+try:  # HTTP/2 necesita el extra httpx[http2] (paquete h2)
+    import h2  # noqa: F401
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+# --- CONFIG ---
+UPSTREAM_HTTP2 = os.getenv("UPSTREAM_HTTP2", "1") == "1" and HAS_HTTP2
+UPSTREAM_TIMEOUT_S = float(os.getenv("UPSTREAM_TIMEOUT_S", "20"))
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "32"))
+UPSTREAM_HOST_LIMIT = int(os.getenv("UPSTREAM_HOST_LIMIT", "4"))         # peticiones simultáneas por host
+UPSTREAM_RETRIES = int(os.getenv("UPSTREAM_RETRIES", "2"))               # reintentos tras el primer intento
+UPSTREAM_BACKOFF_S = float(os.getenv("UPSTREAM_BACKOFF_S", "0.25"))      # base del backoff exponencial
+BREAKER_FAILURES = int(os.getenv("UPSTREAM_BREAKER_FAILURES", "5"))      # fallos seguidos para abrir
+BREAKER_RESET_S = float(os.getenv("UPSTREAM_BREAKER_RESET_S", "30"))     # abierto antes de probar de nuevo
+
+# Límite de concurrencia por host (los no listados usan UPSTREAM_HOST_LIMIT)
+HOST_LIMITS = {
+    "ssd.jpl.nasa.gov": 2,       # Horizons: pide no más de un par de consultas a la vez
+    "ssd-api.jpl.nasa.gov": 4,   # SBDB
+    "api.nasa.gov": 4,           # NeoWs
+    "overpass-api.de": 2,
+}
+RETRY_STATUS = {429, 502, 503, 504}
+LATENCY_BUCKETS_S = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class UpstreamUnavailable(Exception):
+    ''' The upstream failed after retries, or its circuit is open. '''
+
+
+class LatencyHistogram:
+    ''' Fixed-bucket latency histogram (seconds) with approximate quantiles. '''
+
+    def __init__(self, buckets=LATENCY_BUCKETS_S):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, seconds: float) -> None:
+        i = next((k for k, b in enumerate(self.buckets) if seconds <= b), len(self.buckets))
+        self.counts[i] += 1
+        self.total += seconds
+        self.n += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        # Límite superior del bucket que contiene el cuantil
+        if not self.n:
+            return None
+        target, seen = q * self.n, 0
+        for k, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.buckets[k] if k < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "count": self.n,
+            "mean_s": self.total / self.n if self.n else None,
+            "p50_s": self.quantile(0.5),
+            "p95_s": self.quantile(0.95),
+            "p99_s": self.quantile(0.99),
+            "buckets": {f"le_{b}": c for b, c in zip(self.buckets, self.counts)} | {"le_inf": self.counts[-1]},
+        }
+
+
+class CircuitBreaker:
+    ''' Opens after `failures` consecutive failures; while open, calls fail fast.
+        After reset_s one trial call is let through (half-open): success closes it,
+        failure opens it again.
+    '''
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset_s: float = BREAKER_RESET_S):
+        self.failures = failures
+        self.reset_s = reset_s
+        self.consecutive = 0
+        self.opened_at: Optional[float] = None
+        self.trial = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_s else "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial:
+            self.trial = True
+            return True
+        return False
+
+    def success(self) -> None:
+        self.consecutive = 0
+        self.opened_at = None
+        self.trial = False
+
+    def abandon(self) -> None:
+        # La prueba en semiabierto se canceló sin respuesta: otra llamada podrá probar
+        self.trial = False
+
+    def failure(self) -> None:
+        self.consecutive += 1
+        if self.trial or self.consecutive >= self.failures:
+            if self.opened_at is None or self.trial:
+                self.times_opened += 1
+            self.opened_at = time.monotonic()
+            self.trial = False
+
+
+class Upstream:
+    ''' Per-host state: concurrency limits, circuit breaker and latency histogram. '''
+
+    def __init__(self, host: str, limit: int):
+        self.host = host
+        self.limit = limit
+        self.breaker = CircuitBreaker()
+        self.latency = LatencyHistogram()
+        self.thread_limit = threading.BoundedSemaphore(limit)
+        self.async_limit: Optional[asyncio.Semaphore] = None
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.short_circuited = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.times_opened,
+            "requests": self.requests,
+            "retries": self.retries,
+            "errors": self.errors,
+            "short_circuited": self.short_circuited,
+            "latency": self.latency.stats(),
+        }
+
+
+class UpstreamClient:
+    ''' Shared HTTP layer for the external APIs (Horizons, SBDB, NeoWs, Overpass).
+
+        One pooled keep-alive client per process (HTTP/2 when h2 is installed), for
+        async callers and for the synchronous agent tools. Requests are limited per host,
+        retried with jittered exponential backoff on network errors and 429/5xx, and
+        guarded by a per-host circuit breaker. The async client is opened and closed by
+        the app lifespan; it is also created on first use, so scripts work without it.
+        UPSTREAM_MODE swaps the transport underneath: live, record (responses captured
+        to disk) or replay (captures served offline with synthetic latency).
+    '''
+
+    def __init__(self, mode: str = UPSTREAM_MODE):
+        if mode not in MODES:
+            raise ValueError(f"UPSTREAM_MODE must be one of {MODES}, not {mode!r}")
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._upstreams: Dict[str, Upstream] = {}
+        self._async: Optional[httpx.AsyncClient] = None
+        self._sync: Optional[httpx.Client] = None
+
+    def _client_kwargs(self, sync: bool = False) -> Dict[str, Any]:
+        pool = dict(http2=UPSTREAM_HTTP2,
+                    limits=httpx.Limits(max_connections=UPSTREAM_MAX_CONNECTIONS,
+                                        max_keepalive_connections=UPSTREAM_MAX_CONNECTIONS))
+        transport = make_transport(self.mode, sync, **pool)
+        if transport is not None:
+            # El transporte envuelto ya lleva http2/limits
+            return dict(transport=transport, timeout=UPSTREAM_TIMEOUT_S, follow_redirects=True)
+        return dict(pool, timeout=UPSTREAM_TIMEOUT_S, follow_redirects=True)
+
+    def upstream(self, url: str) -> Upstream:
+        host = urlsplit(url).hostname or ""
+        with self._lock:
+            up = self._upstreams.get(host)
+            if up is None:
+                up = self._upstreams[host] = Upstream(host, HOST_LIMITS.get(host, UPSTREAM_HOST_LIMIT))
+            return up
+
+    # ---- Ciclo de vida ----
+    async def start(self) -> None:
+        if self._async is None or self._async.is_closed:
+            self._async = httpx.AsyncClient(**self._client_kwargs())
+            # Los semáforos asyncio pertenecen al bucle que arranca el cliente
+            for up in self._upstreams.values():
+                up.async_limit = None
+
+    async def close(self) -> None:
+        client, self._async = self._async, None
+        if client is not None:
+            await client.aclose()
+        with self._lock:
+            sync, self._sync = self._sync, None
+        if sync is not None:
+            sync.close()
+
+    def _sync_client(self) -> httpx.Client:
+        with self._lock:
+            if self._sync is None:
+                self._sync = httpx.Client(**self._client_kwargs(sync=True))
+            return self._sync
+
+    # ---- Peticiones ----
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        # Full jitter: evita que los clientes reintenten todos a la vez
+        return random.uniform(0.0, UPSTREAM_BACKOFF_S * 2 ** attempt)
+
+    def _admit(self, up: Upstream) -> None:
+        with self._lock:
+            up.requests += 1
+            if not up.breaker.allow():
+                up.short_circuited += 1
+                raise UpstreamUnavailable(f"{up.host}: circuit open")
+
+    def _record(self, up: Upstream, seconds: float, ok: bool) -> None:
+        with self._lock:
+            up.latency.observe(seconds)
+            if ok:
+                up.breaker.success()
+            else:
+                up.errors += 1
+                up.breaker.failure()
+
+    def _abandon(self, up: Upstream) -> None:
+        with self._lock:
+            up.breaker.abandon()
+
+    def _retry(self, up: Upstream) -> None:
+        with self._lock:
+            up.retries += 1
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        ''' GET url (async). Raises UpstreamUnavailable if the circuit is open or the
+            request still fails after retries; 4xx responses other than 429 are returned.
+        '''
+        up = self.upstream(url)
+        if self._async is None or self._async.is_closed:
+            await self.start()
+        if up.async_limit is None:
+            up.async_limit = asyncio.Semaphore(up.limit)
+        # Sin awaits entre la admisión (que puede conceder la prueba de semiabierto) y el try
+        self._admit(up)
+
+        last_error: Optional[BaseException] = None
+        for attempt in range(UPSTREAM_RETRIES + 1):
+            if attempt:
+                if up.breaker.state == "open":
+                    break   # otro fallo abrió el circuito: no insistir
+                self._retry(up)
+                await asyncio.sleep(self._backoff(attempt - 1))
+            t0 = time.perf_counter()
+            try:
+                async with up.async_limit:
+                    r = await self._async.get(url, **kwargs)
+            except httpx.TransportError as e:
+                self._record(up, time.perf_counter() - t0, ok=False)
+                last_error = e
+                continue
+            except (asyncio.CancelledError, KeyboardInterrupt):
+                # Sin veredicto sobre el host, pero no dejar la prueba de semiabierto colgada
+                self._abandon(up)
+                raise
+            except BaseException:
+                self._record(up, time.perf_counter() - t0, ok=False)
+                raise
+            ok = r.status_code not in RETRY_STATUS and r.status_code < 500
+            self._record(up, time.perf_counter() - t0, ok=ok)
+            if ok:
+                return r
+            last_error = httpx.HTTPStatusError(f"HTTP {r.status_code}", request=r.request, response=r)
+        raise UpstreamUnavailable(f"{up.host}: {last_error}") from last_error
+
+    def get_sync(self, url: str, **kwargs) -> httpx.Response:
+        ''' Blocking variant of get() for synchronous callers (agent tools). '''
+        up = self.upstream(url)
+        self._admit(up)
+        client = self._sync_client()
+
+        last_error: Optional[BaseException] = None
+        for attempt in range(UPSTREAM_RETRIES + 1):
+            if attempt:
+                if up.breaker.state == "open":
+                    break   # otro fallo abrió el circuito: no insistir
+                self._retry(up)
+                time.sleep(self._backoff(attempt - 1))
+            t0 = time.perf_counter()
+            try:
+                with up.thread_limit:
+                    r = client.get(url, **kwargs)
+            except httpx.TransportError as e:
+                self._record(up, time.perf_counter() - t0, ok=False)
+                last_error = e
+                continue
+            except (asyncio.CancelledError, KeyboardInterrupt):
+                # Sin veredicto sobre el host, pero no dejar la prueba de semiabierto colgada
+                self._abandon(up)
+                raise
+            except BaseException:
+                self._record(up, time.perf_counter() - t0, ok=False)
+                raise
+            ok = r.status_code not in RETRY_STATUS and r.status_code < 500
+            self._record(up, time.perf_counter() - t0, ok=ok)
+            if ok:
+                return r
+            last_error = httpx.HTTPStatusError(f"HTTP {r.status_code}", request=r.request, response=r)
+        raise UpstreamUnavailable(f"{up.host}: {last_error}") from last_error
+
+    async def get_json_cached(self, cache: TTLCache, key: Hashable, fresh_s: float, url: str,
+                              **kwargs) -> Any:
+        ''' JSON body of GET url, cached under key. Entries younger than fresh_s are served
+            without a request; older ones are refreshed, but served as-is (stale) if the
+            upstream is down or its circuit is open. The cache TTL bounds how stale.
+        '''
+        entry = cache.get(key)
+        if entry is not _MISSING and time.time() - entry[0] < fresh_s:
+            return entry[1]
+        try:
+            r = await self.get(url, **kwargs)
+            r.raise_for_status()
+            data = r.json()
+        except UpstreamUnavailable:
+            if entry is not _MISSING:
+                return entry[1]
+            raise
+        cache.set(key, (time.time(), data))
+        return data
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {"mode": self.mode, "http2": UPSTREAM_HTTP2,
+                     "hosts": {host: up.stats() for host, up in self._upstreams.items()}}
+        if self.mode != "live":
+            stats["recordings"] = recording_store.stats()
+        return stats
+
+
+upstream = UpstreamClient()
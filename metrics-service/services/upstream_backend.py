@@ -0,0 +1,215 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+# --- CONFIG ---
+UPSTREAM_MODE = os.getenv("UPSTREAM_MODE", "live").lower()                     # live | record | replay
+UPSTREAM_RECORD_DIR = os.getenv("UPSTREAM_RECORD_DIR", "data/upstream_recordings")
+UPSTREAM_REPLAY_LATENCY_MS = float(os.getenv("UPSTREAM_REPLAY_LATENCY_MS", "0"))   # latencia sintética media
+UPSTREAM_REPLAY_JITTER_MS = float(os.getenv("UPSTREAM_REPLAY_JITTER_MS", "0"))     # +- uniforme sobre la media
+# Parámetros que no forman parte de la clave: TLIST es el bucket de época de Horizons,
+# así una grabación sirve para cualquier fecha (salvo las series, ver recording_key)
+UPSTREAM_REPLAY_IGNORE_PARAMS = frozenset(
+    p for p in os.getenv("UPSTREAM_REPLAY_IGNORE_PARAMS", "TLIST").split(",") if p)
+
+MODES = ("live", "record", "replay")
+_SECRET_PARAMS = {"api_key"}   # no se escriben a disco ni forman parte de la clave
+# Cabeceras que describen el cuerpo tal como llegó por la red; se guarda ya decodificado
+_HOP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+
+def _strip(headers: httpx.Headers) -> list:
+    return [[k, v] for k, v in headers.multi_items() if k.lower() not in _HOP_HEADERS]
+
+
+def recording_key(request: httpx.Request) -> str:
+    ''' Stable key of a request: method, URL without query and the sorted query
+        parameters (minus UPSTREAM_REPLAY_IGNORE_PARAMS; TLIST is kept when TLIST_TYPE
+        is set, since it then lists the epochs the response must contain), hashed.
+    '''
+    url = request.url
+    ignored = UPSTREAM_REPLAY_IGNORE_PARAMS | _SECRET_PARAMS
+    if "TLIST_TYPE" in url.params:
+        # Lista explícita de épocas (series de Horizons): TLIST decide las filas de la respuesta
+        ignored -= {"TLIST"}
+    params = sorted((k, v) for k, v in url.params.multi_items() if k not in ignored)
+    raw = json.dumps([request.method, f"{url.scheme}://{url.host}{url.path}", params])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+class RecordingStore:
+    ''' Captured responses, one JSON file per request key in a directory. '''
+
+    def __init__(self, directory: str = UPSTREAM_RECORD_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._loaded: Dict[str, Optional[Dict[str, Any]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def save(self, request: httpx.Request, response: httpx.Response) -> None:
+        body = response.content
+        try:
+            content = {"text": body.decode("utf-8")}
+        except UnicodeDecodeError:
+            content = {"base64": base64.b64encode(body).decode("ascii")}
+        record = {
+            "method": request.method,
+            "url": str(request.url.copy_with(params=[(k, v) for k, v in request.url.params.multi_items()
+                                                     if k not in _SECRET_PARAMS])),
+            "status": response.status_code,
+            "headers": _strip(response.headers),
+            "recorded_at": time.time(),
+            **content,
+        }
+        key = recording_key(request)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{self._path(key)}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp, self._path(key))
+        with self._lock:
+            self._loaded[key] = record
+            self.recorded += 1
+
+    def load(self, request: httpx.Request) -> Optional[Dict[str, Any]]:
+        key = recording_key(request)
+        with self._lock:
+            if key in self._loaded:
+                record = self._loaded[key]
+            else:
+                # Se lee cada grabación una sola vez: el replay no mide E/S de disco
+                try:
+                    with open(self._path(key), encoding="utf-8") as f:
+                        record = json.load(f)
+                except FileNotFoundError:
+                    record = None
+                self._loaded[key] = record
+            if record is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return record
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"directory": self.directory, "hits": self.hits,
+                    "misses": self.misses, "recorded": self.recorded}
+
+
+def _response(record: Dict[str, Any], request: httpx.Request) -> httpx.Response:
+    body = record["text"].encode("utf-8") if "text" in record else base64.b64decode(record["base64"])
+    return httpx.Response(record["status"], headers=record["headers"], content=body, request=request)
+
+
+def _should_record(response: httpx.Response) -> bool:
+    # Los errores transitorios no se graban: el replay los serviría para siempre
+    return response.status_code < 500 and response.status_code != 429
+
+
+class RecordTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    ''' Live requests through the wrapped transport, capturing each response to the store. '''
+
+    def __init__(self, store: RecordingStore, transport: Optional[httpx.BaseTransport] = None,
+                 async_transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.store = store
+        self.transport = transport
+        self.async_transport = async_transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        response = self.transport.handle_request(request)
+        try:
+            response.read()
+        finally:
+            response.close()
+        if _should_record(response):
+            self.store.save(request, response)
+        return httpx.Response(response.status_code, headers=_strip(response.headers),
+                              content=response.content, request=request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.async_transport.handle_async_request(request)
+        try:
+            await response.aread()
+        finally:
+            await response.aclose()
+        if _should_record(response):
+            await asyncio.to_thread(self.store.save, request, response)
+        return httpx.Response(response.status_code, headers=_strip(response.headers),
+                              content=response.content, request=request)
+
+    def close(self) -> None:
+        if self.transport is not None:
+            self.transport.close()
+
+    async def aclose(self) -> None:
+        if self.async_transport is not None:
+            await self.async_transport.aclose()
+
+
+class ReplayTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    ''' Serves captured responses without touching the network, after a synthetic
+        latency. A request with no recording fails like an unreachable host
+        (httpx.ConnectError), so retries, breaker and stale fallbacks behave as offline.
+    '''
+
+    def __init__(self, store: RecordingStore, latency_ms: float = UPSTREAM_REPLAY_LATENCY_MS,
+                 jitter_ms: float = UPSTREAM_REPLAY_JITTER_MS):
+        self.store = store
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000.0
+
+    def _replay(self, request: httpx.Request) -> httpx.Response:
+        record = self.store.load(request)
+        if record is None:
+            raise httpx.ConnectError(f"replay: no recording for {request.method} {request.url}",
+                                     request=request)
+        return _response(record, request)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        delay = self._delay()
+        if delay:
+            time.sleep(delay)
+        return self._replay(request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        delay = self._delay()
+        if delay:
+            await asyncio.sleep(delay)
+        return self._replay(request)
+
+
+def make_transport(mode: str, sync: bool, **transport_kwargs):
+    ''' Transport for the sync or async client in the given mode; None in live mode,
+        so the client builds its default pooled transport.
+
+        Args:
+            mode (str): live | record | replay
+            sync (bool): Transport for httpx.Client (True) or httpx.AsyncClient (False)
+            transport_kwargs: http2 / limits of the live transport wrapped by record
+    '''
+    if mode == "live":
+        return None
+    if mode == "replay":
+        return ReplayTransport(recording_store)
+    if sync:
+        return RecordTransport(recording_store, transport=httpx.HTTPTransport(**transport_kwargs))
+    return RecordTransport(recording_store, async_transport=httpx.AsyncHTTPTransport(**transport_kwargs))
+
+
+recording_store = RecordingStore()
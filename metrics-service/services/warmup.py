@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# --- CONFIG ---
+WARMUP_AGENTS = os.getenv("WARMUP_AGENTS", "0") == "1"   # build the LLM agent graphs at startup too
+
+
+class Subsystem:
+    ''' A heavy resource loaded on first use or by the background warmup. '''
+
+    def __init__(self, name: str, load: Callable[[], Any], required: bool = True, enabled: bool = True):
+        self.name = name
+        self.load = load
+        self.required = required
+        self.state = "pending" if enabled else "disabled"
+        self.seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def warm(self) -> None:
+        if self.state != "pending":
+            return
+        self.state = "warming"
+        t0 = time.perf_counter()
+        try:
+            self.load()
+            self.state = "ready"
+        except Exception as e:
+            self.state = "failed"
+            self.error = f"{type(e).__name__}: {e}"
+        self.seconds = round(time.perf_counter() - t0, 3)
+
+    @property
+    def ok(self) -> bool:
+        return self.state in ("ready", "disabled") or not self.required
+
+    def status(self) -> Dict[str, Any]:
+        return {"state": self.state, "required": self.required,
+                "seconds": self.seconds, "error": self.error}
+
+
+class Warmup:
+    ''' Registry of subsystems warmed one after another in a background thread,
+        so the service accepts connections right away and /ready turns green
+        once every required subsystem has loaded.
+    '''
+
+    def __init__(self):
+        self.subsystems: Dict[str, Subsystem] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, load: Callable[[], Any], required: bool = True,
+                 enabled: bool = True) -> None:
+        self.subsystems[name] = Subsystem(name, load, required, enabled)
+
+    def _run(self) -> None:
+        for subsystem in list(self.subsystems.values()):
+            subsystem.warm()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+            self._thread.start()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def ready(self) -> bool:
+        return all(s.ok for s in self.subsystems.values())
+
+    def status(self) -> Dict[str, Any]:
+        return {"ready": self.ready,
+                "subsystems": {name: s.status() for name, s in self.subsystems.items()}}
+
+
+def _load_population() -> None:
+    from services.population_service import get_pyramid
+    from services.raster_pool import raster_pool
+
+    pyramid = get_pyramid()
+    if not pyramid.levels:
+        raise RuntimeError("No population rasters available")
+    # Abre los handles de este hilo: lee ya cabeceras y overviews de cada nivel
+    for _, path, _ in pyramid.levels:
+        raster_pool.get(path)
+
+
+def _load_compute_pool() -> None:
+    from services.compute_pool import compute_pool
+    compute_pool.warm()
+
+
+def _load_sbdb_catalog() -> None:
+    from services.sbdb_catalog import get_catalog
+    catalog = get_catalog()
+    # Toca el índice para que las páginas del mmap estén en caché antes de la primera consulta
+    catalog.find("1")
+
+
+def _load_agents() -> None:
+    from agent.tools import get_agent
+    from multi_agent_effects.nodos import get_agents, get_workflow
+    get_agent()
+    get_agents()
+    get_workflow()
+
+
+def default_warmup() -> Warmup:
+    from services.sbdb_catalog import CATALOG_DIR
+
+    warmup = Warmup()
+    warmup.register("population", _load_population)
+    warmup.register("compute_pool", _load_compute_pool)
+    # Sin catálogo ingerido /asteroids/elements consulta SBDB directamente
+    warmup.register("sbdb_catalog", _load_sbdb_catalog, required=False,
+                    enabled=os.path.exists(os.path.join(CATALOG_DIR, "index_keys.npy")))
+    # Los agentes dependen de claves externas: no bloquean la disponibilidad
+    warmup.register("agents", _load_agents, required=False, enabled=WARMUP_AGENTS)
+    return warmup
+
+
+warmup = default_warmup()
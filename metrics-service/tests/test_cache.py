@@ -0,0 +1,27 @@
+from services.cache import CACHES
+from services.impact_metrics import Asteroid, Atmosphere, ImpactMetrics, ImpactScenario, Target
+
+
+def test_summarize_echoes_each_callers_inputs():
+    CACHES["summarize"].clear()
+    # Entradas distintas que comparten clave (6 cifras significativas)
+    first = (Asteroid(50.0000001, 20_000.00001, 3000.0), ImpactScenario(True),
+             Target(2500.0), Atmosphere(burst_altitude_m=8000.00001))
+    second = (Asteroid(50.0000002, 20_000.00002, 3000.0), ImpactScenario(True),
+              Target(2500.0), Atmosphere(burst_altitude_m=8000.00002))
+    hits = CACHES["summarize"].hits
+    a = ImpactMetrics.summarize(*first, sample_r_km=(1.0000001, 10.0))
+    b = ImpactMetrics.summarize(*second, sample_r_km=(1.0000002, 10.0))
+    assert CACHES["summarize"].hits == hits + 1
+
+    assert a["inputs"]["diameter_m"] == 50.0000001 and b["inputs"]["diameter_m"] == 50.0000002
+    assert a["inputs"]["velocity_mps"] == 20_000.00001 and b["inputs"]["velocity_mps"] == 20_000.00002
+    assert a["inputs"]["burst_altitude_m"] == 8000.00001 and b["inputs"]["burst_altitude_m"] == 8000.00002
+    assert a["thermal_profile"][0]["r_km"] == 1.0000001 and b["thermal_profile"][0]["r_km"] == 1.0000002
+    assert a["energy"] == b["energy"]
+
+
+def test_summarize_result_cannot_alter_cache():
+    case = (Asteroid(70.0, 18_000.0, 3000.0), ImpactScenario(False), Target(2500.0), Atmosphere())
+    ImpactMetrics.summarize(*case)["crater"]["final_diameter_m"] = -1.0
+    assert ImpactMetrics.summarize(*case)["crater"]["final_diameter_m"] > 0
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from services import close_approach
+from services.kepler import ELEMENTS_DTYPE
+
+# Tierra J2000 (ángulos en radianes)
+EARTH = np.array([(1.00000011, 0.01671022, 0.00000087, -0.19653524, 1.99330267, 6.24006,
+                   2451545.0, np.nan, np.nan)], dtype=ELEMENTS_DTYPE)
+
+BODIES = np.array([
+    (1.3, 0.25, 0.05, 0.4, 2.0, 1.0, 2451545.0, np.nan, np.nan),      # cruza la órbita terrestre
+    (0.92, 0.19, 0.058, 3.56, 2.21, 2.5, 2451545.0, np.nan, np.nan),   # tipo Apophis
+    (2.7, 0.08, 0.18, 1.4, 1.28, 4.0, 2451545.0, np.nan, np.nan),      # cinturón principal
+    (1.8, 0.6, 2.8, 5.0, 0.3, 0.1, 2451545.0, np.nan, np.nan),         # retrógrada
+    (-1.5, 1.6, 0.5, 2.0, 1.0, 0.0, 2451545.0, np.nan, np.nan),        # hiperbólica
+], dtype=ELEMENTS_DTYPE)
+
+
+def _orbit_points(el, nu):
+    # Puntos de la órbita por anomalía verdadera, con la rotación escrita a mano
+    a, e, i, om, w = (float(el[f]) for f in ("a", "e", "i", "om", "w"))
+    p = a * (1.0 - e * e)
+    r = p / (1.0 + e * np.cos(nu))
+    u = w + nu
+    return r[:, None] * np.stack([
+        np.cos(om) * np.cos(u) - np.sin(om) * np.sin(u) * np.cos(i),
+        np.sin(om) * np.cos(u) + np.cos(om) * np.sin(u) * np.cos(i),
+        np.sin(u) * np.sin(i)], axis=1)
+
+
+def _brute_force_moid(el, n=3000):
+    earth = _orbit_points(EARTH[0], np.linspace(-np.pi, np.pi, n, endpoint=False))
+    if el["e"] < 1.0:
+        nu = np.linspace(-np.pi, np.pi, n, endpoint=False)
+    else:
+        lim = np.arccos(-1.0 / float(el["e"])) - 0.05
+        nu = np.linspace(-lim, lim, n)
+    body = _orbit_points(el, nu)
+    best = np.inf
+    for chunk in np.array_split(body, 10):
+        best = min(best, np.linalg.norm(chunk[:, None, :] - earth[None, :, :], axis=-1).min())
+    return best
+
+
+def test_moid_matches_brute_force():
+    moid = close_approach.moid(BODIES, EARTH)["moid_au"]
+    for el, m in zip(BODIES, moid):
+        brute = _brute_force_moid(el)
+        # La malla solo puede sobreestimar la MOID, y como mucho en el paso de la malla (~2e-3 UA)
+        assert m <= brute + 1e-9
+        assert brute - m < 2e-3
+
+
+def test_close_approaches_match_dense_sampling():
+    start, stop, max_au = 2451545.0, 2451545.0 + 3000.0, 0.3
+    found = close_approach.close_approaches(BODIES, EARTH, start, stop, 5.0, max_au)
+
+    t = np.arange(start, stop, 0.01)
+    d = close_approach._distances(BODIES, EARTH, t)
+    for b, encounters in enumerate(found):
+        k = np.nonzero((d[b, 1:-1] <= d[b, :-2]) & (d[b, 1:-1] <= d[b, 2:]) & (d[b, 1:-1] <= max_au))[0] + 1
+        assert len(encounters) == k.size
+        for enc, idx in zip(encounters, k):
+            assert enc["epoch_jd"] == pytest.approx(t[idx], abs=0.01)
+            # El muestreo no puede bajar del mínimo refinado
+            assert enc["miss_au"] <= d[b, idx] + 1e-12
+            assert d[b, idx] - enc["miss_au"] < 1e-6
+    assert sum(map(len, found)) > 0
+
+
+def test_close_approaches_time_blocks(monkeypatch):
+    args = (BODIES, EARTH, 2451545.0, 2451545.0 + 3000.0, 5.0, 0.3)
+    whole = close_approach.close_approaches(*args)
+    # Bloques de 7 épocas: los mínimos en las fronteras de bloque no se pierden ni se duplican
+    monkeypatch.setattr(close_approach, "APPROACH_MAX_PAIRS", 7 * len(BODIES))
+    assert close_approach.close_approaches(*args) == whole
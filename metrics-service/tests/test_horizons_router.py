@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from routers import horinzons_data
+from services.upstream import UpstreamUnavailable
+
+ELEMENTS = {"A": 1.0, "EC": 0.0167, "IN": 0.0, "OM": 3.0, "W": 1.8, "MA": 6.2,
+            "PR": 365.25, "N": 0.0172, "JDTDB": 2461000.5}
+
+
+@pytest.mark.parametrize("name", list(horinzons_data.BODIES))
+def test_body_endpoints_use_bodies_table(monkeypatch, name):
+    calls = []
+
+    async def get_orbit_elements(command, center):
+        calls.append((command, center))
+        return ELEMENTS
+
+    monkeypatch.setattr(horinzons_data, "get_orbit_elements", get_orbit_elements)
+    endpoint = getattr(horinzons_data, f"{name}_orbit")
+    assert asyncio.run(endpoint()) == horinzons_data.orbit_response(ELEMENTS)
+    assert calls == [horinzons_data.BODIES[name]]
+
+
+def test_body_endpoint_upstream_down(monkeypatch):
+    async def get_orbit_elements(command, center):
+        raise UpstreamUnavailable("ssd.jpl.nasa.gov: down")
+
+    monkeypatch.setattr(horinzons_data, "get_orbit_elements", get_orbit_elements)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(horinzons_data.mars_orbit())
+    assert exc.value.status_code == 503
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from models.impact_models import (AsteroidParams, AtmosphereParams, DistributionParams,
+                                  MonteCarloRequest, RadialProfileRequest)
+from routers import impact_effects
+
+ASTEROID = AsteroidParams(diameter_m=50.0, velocity_mps=17000.0, density_kgm3=3000.0)
+ATMOSPHERE = AtmosphereParams(burst_altitude_m=10000.0)
+
+
+def test_profile_fixed_grid_ignores_min_max():
+    # Con r_km la malla es esa: r_min_km/r_max_km no se validan
+    payload = RadialProfileRequest(asteroid=ASTEROID, atmosphere=ATMOSPHERE,
+                                   r_km=[1.0, 5.0, 20.0], r_min_km=50.0, r_max_km=10.0)
+    assert impact_effects.radial_profile(payload).r_km == [1.0, 5.0, 20.0]
+
+
+@pytest.mark.parametrize("r_km, r_min_km, r_max_km", [([1.0, 0.0], 0.1, 1000.0),
+                                                      (None, 50.0, 10.0),
+                                                      (None, 0.0, 10.0)])
+def test_profile_rejects_bad_radii(r_km, r_min_km, r_max_km):
+    payload = RadialProfileRequest(asteroid=ASTEROID, atmosphere=ATMOSPHERE,
+                                   r_km=r_km, r_min_km=r_min_km, r_max_km=r_max_km)
+    with pytest.raises(HTTPException) as exc:
+        impact_effects.radial_profile(payload)
+    assert exc.value.status_code == 422
+
+
+@pytest.mark.parametrize("max_points", [31, 4097])
+def test_profile_max_points_is_bounded(max_points):
+    with pytest.raises(ValidationError):
+        RadialProfileRequest(asteroid=ASTEROID, max_points=max_points)
+
+
+def _inline_pool(monkeypatch, calls):
+    # El pool ejecuta la tarea en este proceso y anota qué se le envía
+    async def run(fn, *args, timeout=None):
+        calls.append(fn)
+        return fn(*args)
+    monkeypatch.setattr(impact_effects.compute_pool, "run", run)
+
+
+def test_montecarlo_runs_in_the_compute_pool(monkeypatch):
+    calls = []
+    _inline_pool(monkeypatch, calls)
+    payload = MonteCarloRequest(velocity_mps=DistributionParams(kind="uniform", a=12_000.0, b=30_000.0),
+                                density_kgm3=DistributionParams(a=3_000.0),
+                                diameter_m=DistributionParams(a=50.0), n_samples=500, seed=3)
+    result = asyncio.run(impact_effects.monte_carlo(payload))
+    assert calls == [impact_effects.run_monte_carlo]
+    assert result.n_samples == 500 and result.seed == 3
+
+
+def test_montecarlo_bad_sample_count_is_422(monkeypatch):
+    _inline_pool(monkeypatch, [])
+    payload = MonteCarloRequest(velocity_mps=DistributionParams(a=17_000.0),
+                                density_kgm3=DistributionParams(a=3_000.0),
+                                diameter_m=DistributionParams(a=50.0), n_samples=0)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(impact_effects.monte_carlo(payload))
+    assert exc.value.status_code == 422
@@ -0,0 +1,89 @@
+import itertools
+import math
+
+import numpy as np
+import pytest
+
+from services.impact_metrics import Asteroid, Atmosphere, ImpactMetrics, ImpactScenario, Target
+from services.impact_metrics_vec import (ISOBAR_BRANCHES, SCENARIO_DTYPE, VectorizedImpactMetrics,
+                                         to_structured)
+
+THRESHOLDS_KPA = {f"p{kpa:g}": kpa for kpa in (0.1, 1.0, 6.9, 34.5, 100.0, 1_000.0)}
+
+
+def _scenarios():
+    for d, v, rho, airburst, burst, water in itertools.product(
+            (5.0, 60.0, 1_000.0), (11_000.0, 40_000.0), (1_500.0, 3_000.0),
+            (True, False), (None, 0.0, 800.0, 30_000.0), (None, 0.0, 3_000.0)):
+        yield (Asteroid(d, v, rho), ImpactScenario(airburst),
+               Target(2_500.0, water_depth_m=water), Atmosphere(burst_altitude_m=burst))
+
+
+def _assert_same(a, b, path="summary"):
+    if isinstance(a, dict):
+        assert a.keys() == b.keys(), path
+        for k in a:
+            _assert_same(a[k], b[k], f"{path}.{k}")
+    elif isinstance(a, list):
+        assert len(a) == len(b), path
+        for k, (x, y) in enumerate(zip(a, b)):
+            _assert_same(x, y, f"{path}[{k}]")
+    elif isinstance(a, float) and b is not None:
+        assert b == pytest.approx(a, rel=1e-9, abs=1e-12), path
+    else:
+        assert a == b, path
+
+
+def test_summarize_many_matches_scalar():
+    cases = list(_scenarios())
+    vector = VectorizedImpactMetrics.summarize_many(*map(list, zip(*cases)))
+    for case, summary in zip(cases, vector):
+        _assert_same(ImpactMetrics.summarize(*case), summary)
+
+
+def test_summarize_many_rejects_unequal_lengths():
+    asteroids, scenarios, targets, atms = map(list, zip(*itertools.islice(_scenarios(), 3)))
+    with pytest.raises(ValueError, match="same length"):
+        VectorizedImpactMetrics.summarize_many(asteroids, scenarios[:2], targets, atms)
+
+
+def test_scalar_summarize_ground_impact():
+    # El baseline pasaba eta como atmosfera a thermal_exposure_at_distance y esto fallaba
+    asteroid = Asteroid(60.0, 17_000.0, 3_000.0)
+    out = ImpactMetrics.summarize(asteroid, ImpactScenario(False), Target(2_500.0), Atmosphere())
+    E = ImpactMetrics.kinetic_energy(asteroid)
+    for entry in out["thermal_profile"]:
+        r_m = entry["r_km"] * 1000.0
+        expected = (3e-3 * E / (2.0 * math.pi * r_m ** 2)
+                    * ImpactMetrics.horizon_fraction(r_m, ImpactMetrics.fireball_radius(E)))
+        assert entry["fluence_Jm2"] == pytest.approx(expected, rel=1e-12)
+
+
+def test_isobars_match_scalar():
+    E, h = np.meshgrid(np.logspace(8, 20, 25), np.array([50.0, 300.0, 1_000.0, 5_000.0, 20_000.0]))
+    res = VectorizedImpactMetrics.isobar_radii_airburst(E, h, THRESHOLDS_KPA)
+    for idx in np.ndindex(E.shape):
+        scalar = ImpactMetrics.isobar_radii_airburst(float(E[idx]), float(h[idx]), THRESHOLDS_KPA)
+        for key, sol in scalar.items():
+            vec = res[key]
+            assert ISOBAR_BRANCHES[vec["branch"][idx]] == sol.branch, (key, idx)
+            assert bool(vec["in_discontinuity"][idx]) == sol.in_discontinuity
+            if sol.radius_m is None:
+                assert math.isnan(vec["radius_m"][idx])
+            else:
+                # Ambas bisecciones paran a tol = 1 m
+                assert vec["radius_m"][idx] == pytest.approx(sol.radius_m, rel=1e-6, abs=2.0)
+
+
+@pytest.mark.parametrize("flag", [math.nan, np.float64("nan")])
+def test_nan_airburst_flag_is_rejected(flag):
+    with pytest.raises(ValueError):
+        to_structured([{"is_airburst": flag}], SCENARIO_DTYPE)
+    with pytest.raises(ValueError):
+        VectorizedImpactMetrics.summarize(
+            {"diameter_m": np.array([50.0]), "velocity_mps": 2e4, "density_kgm3": 3e3},
+            {"is_airburst": np.array([flag])}, {"density_kgm3": 2.5e3}, {"burst_altitude_m": 1e3})
+
+
+def test_missing_airburst_flag_is_false():
+    assert not to_structured([{}], SCENARIO_DTYPE)["is_airburst"][0]
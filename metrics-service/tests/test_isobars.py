@@ -0,0 +1,49 @@
+import math
+
+import numpy as np
+import pytest
+
+from services.impact_metrics import Asteroid, ImpactMetrics
+
+R_MIN, R_MAX = 10.0, 1_000_000.0
+# 100 kPa pasa por las cuatro ramas (regular, Mach, transición, fuera de rango) en esta malla
+THRESHOLDS_KPA = {f"p{kpa:g}": kpa for kpa in (0.1, 1.0, 6.9, 100.0, 1_000.0)}
+CASES = [(E, h) for E in (1e10, 1e13, 1e15, 1e17) for h in (50.0, 300.0, 1_000.0, 5_000.0)]
+
+
+def _first_crossing(E, h, p_t, r):
+    # Primer radio de la malla r en que la sobrepresión ya no supera p_t
+    p = np.array([ImpactMetrics.overpressure_collins_airburst(E, h, x) for x in r])
+    below = np.nonzero(p <= p_t)[0]
+    return None if below.size == 0 else below[0]
+
+
+@pytest.mark.parametrize("E, h", CASES)
+def test_isobars_match_brute_force(E, h):
+    r = np.geomspace(R_MIN, R_MAX, 4001)
+    solutions = ImpactMetrics.isobar_radii_airburst(E, h, THRESHOLDS_KPA, R_min=R_MIN, R_max=R_MAX)
+    for key, kpa in THRESHOLDS_KPA.items():
+        sol, p_t = solutions[key], kpa * 1_000.0
+        k = _first_crossing(E, h, p_t, r)
+        if sol.branch is None:
+            assert sol.radius_m is None and k == 0
+        elif sol.branch == "beyond_range":
+            assert sol.radius_m == R_MAX and k is None
+        else:
+            # El cruce de la malla está en el intervalo (r[k-1], r[k]]
+            assert k is not None and k > 0
+            assert r[k - 1] * (1 - 1e-9) <= sol.radius_m <= r[k] * (1 + 1e-9)
+            assert sol.in_discontinuity == (sol.branch == "transition")
+
+
+def test_overpressure_above_threshold_at_r_max_is_beyond_range():
+    E = ImpactMetrics.kinetic_energy(Asteroid(diameter_m=7.8, velocity_mps=40_000.0, density_kgm3=3000.0))
+    assert ImpactMetrics.overpressure_collins_airburst(E, 628.0, R_MAX) > 6.9e3
+    sol = ImpactMetrics.isobar_radii_airburst(E, 628.0, {"1psi": 6.9})["1psi"]
+    assert (sol.radius_m, sol.branch, sol.in_discontinuity) == (R_MAX, "beyond_range", False)
+
+
+def test_all_branches_covered():
+    branches = {sol.branch for E, h in CASES
+                for sol in ImpactMetrics.isobar_radii_airburst(E, h, THRESHOLDS_KPA).values()}
+    assert {None, "regular", "mach", "transition", "beyond_range"} <= branches
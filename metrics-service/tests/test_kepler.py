@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from services import kepler
+
+
+def _elements(e, q=0.5, ma=0.0, a=np.nan):
+    el = np.zeros(1, dtype=kepler.ELEMENTS_DTYPE)
+    el[0] = (a, e, 0.3, 1.0, 2.0, ma, 0.0, np.nan, q)
+    return el
+
+
+@pytest.mark.parametrize("delta", [1e-6, 1e-7, 1e-8, 1e-9, 1e-10])
+@pytest.mark.parametrize("sign", [-1.0, 1.0])
+def test_near_parabolic_positions_converge_to_parabola(delta, sign):
+    # Misma q: la distancia a la parábola debe ser O(|1 - e|), sin saltos al cruzar e = 1
+    epochs = np.array([-40.0, 3.0, 30.0, 300.0])
+    parabola = kepler.propagate(_elements(1.0), epochs)[0]
+    orbit = kepler.propagate(_elements(1.0 + sign * delta), epochs)[0]
+    assert np.abs(orbit - parabola).max() < 20.0 * delta
+
+
+def test_circular_orbit_moves_uniformly():
+    el = np.zeros(1, dtype=kepler.ELEMENTS_DTYPE)
+    el[0] = (2.0, 0.0, 0.0, 0.0, 0.0, 0.25, 100.0, np.nan, np.nan)
+    t = np.linspace(100.0, 2000.0, 7)
+    pos = kepler.propagate(el, t)[0]
+    angle = 0.25 + np.sqrt(kepler.GM_SUN / 8.0) * (t - 100.0)
+    np.testing.assert_allclose(pos, 2.0 * np.stack([np.cos(angle), np.sin(angle), 0.0 * t], axis=1),
+                               atol=1e-12)
+
+
+def test_kepler_equation_residuals():
+    rng = np.random.default_rng(3)
+    M = rng.uniform(-50.0, 50.0, 20000)
+    e = np.concatenate([rng.uniform(0.0, 1.0, 10000), 1.0 - 10.0 ** rng.uniform(-9, -1, 10000)])
+    E = kepler.solve_elliptic(M, e)
+    assert np.abs(np.angle(np.exp(1j * (E - e * np.sin(E) - M)))).max() < 1e-12
+
+    Mh = rng.uniform(-1e3, 1e3, 20000)
+    eh = np.concatenate([rng.uniform(1.0, 5.0, 10000), 1.0 + 10.0 ** rng.uniform(-9, -1, 10000)])
+    H = kepler.solve_hyperbolic(Mh, eh)
+    np.testing.assert_allclose(eh * np.sinh(H) - H, Mh, rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize("a, e", [(1.5, 0.3), (0.8, 0.97), (-2.0, 1.4), (-0.5, 3.0)])
+def test_vis_viva_and_angular_momentum(a, e):
+    el = np.zeros(1, dtype=kepler.ELEMENTS_DTYPE)
+    el[0] = (a, e, 0.4, 1.1, -0.7, 0.3, 0.0, np.nan, np.nan)
+    h = 1e-3
+    t = np.linspace(-200.0, 200.0, 41)
+    pos = kepler.propagate(el, np.concatenate([t - h, t, t + h])).reshape(3, t.size, 3)
+    r, v = pos[1], (pos[2] - pos[0]) / (2.0 * h)
+    dist = np.linalg.norm(r, axis=1)
+    # Energía (vis-viva) y momento angular constantes a lo largo de la órbita
+    np.testing.assert_allclose(np.sum(v * v, axis=1), kepler.GM_SUN * (2.0 / dist - 1.0 / a), rtol=1e-5)
+    L = np.cross(r, v)
+    np.testing.assert_allclose(L, np.broadcast_to(L[t.size // 2], L.shape), rtol=1e-5, atol=1e-12)
+    np.testing.assert_allclose(np.linalg.norm(L, axis=1),
+                               np.sqrt(kepler.GM_SUN * a * (1.0 - e * e)), rtol=1e-5)
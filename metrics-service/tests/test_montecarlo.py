@@ -0,0 +1,21 @@
+from services.impact_montecarlo import SEED_BITS, Distribution, MonteCarloInputs, run_monte_carlo
+
+INPUTS = MonteCarloInputs(
+    velocity_mps=Distribution("uniform", 12_000.0, 30_000.0),
+    density_kgm3=Distribution("normal", 2_600.0, 300.0),
+    diameter_m=Distribution("lognormal", 80.0, 0.3),
+    burst_altitude_m=Distribution("uniform", 0.0, 8_000.0),
+)
+
+
+def test_generated_seed_fits_json_and_repeats_the_run():
+    first = run_monte_carlo(INPUTS, n_samples=2_000)
+    assert isinstance(first["seed"], int) and 0 <= first["seed"] < 2 ** SEED_BITS
+    again = run_monte_carlo(INPUTS, n_samples=2_000, seed=first["seed"])
+    assert again == first
+
+
+def test_result_does_not_depend_on_chunk_size():
+    a = run_monte_carlo(INPUTS, n_samples=3_000, seed=42)
+    b = run_monte_carlo(INPUTS, n_samples=3_000, seed=42, chunk_size=700)
+    assert a == b and a["seed"] == 42
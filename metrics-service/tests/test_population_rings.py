@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+import pyproj
+import rasterio
+from rasterio.transform import from_origin
+
+from services import population_service
+from services.population_pyramid import PopulationPyramid
+
+CRS = "ESRI:54009"   # Mollweide, como GHS-POP
+CELL_M = 1000.0
+NODATA = -200.0
+
+
+def _raster(tmp_path, lon, lat, half_m, name):
+    x0, y0 = pyproj.Transformer.from_crs("EPSG:4326", CRS, always_xy=True).transform(lon, lat)
+    n = int(2 * half_m / CELL_M)
+    rng = np.random.default_rng(11)
+    # Crece hacia el este y el oeste: el total depende de la forma del círculo, no solo de su área
+    cols = (np.arange(n) - n / 2) / (n / 2)
+    data = (rng.integers(0, 20, size=(n, n)) + 1000.0 * cols[None, :] ** 2).astype(np.float32)
+    data[rng.random(data.shape) < 0.02] = NODATA
+    path = tmp_path / f"{name}.tif"
+    with rasterio.open(path, "w", driver="GTiff", height=n, width=n, count=1, dtype="float32",
+                       crs=CRS, nodata=NODATA, transform=from_origin(x0 - half_m, y0 + half_m, CELL_M, CELL_M)) as dst:
+        dst.write(data, 1)
+    return str(path)
+
+
+@pytest.fixture
+def pyramid(monkeypatch, tmp_path):
+    def use(lon, lat, half_m):
+        pyr = PopulationPyramid.open({1000: _raster(tmp_path, lon, lat, half_m, f"pop_{lat}")},
+                                     pyramid_dir=str(tmp_path / "pyramid"))
+        monkeypatch.setattr(population_service, "get_pyramid", lambda: pyr)
+    return use
+
+
+@pytest.mark.parametrize("lon, lat, radii", [
+    (10.0, 5.0, [3_000.0, 20_000.0, 60_000.0]),      # distorsión < 2%: camino plano
+    (25.0, 70.0, [3_000.0, 40_000.0, 120_000.0]),    # Mollweide a 70°: camino geodésico
+    (-50.0, -62.0, [10_000.0, 90_000.0]),
+])
+def test_rings_match_single_circles(pyramid, lon, lat, radii):
+    pyramid(lon, lat, 300_000.0)
+    rings = population_service.estimate_population_rings(lon, lat, radii)
+    for ring, radius in zip(rings, radii):
+        detail = population_service.compute_population_detail(lon, lat, radius)
+        assert ring["radius_m"] == radius
+        # Mismo círculo geodésico; solo cambia el muestreo de las celdas del borde
+        assert abs(ring["population"] - detail["population"]) <= 0.1 * detail["error_estimate"] + 1
+    # Cada valor se redondea por separado
+    cumulative = np.cumsum([r["ring_population"] for r in rings])
+    assert np.abs(np.array([r["population"] for r in rings]) - cumulative).max() <= len(rings)
+
+
+def test_rings_follow_geodesic_distance_at_high_latitude(pyramid):
+    # A 70° el círculo plano de Mollweide deja fuera buena parte del geodésico
+    pyramid(25.0, 70.0, 300_000.0)
+    ring = population_service.estimate_population_rings(25.0, 70.0, [120_000.0])[0]
+    detail = population_service.compute_population_detail(25.0, 70.0, 120_000.0)
+    assert detail["population"] > 0
+    assert ring["population"] == pytest.approx(detail["population"], rel=1e-3)
+
+    # Con distancias planas en Mollweide (lo que hacía antes) el error es mucho mayor
+    _, src, proj_to_raster = population_service.get_pyramid().select(120_000.0)
+    x0, y0 = proj_to_raster(25.0, 70.0)
+    window = population_service.read_window(src, (x0 - 120_000.0, y0 - 120_000.0, x0 + 120_000.0, y0 + 120_000.0))
+    planar = population_service.planar_ring_sums(src, *window, x0, y0, np.array([120_000.0]))[0]
+    assert abs(planar - detail["population"]) > 0.05 * detail["population"]
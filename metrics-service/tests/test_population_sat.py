@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+from services.circle_coverage import circle_coverage
+from services.population_sat import PopulationSAT
+from services.population_service import masked_sum
+
+NODATA = -200.0
+
+
+@pytest.fixture(scope="module")
+def raster(tmp_path_factory):
+    rng = np.random.default_rng(7)
+    data = rng.integers(0, 50, size=(300, 260)).astype(np.float32)
+    data[rng.random(data.shape) < 0.05] = NODATA
+    path = tmp_path_factory.mktemp("pop") / "pop.tif"
+    with rasterio.open(path, "w", driver="GTiff", height=data.shape[0], width=data.shape[1], count=1,
+                       dtype="float32", nodata=NODATA, transform=from_origin(0.0, 0.0, 100.0, 100.0)) as dst:
+        dst.write(data, 1)
+    return str(path), data
+
+
+@pytest.fixture(scope="module")
+def sat(raster, tmp_path_factory):
+    # Teselas pequeñas para que los círculos crucen varias
+    return PopulationSAT(raster[0], "pop", cache_dir=str(tmp_path_factory.mktemp("sat")), tile_size=64)
+
+
+def test_rect_sum_matches_numpy(raster, sat):
+    data = np.where(raster[1] == NODATA, 0.0, raster[1])
+    for r0, c0, r1, c1 in [(0, 0, 300, 260), (10, 63, 65, 200), (-5, -5, 3, 4), (299, 259, 400, 400)]:
+        expected = data[max(r0, 0):r1, max(c0, 0):c1].sum()
+        assert sat.rect_sum(r0, c0, r1, c1) == pytest.approx(expected, rel=1e-12)
+
+
+@pytest.mark.parametrize("cx, cy, radius_px", [(130.3, 150.7, 40.2), (10.5, 20.0, 55.0), (250.1, 290.9, 90.0)])
+def test_circle_matches_coverage_mask(raster, sat, cx, cy, radius_px):
+    class Src:
+        nodata = NODATA
+
+    data = raster[1]
+    mask = circle_coverage(data.shape[0], data.shape[1], cx, cy, radius_px, 4)
+    expected, expected_error = masked_sum(Src, data, mask)
+    total, error = sat.circle_sum_detail(cx, cy, radius_px, 4)
+    assert total == pytest.approx(expected, rel=1e-9)
+    assert error == pytest.approx(expected_error, rel=1e-9)
+
+
+def test_open_tiles_are_bounded(raster, tmp_path_factory):
+    sat = PopulationSAT(raster[0], "pop", cache_dir=str(tmp_path_factory.mktemp("sat_lru")),
+                        tile_size=64, max_tiles=3)
+    data = np.where(raster[1] == NODATA, 0.0, raster[1])
+    assert sat.rect_sum(0, 0, 300, 260) == pytest.approx(data.sum(), rel=1e-12)
+    assert len(sat._tiles) == 3
+    # La tesela más reciente sigue abierta; la primera ya se desalojó
+    assert (4, 4) in sat._tiles and (0, 0) not in sat._tiles
@@ -0,0 +1,114 @@
+import asyncio
+import math
+import os
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from routers import asteroids_data
+from services.sbdb_catalog import SmallBodyCatalog, ingest
+from services.upstream import UpstreamUnavailable
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def _catalog(tmp_path, filename):
+    n = ingest(os.path.join(FIXTURES, filename), str(tmp_path))
+    return n, SmallBodyCatalog(str(tmp_path))
+
+
+@pytest.mark.parametrize("filename", ["sbdb_small.csv", "sbdb_small.json"])
+def test_sbdb_export_lookup(tmp_path, filename):
+    n, catalog = _catalog(tmp_path, filename)
+    assert n == len(catalog) == 3
+    apophis = catalog.find("Apophis")
+    # Nombre, pdes, designación provisional, SPK-ID y full_name, sin importar mayúsculas ni espacios
+    for sstr in ("apophis", "99942", "2004 MN4", " 2004  mn4 ", "20099942", "99942 Apophis (2004 MN4)"):
+        assert catalog.find(sstr) == apophis
+    elements = catalog.lookup("Apophis")
+    assert elements["a"] == 0.92235 and elements["epoch"] == 2461000.5
+    assert elements["full_name"].strip() == "99942 Apophis (2004 MN4)"
+
+    # Sin nombre y sin periodo en el export: solo designación, y el periodo sale de a
+    aa7 = catalog.lookup("2019 AA7")
+    assert aa7 is not None and catalog.find("3840473") == catalog.find("2019 aa7")
+    assert aa7["per"] == pytest.approx(365.25 * 1.0387 ** 1.5, rel=1e-4)
+    assert catalog.lookup("Bennu") is None
+
+
+def test_mpcorb_lookup(tmp_path):
+    n, catalog = _catalog(tmp_path, "MPCORB_small.DAT")
+    assert n == 4
+    ceres = catalog.lookup("ceres")
+    assert ceres["full_name"] == "(1) Ceres"
+    assert ceres["epoch"] == 2460600.5   # K24AH = 2024-10-17.0
+    assert ceres["per"] == pytest.approx(360.0 / 0.21424651)
+    assert catalog.find("1") == catalog.find("20000001") == catalog.find("(1) Ceres")
+    # Numeradas por encima de 99999 ("A1955" = 101955) y provisionales
+    assert catalog.find("101955") == catalog.find("Bennu") == catalog.find("20101955")
+    assert catalog.lookup("2019 AA7")["a"] == 1.0387
+
+    records = catalog.elements([catalog.find("Apophis")])
+    assert records["i"][0] == pytest.approx(math.radians(3.34108))
+    assert records["n"][0] == pytest.approx(math.radians(1.11263981))
+
+
+SBDB_APOPHIS = {
+    "object": {"fullname": "99942 Apophis (2004 MN4)"},
+    "orbit": {"epoch": "2461000.5", "elements": [
+        {"label": "a", "value": "0.92235"}, {"label": "e", "value": "0.19108"},
+        {"label": "i", "value": "3.3411"}, {"label": "node", "value": "203.8951"},
+        {"label": "peri", "value": "126.6724"}, {"label": "M", "value": "142.8812"},
+        {"label": "period", "value": "323.55"}]},
+}
+
+
+@pytest.fixture
+def sbdb(monkeypatch, tmp_path):
+    # Catálogo local con el export MPCORB; lo que no está en él va a SBDB (simulado)
+    _, catalog = _catalog(tmp_path, "MPCORB_small.DAT")
+    monkeypatch.setattr(asteroids_data, "get_catalog", lambda: catalog)
+    calls = []
+
+    def respond(result):
+        async def get_json_cached(cache, key, fresh_s, url, **kwargs):
+            calls.append(key)
+            if isinstance(result, BaseException):
+                raise result
+            return result
+        monkeypatch.setattr(asteroids_data.upstream, "get_json_cached", get_json_cached)
+
+    return respond, calls
+
+
+def _status_error(status):
+    request = httpx.Request("GET", asteroids_data.SBDB_LOOKUP)
+    return httpx.HTTPStatusError(f"HTTP {status}", request=request, response=httpx.Response(status, request=request))
+
+
+def test_elements_from_catalog_without_network(sbdb):
+    respond, calls = sbdb
+    respond(AssertionError("SBDB should not be queried"))
+    elts = asyncio.run(asteroids_data.get_elements("Apophis"))
+    assert elts.asteroid_name == "(99942) Apophis" and elts.a == 0.92235
+    assert calls == []
+
+
+def test_elements_network_fallback(sbdb):
+    respond, calls = sbdb
+    respond(SBDB_APOPHIS)
+    elts = asyncio.run(asteroids_data.get_elements("2004 XY"))
+    assert calls == ["2004 XY"]
+    assert elts.asteroid_name == "99942 Apophis (2004 MN4)"
+    assert elts.i == pytest.approx(math.radians(3.3411)) and elts.periodDays == 323.55
+
+
+@pytest.mark.parametrize("error, status", [(_status_error(404), 404), (_status_error(400), 404),
+                                           (_status_error(500), 503), (UpstreamUnavailable("down"), 503)])
+def test_elements_upstream_errors(sbdb, error, status):
+    respond, _ = sbdb
+    respond(error)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(asteroids_data.get_elements("2004 XY"))
+    assert exc.value.status_code == status
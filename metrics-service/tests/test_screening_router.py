@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from models.mitigation_models import MitigationRequest
+from models.orbit_models import OrbitElementsIn, ScreeningRequest
+from routers import mitigation, orbits
+from services import screening_service
+from services.upstream import UpstreamUnavailable
+
+ORBIT = OrbitElementsIn(a=0.92, e=0.19, i=0.058, om=3.56, w=2.21, ma=2.5, epoch_jd=2451545.0)
+
+
+def _horizons_down(monkeypatch):
+    async def get_orbit_elements(command, center):
+        raise UpstreamUnavailable("ssd.jpl.nasa.gov: down")
+    monkeypatch.setattr(screening_service, "get_orbit_elements", get_orbit_elements)
+
+
+def test_screen_rejects_too_many_epochs(monkeypatch):
+    _horizons_down(monkeypatch)   # el límite se comprueba antes de consultar Horizons
+    payload = ScreeningRequest(bodies=[ORBIT], years=100, step_days=1e-6)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(orbits.screen(payload))
+    assert exc.value.status_code == 422
+
+
+def test_screen_horizons_down(monkeypatch):
+    _horizons_down(monkeypatch)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(orbits.screen(ScreeningRequest(bodies=[ORBIT])))
+    assert exc.value.status_code == 503
+
+
+@pytest.mark.parametrize("lead_years, status", [(10.0, 503), (1e6, 422)])
+def test_mitigation_orbit_errors(monkeypatch, lead_years, status):
+    _horizons_down(monkeypatch)
+    payload = MitigationRequest(D_m=300.0, leadYears=lead_years, orbit=ORBIT)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(mitigation.recommend_strategy(payload))
+    assert exc.value.status_code == status
+
+
+def test_mitigation_without_orbit_needs_no_horizons(monkeypatch):
+    _horizons_down(monkeypatch)
+    result = asyncio.run(mitigation.recommend_strategy(MitigationRequest(D_m=300.0, leadYears=10.0)))
+    assert result.strategy